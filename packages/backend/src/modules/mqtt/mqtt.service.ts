@@ -33,6 +33,7 @@ export class MqttService implements OnModuleInit, OnModuleDestroy {
 
   // Topic patterns
   private readonly GAS_SENSOR_TOPIC = 'sensors/gas/+';
+  private readonly GATEWAY_BATCH_TOPIC = 'sensors/gateway/+/batch';
   private readonly DEVICE_STATUS_TOPIC = 'livestock/devices/+/status';
   private readonly DEVICE_HEARTBEAT_TOPIC = 'livestock/devices/+/heartbeat';
   private readonly DEVICE_ERROR_TOPIC = 'livestock/devices/+/error';
@@ -151,6 +152,7 @@ export class MqttService implements OnModuleInit, OnModuleDestroy {
 
     const topics = [
       this.GAS_SENSOR_TOPIC,
+      this.GATEWAY_BATCH_TOPIC,
       this.DEVICE_STATUS_TOPIC,
       this.DEVICE_HEARTBEAT_TOPIC,
       this.DEVICE_ERROR_TOPIC,
@@ -177,6 +179,8 @@ export class MqttService implements OnModuleInit, OnModuleDestroy {
       // Route message based on topic pattern
       if (topic.startsWith('sensors/gas/')) {
         await this.handleGasSensorMessage(topic, payload);
+      } else if (topic.startsWith('sensors/gateway/')) {
+        await this.handleGatewayBatchMessage(topic, payload);
       } else if (topic.includes('/status')) {
         await this.handleDeviceStatusMessage(topic, payload);
       } else if (topic.includes('/heartbeat')) {
@@ -319,6 +323,58 @@ export class MqttService implements OnModuleInit, OnModuleDestroy {
     await this.notifySensorReadingCallbacks(validatedReading);
   }
 
+  /**
+   * Handle batched readings published by an edge gateway
+   *
+   * Payload: { gatewayId, barnId, readings: SensorPayloadDto[] }
+   * Each reading is validated individually (Property 18); readings without
+   * a barnId inherit the batch barnId. Invalid readings are skipped without
+   * rejecting the rest of the batch.
+   */
+  private async handleGatewayBatchMessage(
+    topic: string,
+    payload: Buffer,
+  ): Promise<void> {
+    let parsedPayload: { barnId?: string; readings?: unknown };
+
+    try {
+      parsedPayload = JSON.parse(payload.toString());
+    } catch (error) {
+      this.logger.warn(`Invalid JSON payload on topic ${topic}: ${error}`);
+      return;
+    }
+
+    if (!parsedPayload || !Array.isArray(parsedPayload.readings)) {
+      this.logger.warn(
+        `Invalid batch payload on topic ${topic}: readings must be an array`,
+      );
+      return;
+    }
+
+    let accepted = 0;
+    for (const reading of parsedPayload.readings) {
+      const withBarn =
+        typeof reading === 'object' && reading !== null
+          ? { barnId: parsedPayload.barnId, ...reading }
+          : reading;
+      const validationResult = await this.validateSensorPayload(withBarn);
+
+      if (!validationResult.isValid) {
+        this.logger.warn(
+          `Invalid sensor reading in batch on topic ${topic}: ${validationResult.errors.join(', ')}`,
+        );
+        continue;
+      }
+
+      accepted++;
+      await this.notifySensorReadingCallbacks(validationResult.data!);
+    }
+
+    this.logger.debug(
+      `Processed gateway batch on ${topic}: ${accepted}/${parsedPayload.readings.length} readings accepted`,
+    );
+  }
+
   /**
    * Validate sensor payload against DTO
    *
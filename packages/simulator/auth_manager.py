@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Authentication Manager for Livestock IoT Simulator
+
+Hands out JWT access tokens for a pool of simulated operators. Tokens are
+cached on disk between runs and refreshed through `/api/auth/refresh`
+before they expire, so sustained load does not stall on login storms
+(password hashing is deliberately slow) or on 401 responses.
+
+Requirements: Simulator for load testing
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import requests
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+def decode_token_expiry(token: str) -> Optional[float]:
+    """
+    Read the `exp` claim of a JWT without verifying it
+
+    Args:
+        token: Encoded JWT
+
+    Returns:
+        Expiry as a Unix timestamp, or None if it cannot be read
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims["exp"])
+    except Exception:
+        return None
+
+
+class Credential:
+    """A single operator login and its current tokens"""
+
+    def __init__(self, email: str, password: str):
+        self.email = email
+        self.password = password
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.expires_at = 0.0
+        self.lock = threading.Lock()
+
+    def is_valid(self, margin: float = 0) -> bool:
+        """Check if the access token is usable for at least `margin` seconds"""
+        return bool(self.access_token) and time.time() + margin < self.expires_at
+
+
+class AuthManager:
+    """Thread-safe token pool with persistent cache and proactive refresh"""
+
+    # Backend default JWT_EXPIRES_IN, used when a token carries no exp claim
+    DEFAULT_TOKEN_LIFETIME = 15 * 60
+
+    def __init__(
+        self,
+        backend_url: str = "http://localhost:3001",
+        credentials: Optional[List[Tuple[str, str]]] = None,
+        cache_file: Optional[str] = ".auth_cache.json",
+        refresh_margin: int = 60,
+    ):
+        """
+        Initialize the authentication manager
+
+        Args:
+            backend_url: Backend API base URL
+            credentials: (email, password) pairs; each should be a distinct user
+                because the backend keeps one refresh token per user
+            cache_file: Path of the token cache (None disables persistence)
+            refresh_margin: Seconds before expiry at which tokens are refreshed
+        """
+        self.backend_url = backend_url.rstrip("/")
+        self.cache_file = cache_file
+        self.refresh_margin = refresh_margin
+
+        unique: Dict[str, Credential] = {}
+        for email, password in credentials or []:
+            unique.setdefault(email, Credential(email, password))
+        self.credentials: List[Credential] = list(unique.values())
+
+        self._next_index = 0
+        self._index_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+
+        self.logins = 0
+        self.refreshes = 0
+        self.failures = 0
+
+        self._load_cache()
+
+    @classmethod
+    def from_env(cls, backend_url: str) -> "AuthManager":
+        """
+        Build a manager from environment variables
+
+        Uses ADMIN_EMAIL/ADMIN_PASSWORD plus any pairs from SIM_CREDENTIALS
+        ("email:password,email:password") or SIM_CREDENTIALS_FILE (one
+        "email:password" per line).
+        """
+        credentials = [
+            (
+                os.getenv("ADMIN_EMAIL", "admin@livestock.com"),
+                os.getenv("ADMIN_PASSWORD", "admin123"),
+            )
+        ]
+
+        entries = [e for e in os.getenv("SIM_CREDENTIALS", "").split(",") if e.strip()]
+        credentials_file = os.getenv("SIM_CREDENTIALS_FILE")
+        if credentials_file and os.path.exists(credentials_file):
+            with open(credentials_file) as f:
+                entries.extend(line for line in f if line.strip() and not line.startswith("#"))
+
+        for entry in entries:
+            email, _, password = entry.strip().partition(":")
+            if email and password:
+                credentials.append((email, password))
+
+        return cls(
+            backend_url=backend_url,
+            credentials=credentials,
+            cache_file=os.getenv("AUTH_CACHE_FILE", ".auth_cache.json") or None,
+            refresh_margin=int(os.getenv("AUTH_REFRESH_MARGIN", "60")),
+        )
+
+    def _load_cache(self):
+        """Load cached tokens from disk"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file) as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable token cache: {e}")
+            return
+
+        entries = cache.get(self.backend_url, {})
+        for credential in self.credentials:
+            entry = entries.get(credential.email)
+            if entry:
+                credential.access_token = entry.get("accessToken")
+                credential.refresh_token = entry.get("refreshToken")
+                credential.expires_at = entry.get("expiresAt", 0.0)
+
+    def _save_cache(self):
+        """Persist current tokens to disk (passwords are never written)"""
+        if not self.cache_file:
+            return
+        with self._cache_lock:
+            cache = {}
+            if os.path.exists(self.cache_file):
+                try:
+                    with open(self.cache_file) as f:
+                        cache = json.load(f)
+                except (OSError, ValueError):
+                    cache = {}
+
+            cache[self.backend_url] = {
+                c.email: {
+                    "accessToken": c.access_token,
+                    "refreshToken": c.refresh_token,
+                    "expiresAt": c.expires_at,
+                }
+                for c in self.credentials
+                if c.access_token
+            }
+
+            tmp_file = f"{self.cache_file}.tmp"
+            try:
+                with open(tmp_file, "w") as f:
+                    json.dump(cache, f)
+                os.replace(tmp_file, self.cache_file)
+            except OSError as e:
+                print(f"Warning: Could not write token cache: {e}")
+
+    def _store_tokens(self, credential: Credential, data: Dict):
+        """Store tokens from a login/refresh response"""
+        credential.access_token = data.get("accessToken") or data.get("access_token")
+        credential.refresh_token = data.get("refreshToken") or data.get("refresh_token")
+        credential.expires_at = decode_token_expiry(credential.access_token or "") or (
+            time.time() + self.DEFAULT_TOKEN_LIFETIME
+        )
+
+    def _login(self, credential: Credential) -> bool:
+        """Log in with email and password"""
+        try:
+            response = requests.post(
+                f"{self.backend_url}/api/auth/login",
+                json={"email": credential.email, "password": credential.password},
+                headers={"Content-Type": "application/json"},
+                timeout=10,
+            )
+            if response.status_code in [200, 201]:
+                self._store_tokens(credential, response.json())
+                self.logins += 1
+                return bool(credential.access_token)
+            print(f"Authentication failed for {credential.email}: HTTP {response.status_code}")
+        except Exception as e:
+            print(f"Authentication error for {credential.email}: {e}")
+        self.failures += 1
+        return False
+
+    def _refresh(self, credential: Credential) -> bool:
+        """Exchange the refresh token for a new token pair"""
+        if not credential.refresh_token:
+            return False
+        try:
+            response = requests.post(
+                f"{self.backend_url}/api/auth/refresh",
+                json={"refreshToken": credential.refresh_token},
+                headers={"Content-Type": "application/json"},
+                timeout=10,
+            )
+            if response.status_code in [200, 201]:
+                self._store_tokens(credential, response.json())
+                self.refreshes += 1
+                return bool(credential.access_token)
+        except Exception as e:
+            print(f"Token refresh error for {credential.email}: {e}")
+        # Refresh token rotated elsewhere or expired - fall back to login
+        credential.refresh_token = None
+        return False
+
+    def _ensure_token(self, credential: Credential) -> Optional[str]:
+        """Return a valid token for the credential, refreshing if needed"""
+        if credential.is_valid(self.refresh_margin):
+            return credential.access_token
+
+        # Another thread is already refreshing: keep using the current token
+        # while it is still valid instead of queueing behind the refresh.
+        if not credential.lock.acquire(blocking=not credential.is_valid()):
+            return credential.access_token
+
+        try:
+            if credential.is_valid(self.refresh_margin):
+                return credential.access_token
+            if self._refresh(credential) or self._login(credential):
+                self._save_cache()
+                return credential.access_token
+            return credential.access_token if credential.is_valid() else None
+        finally:
+            credential.lock.release()
+
+    def get_token(self) -> Optional[str]:
+        """
+        Hand out an access token, round-robin across the credential pool
+
+        Returns:
+            A valid access token, or None if no credential could authenticate
+        """
+        if not self.credentials:
+            return None
+
+        with self._index_lock:
+            start = self._next_index
+            self._next_index = (self._next_index + 1) % len(self.credentials)
+
+        for offset in range(len(self.credentials)):
+            credential = self.credentials[(start + offset) % len(self.credentials)]
+            token = self._ensure_token(credential)
+            if token:
+                return token
+        return None
+
+    def get_auth_headers(self) -> Dict[str, str]:
+        """Get JSON request headers with a bearer token when available"""
+        headers = {"Content-Type": "application/json"}
+        token = self.get_token()
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        return headers
+
+    def invalidate(self, token: str):
+        """
+        Mark a token as unusable (e.g. after a 401 response)
+
+        Args:
+            token: The access token that was rejected
+        """
+        for credential in self.credentials:
+            if credential.access_token == token:
+                credential.expires_at = 0.0
+
+    def stats(self) -> Dict[str, int]:
+        """Return login/refresh counters"""
+        return {
+            "credentials": len(self.credentials),
+            "logins": self.logins,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+Capacity Search for Livestock IoT Monitoring System
+
+Ramps the ingest rate until the backend stops meeting its SLOs and reports
+the highest sustainable rate, so the ingest ceiling can be tracked across
+backend releases.
+
+Each step sets the gas reading rate (and a proportional RFID event rate),
+warms up, then measures:
+
+- PUBACK p99 of QoS 1 readings and achieved publish rate
+- Error rate and p99 of POST /api/logs (RFID events), sent by a pool of
+  workers so a slow backend cannot cap the client at 1 / latency
+- Error rate and p99 of optional read endpoints polled during the step
+
+Search modes:
+- step: multiply the rate by CAPACITY_STEP_FACTOR until a step fails
+- binary: bisect between CAPACITY_START_RATE and CAPACITY_MAX_RATE
+
+Usage:
+    python capacity_search.py                 # writes capacity-report.json
+
+Steps are timed in wall-clock seconds, so the search always runs on a
+realtime simulation clock (SIM_CLOCK_MODE is ignored).
+
+Requirements: Simulator for load testing
+"""
+
+import json
+import os
+import platform
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+
+from gas_sensor_simulator import GasSensorSimulator
+from metrics import LatencyHistogram
+from rfid_reader_simulator import RFIDReaderSimulator
+from sim_clock import SimClock, set_clock
+
+# Load environment variables
+load_dotenv()
+
+
+class ReadProber:
+    """Polls read endpoints during a step and records latency and errors"""
+
+    def __init__(self, rfid: RFIDReaderSimulator, endpoints: List[str], interval: float = 1.0):
+        """
+        Initialize the prober
+
+        Args:
+            rfid: RFID simulator whose authenticated session is reused
+            endpoints: Paths to GET (e.g. /api/dashboard/statistics)
+            interval: Seconds between polling rounds
+        """
+        self.rfid = rfid
+        self.endpoints = endpoints
+        self.interval = interval
+        self.latency = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+        self._since = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def reset(self):
+        """Start a new measurement window (requests already in flight are dropped)"""
+        self._since = time.time()
+        self.latency = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+
+    def _loop(self):
+        while not self._stop.is_set():
+            for path in self.endpoints:
+                started = time.time()
+                try:
+                    ok = self.rfid._request("GET", path).status_code == 200
+                except Exception:
+                    ok = False
+                if started < self._since:
+                    continue
+                self.latency.record((time.time() - started) * 1000)
+                self.requests += 1
+                if not ok:
+                    self.errors += 1
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="read-prober", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+
+
+class RFIDLoadDriver:
+    """
+    Sends RFID events at the reader simulator's rate from a pool of workers
+
+    A single sequential loop sends at most 1 / latency events per second, so
+    near capacity the client, not the backend, would miss the target. Workers
+    claim send slots from a shared schedule; a slot claimed more than one
+    interval late means every worker was busy and the client is the limit.
+    """
+
+    def __init__(self, rfid: RFIDReaderSimulator, workers: int = 8):
+        """
+        Initialize the driver
+
+        Args:
+            rfid: RFID simulator providing events, session and counters;
+                its interval sets the rate
+            workers: Concurrent senders (maximum requests in flight)
+        """
+        self.rfid = rfid
+        self.workers = max(1, workers)
+        self.late_slots = 0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def reset(self):
+        """Start a new measurement window"""
+        with self._lock:
+            self.late_slots = 0
+
+    def _claim(self) -> float:
+        """Claim the next send slot (wall-clock time)"""
+        with self._lock:
+            interval = self.rfid.interval
+            now = time.time()
+            if self._next_slot < now - interval:
+                # Behind schedule: all workers were busy; do not burst to catch up
+                self.late_slots += 1
+                self._next_slot = now
+            slot = self._next_slot
+            self._next_slot += interval
+            return slot
+
+    def _worker(self):
+        while not self._stop.is_set():
+            slot = self._claim()
+            if self._stop.wait(max(0.0, slot - time.time())):
+                return
+            self.rfid._send_event(self.rfid._generate_event())
+
+    def start(self) -> bool:
+        """Initialize the RFID simulator and start the workers"""
+        if not self.rfid.test_connection():
+            print(f"Error: Cannot connect to backend at {self.rfid.backend_url}")
+            return False
+        if not self.rfid._initialize_data():
+            return False
+        self.rfid.running = True
+        self._next_slot = time.time()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"rfid-worker-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return True
+
+    def stop(self):
+        """Stop the workers and shut the RFID simulator down"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=15)
+        self._threads = []
+        if self.rfid.running:
+            self.rfid.shutdown()
+
+
+class CapacitySearch:
+    """Searches for the highest ingest rate that meets the SLOs"""
+
+    def __init__(
+        self,
+        gas: GasSensorSimulator,
+        rfid: Optional[RFIDReaderSimulator] = None,
+        mode: str = "step",
+        start_rate: float = 10,
+        max_rate: float = 5000,
+        step_factor: float = 1.5,
+        resolution: float = 0.05,
+        rfid_ratio: float = 0.01,
+        warmup: float = 10,
+        step_duration: float = 60,
+        cooldown: float = 30,
+        puback_p99_ms: float = 500,
+        http_p99_ms: float = 1000,
+        http_error_rate: float = 0.01,
+        read_p99_ms: float = 2000,
+        read_endpoints: Optional[List[str]] = None,
+        min_achieved_ratio: float = 0.9,
+        rfid_workers: int = 8,
+    ):
+        """
+        Initialize the capacity search
+
+        Args:
+            gas: Gas sensor simulator (connected, not yet running)
+            rfid: RFID reader simulator (optional, not yet running)
+            mode: "step" (geometric ramp) or "binary" (bisection)
+            start_rate: First gas rate to test in readings per second
+            max_rate: Highest gas rate to test
+            step_factor: Rate multiplier between steps (step mode)
+            resolution: Stop bisecting when the bracket is this tight (relative)
+            rfid_ratio: RFID events per gas reading (0 disables RFID load)
+            warmup: Seconds at the new rate before measuring
+            step_duration: Seconds measured per step
+            cooldown: Maximum seconds to wait for unacknowledged messages to drain
+            puback_p99_ms: SLO for PUBACK p99
+            http_p99_ms: SLO for POST /api/logs p99
+            http_error_rate: SLO for the share of failed HTTP requests
+            read_p99_ms: SLO for read endpoint p99
+            read_endpoints: Paths polled during each step (optional)
+            min_achieved_ratio: Achieved/target rate below which a step fails
+            rfid_workers: Concurrent RFID senders
+        """
+        if mode not in ("step", "binary"):
+            raise ValueError(f"Unknown capacity search mode '{mode}' (choose from: step, binary)")
+        # Offered rates are simulated-time intervals, measured rates wall-clock
+        if gas.clock.mode != "realtime" or (rfid and rfid.clock.mode != "realtime"):
+            raise ValueError("Capacity search needs a realtime simulation clock")
+
+        self.gas = gas
+        self.rfid = rfid if rfid_ratio > 0 else None
+        self.mode = mode
+        self.start_rate = start_rate
+        self.max_rate = max_rate
+        self.step_factor = step_factor
+        self.resolution = resolution
+        self.rfid_ratio = rfid_ratio
+        self.warmup = warmup
+        self.step_duration = step_duration
+        self.cooldown = cooldown
+        self.slo = {
+            "pubackP99Ms": puback_p99_ms,
+            "httpP99Ms": http_p99_ms,
+            "httpErrorRate": http_error_rate,
+            "readP99Ms": read_p99_ms,
+            "minAchievedRatio": min_achieved_ratio,
+        }
+        self.rfid_driver = RFIDLoadDriver(self.rfid, rfid_workers) if self.rfid else None
+        self.prober = ReadProber(self.rfid, read_endpoints) if self.rfid and read_endpoints else None
+        self.steps: List[Dict] = []
+        self.started_at: Optional[float] = None
+        self.threads: List[threading.Thread] = []
+
+    def _set_rate(self, rate: float):
+        """Apply a gas rate (readings/s) and the proportional RFID rate"""
+        self.gas.interval = len(self.gas.sensors) / rate
+        if self.rfid:
+            self.rfid.interval = 1 / (rate * self.rfid_ratio)
+
+    def _reset_window(self) -> Dict:
+        """Start a new measurement window and return counter baselines"""
+        self.gas.reset_latency()
+        if self.rfid:
+            self.rfid.reset_latency()
+            self.rfid_driver.reset()
+        if self.prober:
+            self.prober.reset()
+        return {
+            "published": self.gas.published,
+            "failed": self.gas.publish_failed,
+            "sent": self.rfid.events_sent if self.rfid else 0,
+            "eventsFailed": self.rfid.events_failed if self.rfid else 0,
+            "at": time.time(),
+        }
+
+    def _drain(self):
+        """Drop to the start rate until the previous step's backlog is acknowledged"""
+        self._set_rate(self.start_rate)
+        deadline = time.time() + self.cooldown
+        while self.gas.pending_messages() > len(self.gas.sensors) and time.time() < deadline:
+            time.sleep(0.5)
+
+    def measure(self, rate: float) -> Dict:
+        """
+        Run one step at a rate and evaluate it against the SLOs
+
+        Args:
+            rate: Gas readings per second
+
+        Returns:
+            Step result with measurements, passed flag and failure reasons
+        """
+        print(f"\n[CAPACITY] Step {len(self.steps) + 1}: {rate:.1f} readings/s")
+        self._set_rate(rate)
+        time.sleep(self.warmup)
+
+        base = self._reset_window()
+        time.sleep(self.step_duration)
+        elapsed = time.time() - base["at"]
+
+        # Readings; in gateway mode counted once their batch is published
+        published = self.gas.published - base["published"]
+        publish_failed = self.gas.publish_failed - base["failed"]
+        result = {
+            "targetRate": round(rate, 2),
+            "achievedRate": round(published / elapsed, 2),
+            "publishFailed": publish_failed,
+            "pendingAtEnd": self.gas.pending_messages(),
+            "pubackLatency": self.gas.puback_latency.summary(),
+        }
+        if self.rfid:
+            sent = self.rfid.events_sent - base["sent"]
+            failed = self.rfid.events_failed - base["eventsFailed"]
+            result["rfidTargetRate"] = round(rate * self.rfid_ratio, 3)
+            result["rfidAchievedRate"] = round(sent / elapsed, 3)
+            result["httpErrorRate"] = round(failed / (sent + failed), 4) if sent + failed else 0.0
+            result["httpLatency"] = self.rfid.http_latency.summary()
+            result["rfidLateSlots"] = self.rfid_driver.late_slots
+        if self.prober:
+            result["readErrorRate"] = round(self.prober.errors / self.prober.requests, 4) if self.prober.requests else 0.0
+            result["readLatency"] = self.prober.latency.summary()
+
+        reasons = self._check(result)
+        result["passed"] = not reasons
+        result["violations"] = reasons
+        self.steps.append(result)
+
+        status = "PASS" if not reasons else "FAIL: " + "; ".join(reasons)
+        print(
+            f"[CAPACITY]   achieved={result['achievedRate']}/s "
+            f"puback p99={result['pubackLatency']['p99']}ms -> {status}"
+        )
+
+        self._drain()
+        return result
+
+    def _check(self, result: Dict) -> List[str]:
+        """Return the SLOs a step violated"""
+        slo = self.slo
+        reasons = []
+        if result["achievedRate"] < result["targetRate"] * slo["minAchievedRatio"]:
+            reasons.append(f"achieved {result['achievedRate']}/s of {result['targetRate']}/s")
+        if result["pubackLatency"]["p99"] > slo["pubackP99Ms"]:
+            reasons.append(f"PUBACK p99 {result['pubackLatency']['p99']}ms > {slo['pubackP99Ms']}ms")
+        if self.rfid:
+            if result["httpErrorRate"] > slo["httpErrorRate"]:
+                reasons.append(f"HTTP errors {result['httpErrorRate'] * 100:.1f}% > {slo['httpErrorRate'] * 100:.1f}%")
+            if result["httpLatency"]["p99"] > slo["httpP99Ms"]:
+                reasons.append(f"/api/logs p99 {result['httpLatency']['p99']}ms > {slo['httpP99Ms']}ms")
+            if result["rfidAchievedRate"] < result["rfidTargetRate"] * slo["minAchievedRatio"]:
+                reason = f"RFID achieved {result['rfidAchievedRate']}/s of {result['rfidTargetRate']}/s"
+                if result["rfidLateSlots"]:
+                    # The backend may have more headroom than measured
+                    reason += (
+                        f" (client-bound: all {self.rfid_driver.workers} RFID workers busy, "
+                        f"raise CAPACITY_RFID_WORKERS)"
+                    )
+                reasons.append(reason)
+        if self.prober:
+            if result["readErrorRate"] > slo["httpErrorRate"]:
+                reasons.append(f"read errors {result['readErrorRate'] * 100:.1f}%")
+            if result["readLatency"]["p99"] > slo["readP99Ms"]:
+                reasons.append(f"read p99 {result['readLatency']['p99']}ms > {slo['readP99Ms']}ms")
+        return reasons
+
+    def _search_step(self):
+        """Geometric ramp until the first failing step"""
+        rate = self.start_rate
+        while rate <= self.max_rate:
+            if not self.measure(rate)["passed"]:
+                return
+            rate *= self.step_factor
+
+    def _search_binary(self):
+        """Bisection between start and max rate"""
+        low, high = self.start_rate, self.max_rate
+        if not self.measure(low)["passed"]:
+            return
+        if self.measure(high)["passed"]:
+            return
+        while (high - low) / low > self.resolution:
+            mid = (low + high) / 2
+            if self.measure(mid)["passed"]:
+                low = mid
+            else:
+                high = mid
+
+    def _start_simulators(self):
+        """Start the simulator run loops and wait until they are generating"""
+        self._set_rate(self.start_rate)
+        self.threads.append(threading.Thread(target=self.gas.run, name="gas-sensors", daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+        if self.rfid and not self.rfid_driver.start():
+            raise RuntimeError("RFID reader simulator did not start")
+        if self.prober:
+            self.prober.start()
+
+    def _stop_simulators(self):
+        if self.prober:
+            self.prober.stop()
+        self.gas.stop()
+        if self.rfid:
+            self.rfid_driver.stop()
+        for thread in self.threads:
+            thread.join(timeout=10)
+
+    def run(self) -> Dict:
+        """
+        Run the search
+
+        Returns:
+            Capacity report
+        """
+        print(f"Capacity search ({self.mode}): {self.start_rate}..{self.max_rate} readings/s")
+        print(f"SLOs: {self.slo}")
+
+        self.started_at = time.time()
+        self._start_simulators()
+        try:
+            if self.mode == "binary":
+                self._search_binary()
+            else:
+                self._search_step()
+        finally:
+            self._stop_simulators()
+
+        return self.report()
+
+    def report(self) -> Dict:
+        """Build the capacity report from the steps measured so far"""
+        passed = [step for step in self.steps if step["passed"]]
+        failed = [step for step in self.steps if not step["passed"]]
+        best = max(passed, key=lambda step: step["targetRate"], default=None)
+        first_failure = min(failed, key=lambda step: step["targetRate"], default=None)
+        return {
+            "generatedAt": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "label": os.getenv("CAPACITY_LABEL", ""),
+            "host": platform.node(),
+            "backendUrl": self.rfid.backend_url if self.rfid else None,
+            "broker": f"{self.gas.broker_host}:{self.gas.broker_port}",
+            "mode": self.mode,
+            "sensors": len(self.gas.sensors),
+            "gatewayMode": self.gas.batcher is not None,
+            "codec": self.gas.codec.name,
+            "rfidRatio": self.rfid_ratio if self.rfid else 0,
+            "rfidWorkers": self.rfid_driver.workers if self.rfid else 0,
+            "slo": self.slo,
+            "capacity": {
+                "readingsPerSec": best["targetRate"] if best else 0,
+                "rfidEventsPerSec": best.get("rfidTargetRate", 0) if best else 0,
+            },
+            "limitedBy": first_failure["violations"] if first_failure else ["max rate reached"],
+            "durationSec": round(time.time() - self.started_at, 1) if self.started_at else 0,
+            "steps": self.steps,
+        }
+
+
+def print_report(report: Dict):
+    """Print a capacity report summary"""
+    print("\n" + "=" * 70)
+    print("Capacity Report")
+    print("=" * 70)
+    print(f"{'Target/s':>10} {'Achieved/s':>11} {'PUBACK p99':>11} {'HTTP p99':>9} {'HTTP err':>9}  Result")
+    for step in report["steps"]:
+        http_p99 = f"{step['httpLatency']['p99']:.1f}ms" if "httpLatency" in step else "-"
+        http_err = f"{step['httpErrorRate'] * 100:.1f}%" if "httpErrorRate" in step else "-"
+        print(
+            f"{step['targetRate']:10.1f} {step['achievedRate']:11.1f} {step['pubackLatency']['p99']:9.1f}ms "
+            f"{http_p99:>9} {http_err:>9}  {'PASS' if step['passed'] else 'FAIL'}"
+        )
+    print("-" * 70)
+    capacity = report["capacity"]
+    print(f"Sustainable rate: {capacity['readingsPerSec']} readings/s, {capacity['rfidEventsPerSec']} RFID events/s")
+    print(f"Limited by: {'; '.join(report['limitedBy'])}")
+    print("=" * 70)
+
+
+def main():
+    """Main entry point for capacity search"""
+    broker_host = os.getenv("MQTT_BROKER_HOST", "localhost")
+    broker_port = int(os.getenv("MQTT_BROKER_PORT", "1883"))
+    read_endpoints = [p.strip() for p in os.getenv("CAPACITY_READ_ENDPOINTS", "").split(",") if p.strip()]
+
+    # Simulators read the clock when they are created
+    if os.getenv("SIM_CLOCK_MODE", "realtime") != "realtime":
+        print(f"Ignoring SIM_CLOCK_MODE={os.getenv('SIM_CLOCK_MODE')}: capacity search runs in real time")
+    set_clock(SimClock(mode="realtime"))
+
+    gas = GasSensorSimulator(
+        broker_host=broker_host,
+        broker_port=broker_port,
+        num_sensors=int(os.getenv("NUM_GAS_SENSORS", "100")),
+        gateway_mode=os.getenv("GATEWAY_MODE", "false").lower() == "true",
+        batch_size=int(os.getenv("GATEWAY_BATCH_SIZE", "50")),
+        batch_linger=int(os.getenv("GATEWAY_LINGER_MS", "1000")) / 1000,
+        codec=os.getenv("PAYLOAD_CODEC", "json"),
+        verbose=False,
+    )
+    rfid = RFIDReaderSimulator(
+        backend_url=os.getenv("BACKEND_API_URL", "http://localhost:3001"),
+        mqtt_broker=broker_host,
+        mqtt_port=broker_port,
+    )
+
+    search = CapacitySearch(
+        gas,
+        rfid,
+        mode=os.getenv("CAPACITY_MODE", "step"),
+        start_rate=float(os.getenv("CAPACITY_START_RATE", "10")),
+        max_rate=float(os.getenv("CAPACITY_MAX_RATE", "5000")),
+        step_factor=float(os.getenv("CAPACITY_STEP_FACTOR", "1.5")),
+        resolution=float(os.getenv("CAPACITY_RESOLUTION", "0.05")),
+        rfid_ratio=float(os.getenv("CAPACITY_RFID_RATIO", "0.01")),
+        warmup=float(os.getenv("CAPACITY_WARMUP", "10")),
+        step_duration=float(os.getenv("CAPACITY_STEP_DURATION", "60")),
+        cooldown=float(os.getenv("CAPACITY_COOLDOWN", "30")),
+        puback_p99_ms=float(os.getenv("SLO_PUBACK_P99_MS", "500")),
+        http_p99_ms=float(os.getenv("SLO_HTTP_P99_MS", "1000")),
+        http_error_rate=float(os.getenv("SLO_HTTP_ERROR_RATE", "0.01")),
+        read_p99_ms=float(os.getenv("SLO_READ_P99_MS", "2000")),
+        read_endpoints=read_endpoints,
+        rfid_workers=int(os.getenv("CAPACITY_RFID_WORKERS", "8")),
+    )
+
+    try:
+        gas.connect()
+        report = search.run()
+    except KeyboardInterrupt:
+        # run() already stopped the simulators on the way out
+        print("\n\nCapacity search interrupted")
+        report = search.report()
+
+    print_report(report)
+    report_file = os.getenv("CAPACITY_REPORT_FILE", "capacity-report.json")
+    with open(report_file, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {report_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Runtime Control API for Livestock IoT Simulator
+
+A small local HTTP server for shaping load while main.py runs, without the
+restart storm (every device going offline and online again, cold MQTT and
+HTTP connections) that distorts measurements after a restart:
+
+    GET  /status      simulators, fleet sizes, intervals, pause state, clock
+    GET  /metrics     counters and latency histograms of every simulator
+    POST /sensors     {"add": 50, "barnIds": [...]} or {"remove": 10}
+                      or {"remove": ["GAS-001", ...]}
+    POST /readers     {"add": 5} or {"remove": 2} or {"remove": ["RFID-READER-004"]}
+    POST /rate        {"gasInterval": 5, "rfidInterval": 1,
+                       "workloadInterval": 0.5, "workload": "rfid=50,weight=50"}
+    POST /faults      {"gasErrorProbability": 0.2, "rfidErrorProbability": 0.1}
+                      {"type": "gasBuildup", "barn": "BARN-001", "duration": 600}
+                      {"type": "disconnect", "kind": "rfid", "duration": 120}
+                      {"clear": true}   (see incident_engine.py for incident specs)
+    POST /pause       {"target": "gas"}   (default: all pausable simulators;
+                      the workload follows the rfid pause state)
+    POST /resume      {"target": "rfid"}
+    POST /profiler    {"action": "start" | "stop"}
+
+Example:
+    curl -s localhost:8090/metrics
+    curl -s -X POST localhost:8090/rate -d '{"gasInterval": 2}'
+
+The server binds to 127.0.0.1 by default and has no authentication; do not
+expose it on a shared network.
+
+Requirements: Simulator for load testing
+"""
+
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from incident_engine import get_incident_engine, incident_from_spec
+from profiler import SamplingProfiler
+from sim_clock import get_clock
+from workload_generators import WorkloadProfile
+
+
+class ControlError(Exception):
+    """A control request that cannot be applied (sent back as an HTTP error)"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class ControlAPI:
+    """Applies control requests to the running simulators"""
+
+    def __init__(
+        self,
+        simulators: Dict,
+        host: str = "127.0.0.1",
+        port: int = 8090,
+        profiler: Optional[SamplingProfiler] = None,
+    ):
+        """
+        Initialize the control API (does not start serving)
+
+        Args:
+            simulators: Running simulator instances by name ("gas", "rfid",
+                "workload"); read on every request
+            host: Interface to bind (keep local)
+            port: TCP port (0 picks a free port)
+            profiler: Profiler to start/stop via POST /profiler
+        """
+        self.simulators = simulators
+        self.host = host
+        self.port = port
+        self.profiler = profiler
+        self.server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _simulator(self, name: str):
+        simulator = self.simulators.get(name)
+        if simulator is None:
+            raise ControlError(f"{name} simulator is not running", status=409)
+        return simulator
+
+    def _targets(self, body: Dict) -> Dict:
+        """Pausable simulators addressed by an optional "target" field"""
+        pausable = {
+            name: sim
+            for name, sim in self.simulators.items()
+            if hasattr(sim, "pause") and hasattr(sim, "resume")
+        }
+        target = body.get("target")
+        if not target:
+            return pausable
+        simulator = self._simulator(target)
+        if target not in pausable:
+            raise ControlError(
+                f"{target} simulator cannot be paused (choose from: {', '.join(sorted(pausable))})"
+            )
+        return {target: simulator}
+
+    def status(self, body: Dict) -> Dict:
+        clock = get_clock()
+        status = {
+            "simulators": sorted(self.simulators),
+            "clock": {"mode": clock.mode, "speedup": clock.speedup, "now": clock.iso_now()},
+            "profiler": bool(self.profiler and self.profiler.running),
+            "incidents": get_incident_engine().describe(),
+        }
+        gas = self.simulators.get("gas")
+        if gas:
+            status["gas"] = {
+                "sensors": len(gas.sensors),
+                "interval": gas.interval,
+                "paused": gas.paused,
+                "errorProbability": gas.error_probability,
+            }
+        rfid = self.simulators.get("rfid")
+        if rfid:
+            status["rfid"] = {
+                "readers": len(rfid.reader_ids),
+                "interval": rfid.interval,
+                "paused": rfid.paused,
+                "errorProbability": rfid.error_probability,
+            }
+        workload = self.simulators.get("workload")
+        if workload:
+            status["workload"] = {"interval": workload.interval, "profile": workload.profile.weights}
+        return status
+
+    def metrics(self, body: Dict) -> Dict:
+        return {
+            name: simulator.get_metrics()
+            for name, simulator in self.simulators.items()
+            if hasattr(simulator, "get_metrics")
+        }
+
+    def sensors(self, body: Dict) -> Dict:
+        gas = self._simulator("gas")
+        if "add" in body:
+            return {"added": gas.add_sensors(int(body["add"]), body.get("barnIds")), "total": len(gas.sensors)}
+        if "remove" in body:
+            remove = body["remove"]
+            if isinstance(remove, list):
+                removed = gas.remove_sensors(sensor_ids=remove)
+            else:
+                removed = gas.remove_sensors(count=int(remove))
+            return {"removed": removed, "total": len(gas.sensors)}
+        raise ControlError('Expected "add" or "remove"')
+
+    def readers(self, body: Dict) -> Dict:
+        rfid = self._simulator("rfid")
+        if "add" in body:
+            return {"added": rfid.add_readers(int(body["add"])), "total": len(rfid.reader_ids)}
+        if "remove" in body:
+            remove = body["remove"]
+            if isinstance(remove, list):
+                removed = rfid.remove_readers(reader_ids=remove)
+            else:
+                removed = rfid.remove_readers(count=int(remove))
+            return {"removed": removed, "total": len(rfid.reader_ids)}
+        raise ControlError('Expected "add" or "remove"')
+
+    def rate(self, body: Dict) -> Dict:
+        # Validate everything before changing anything
+        intervals = {
+            key: float(body[key])
+            for key in ("gasInterval", "rfidInterval", "workloadInterval")
+            if key in body
+        }
+        if any(value <= 0 for value in intervals.values()):
+            raise ControlError("Intervals must be positive")
+        profile = WorkloadProfile.parse(body["workload"]) if "workload" in body else None
+        if not intervals and profile is None:
+            raise ControlError('Expected "gasInterval", "rfidInterval", "workloadInterval" or "workload"')
+
+        names = {"gasInterval": "gas", "rfidInterval": "rfid", "workloadInterval": "workload"}
+        targets = {key: self._simulator(names[key]) for key in intervals}
+        workload = self._simulator("workload") if profile else None
+
+        for key, simulator in targets.items():
+            simulator.interval = intervals[key]
+        if workload:
+            workload.set_profile(profile)
+        print(f"[CONTROL] Rate change: {body}")
+        return self.status({})
+
+    def faults(self, body: Dict) -> Dict:
+        # Validate everything before changing anything
+        probabilities = {
+            key: float(body[key])
+            for key in ("gasErrorProbability", "rfidErrorProbability")
+            if key in body
+        }
+        for key, probability in probabilities.items():
+            if not 0 <= probability <= 1:
+                raise ControlError(f"{key} must be between 0 and 1")
+        incident = incident_from_spec(body) if "type" in body else None
+        clear = bool(body.get("clear"))
+        if not probabilities and incident is None and not clear:
+            raise ControlError('Expected "gasErrorProbability", "rfidErrorProbability", "type" or "clear"')
+
+        names = {"gasErrorProbability": "gas", "rfidErrorProbability": "rfid"}
+        targets = {key: self._simulator(names[key]) for key in probabilities}
+
+        applied = {}
+        for key, simulator in targets.items():
+            simulator.error_probability = probabilities[key]
+            applied[key] = probabilities[key]
+        engine = get_incident_engine()
+        if clear:
+            engine.clear()
+            applied["clear"] = True
+        if incident:
+            engine.add(incident)
+            applied["incident"] = incident.describe(engine.clock.time())
+        print(f"[CONTROL] Faults applied: {applied}")
+        return {"applied": applied}
+
+    def pause(self, body: Dict) -> Dict:
+        targets = self._targets(body)
+        for simulator in targets.values():
+            simulator.pause()
+        print(f"[CONTROL] Paused: {', '.join(targets) or 'nothing'}")
+        return {"paused": sorted(targets)}
+
+    def resume(self, body: Dict) -> Dict:
+        targets = self._targets(body)
+        for simulator in targets.values():
+            simulator.resume()
+        print(f"[CONTROL] Resumed: {', '.join(targets) or 'nothing'}")
+        return {"resumed": sorted(targets)}
+
+    def profile(self, body: Dict) -> Dict:
+        if not self.profiler:
+            raise ControlError("Profiler is not available", status=409)
+        action = body.get("action")
+        if action == "start":
+            return {"started": self.profiler.start()}
+        if action == "stop":
+            return {"files": self.profiler.stop()}
+        raise ControlError('action must be "start" or "stop"')
+
+    def handle(self, method: str, path: str, body: Dict) -> Tuple[int, Dict]:
+        """
+        Dispatch one request
+
+        Returns:
+            HTTP status code and JSON response body
+        """
+        routes = {
+            ("GET", "/status"): self.status,
+            ("GET", "/metrics"): self.metrics,
+            ("POST", "/sensors"): self.sensors,
+            ("POST", "/readers"): self.readers,
+            ("POST", "/rate"): self.rate,
+            ("POST", "/faults"): self.faults,
+            ("POST", "/pause"): self.pause,
+            ("POST", "/resume"): self.resume,
+            ("POST", "/profiler"): self.profile,
+        }
+        route = routes.get((method, path.split("?")[0].rstrip("/") or "/"))
+        if route is None:
+            return 404, {"error": f"No route for {method} {path}"}
+        try:
+            return 200, route(body)
+        except ControlError as e:
+            return e.status, {"error": str(e)}
+        except (ValueError, TypeError, KeyError) as e:
+            return 400, {"error": str(e)}
+
+    def start(self):
+        """Start serving in a background thread"""
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self, method: str):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = {}
+                if length:
+                    try:
+                        body = json.loads(self.rfile.read(length))
+                    except ValueError:
+                        self._send(400, {"error": "Body must be JSON"})
+                        return
+                    if not isinstance(body, dict):
+                        self._send(400, {"error": "Body must be a JSON object"})
+                        return
+                self._send(*api.handle(method, self.path, body))
+
+            def _send(self, status: int, payload: Dict):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_POST(self):
+                self._respond("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, name="control-api", daemon=True)
+        self._thread.start()
+        print(f"Control API listening on http://{self.host}:{self.port}")
+
+    def stop(self):
+        """Stop serving"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def control_api_from_env(simulators: Dict, profiler: Optional[SamplingProfiler] = None) -> Optional[ControlAPI]:
+    """Create a control API if CONTROL_API_PORT is set, otherwise None"""
+    port = os.getenv("CONTROL_API_PORT")
+    if not port:
+        return None
+    return ControlAPI(
+        simulators,
+        host=os.getenv("CONTROL_API_HOST", "127.0.0.1"),
+        port=int(port),
+        profiler=profiler,
+    )
@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+"""
+Distributed Load Generation for Livestock IoT Monitoring System
+
+A controller coordinates several simulator agents over a small TCP control
+protocol (one JSON object per line). Each agent runs a GasSensorSimulator
+and an RFIDReaderSimulator on a disjoint slice of sensor IDs, RFID readers
+and livestock.
+
+Protocol:
+    agent -> controller   {"type": "hello", "agentId": ...}
+    controller -> agent   {"type": "assign", "sensorOffset": ..., "numSensors": ...,
+                           "barnIds": [...], "readerIds": [...], "livestockIds": [...],
+                           "agentIndex": ..., "numAgents": ...,
+                           "gasInterval": ..., "rfidInterval": ..., "startAt": <epoch>}
+    controller -> agent   {"type": "rate", "gasInterval": ..., "rfidInterval": ...}
+    controller -> agent   {"type": "stop"}
+    agent -> controller   {"type": "metrics" | "final", "agentId": ..., "gas": {...}, "rfid": {...}}
+
+Livestock come from the controller (fleet file or one backend fetch). When
+the controller has none, each agent fetches the herd itself and keeps every
+numAgents-th animal from agentIndex, so the slices stay disjoint.
+
+All agents start at the same wall-clock time (keep hosts NTP-synced). The
+controller merges counters and latency histograms into one report.
+
+Usage (localhost):
+    python distributed.py controller          # waits for NUM_AGENTS agents
+    python distributed.py agent               # run NUM_AGENTS times
+
+Requirements: Simulator for load testing
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from gas_sensor_simulator import GasSensorSimulator
+from metrics import LatencyHistogram
+from provisioning import load_fleet
+from rfid_reader_simulator import RFIDReaderSimulator
+
+# Load environment variables
+load_dotenv()
+
+
+class ControlChannel:
+    """Line-delimited JSON messages over a TCP socket"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.reader = sock.makefile("r", encoding="utf-8")
+        self._send_lock = threading.Lock()
+
+    def send(self, message: Dict):
+        data = (json.dumps(message) + "\n").encode("utf-8")
+        with self._send_lock:
+            self.sock.sendall(data)
+
+    def receive(self) -> Optional[Dict]:
+        """Return the next message, or None when the connection closed"""
+        line = self.reader.readline()
+        if not line:
+            return None
+        return json.loads(line)
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def _split(total: int, parts: int) -> List[Tuple[int, int]]:
+    """Split `total` items into `parts` contiguous (offset, count) ranges"""
+    base, extra = divmod(total, parts)
+    ranges, offset = [], 0
+    for i in range(parts):
+        count = base + (1 if i < extra else 0)
+        ranges.append((offset, count))
+        offset += count
+    return ranges
+
+
+def merge_metrics(reports: List[Dict]) -> Dict:
+    """
+    Merge agent metric reports into fleet totals
+
+    Args:
+        reports: Metric messages from agents
+
+    Returns:
+        Totals with merged latency histograms
+    """
+    puback = LatencyHistogram()
+    http = LatencyHistogram()
+    totals = {"published": 0, "failed": 0, "errors": 0, "pending": 0, "sent": 0, "httpFailed": 0}
+
+    for report in reports:
+        gas = report.get("gas") or {}
+        rfid = report.get("rfid") or {}
+        totals["published"] += gas.get("published", 0)
+        totals["failed"] += gas.get("failed", 0)
+        totals["errors"] += gas.get("errors", 0)
+        totals["pending"] += gas.get("pending", 0)
+        totals["sent"] += rfid.get("sent", 0)
+        totals["httpFailed"] += rfid.get("failed", 0)
+        if gas.get("pubackLatency"):
+            puback.merge(LatencyHistogram.from_dict(gas["pubackLatency"]))
+        if rfid.get("httpLatency"):
+            http.merge(LatencyHistogram.from_dict(rfid["httpLatency"]))
+
+    totals["pubackLatency"] = puback
+    totals["httpLatency"] = http
+    return totals
+
+
+class LoadController:
+    """Coordinates simulator agents and merges their metrics"""
+
+    def __init__(
+        self,
+        host: str = "0.0.0.0",
+        port: int = 7070,
+        num_agents: int = 2,
+        num_sensors: int = 100,
+        num_readers: int = 10,
+        gas_interval: float = 10,
+        rfid_interval: float = 5,
+        duration: int = 300,
+        start_delay: int = 5,
+        barn_ids: Optional[List[str]] = None,
+        livestock_ids: Optional[List[str]] = None,
+        rate_schedule: Optional[List[Tuple[float, float, float]]] = None,
+        report_file: Optional[str] = None,
+    ):
+        """
+        Initialize the controller
+
+        Args:
+            host: Interface to listen on
+            port: Control port
+            num_agents: Agents to wait for before starting
+            num_sensors: Gas sensors across the whole fleet
+            num_readers: RFID readers across the whole fleet
+            gas_interval: Initial seconds between readings per sensor
+            rfid_interval: Initial seconds between events per agent
+            duration: Seconds to run after the synchronized start
+            start_delay: Seconds between assignment and synchronized start
+            barn_ids: Barns for gas sensors and RFID events
+            livestock_ids: Livestock to split across agents
+            rate_schedule: (seconds after start, gas interval, rfid interval) steps
+            report_file: Optional path for a JSON report
+        """
+        self.host = host
+        self.port = port
+        self.num_agents = num_agents
+        self.num_sensors = num_sensors
+        self.num_readers = num_readers
+        self.gas_interval = gas_interval
+        self.rfid_interval = rfid_interval
+        self.duration = duration
+        self.start_delay = start_delay
+        self.barn_ids = barn_ids or ["BARN-001"]
+        self.livestock_ids = livestock_ids or []
+        self.rate_schedule = sorted(rate_schedule or [])
+        self.report_file = report_file
+
+        self.agents: Dict[str, ControlChannel] = {}
+        self.latest: Dict[str, Dict] = {}
+        self.finals: Dict[str, Dict] = {}
+        self.start_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._all_final = threading.Event()
+
+    def _accept_agents(self, server: socket.socket):
+        """Accept connections until every agent said hello"""
+        while len(self.agents) < self.num_agents:
+            sock, address = server.accept()
+            channel = ControlChannel(sock)
+            hello = channel.receive()
+            if not hello or hello.get("type") != "hello":
+                channel.close()
+                continue
+            agent_id = hello.get("agentId") or f"{address[0]}:{address[1]}"
+            self.agents[agent_id] = channel
+            print(f"Agent {agent_id} joined ({len(self.agents)}/{self.num_agents})")
+
+    def _listen(self, agent_id: str, channel: ControlChannel):
+        """Collect metric messages from one agent"""
+        while True:
+            try:
+                message = channel.receive()
+            except (OSError, ValueError):
+                message = None
+            if message is None:
+                break
+            with self._lock:
+                if message.get("type") in ("metrics", "final"):
+                    self.latest[agent_id] = message
+                if message.get("type") == "final":
+                    self.finals[agent_id] = message
+                    if len(self.finals) == len(self.agents):
+                        self._all_final.set()
+
+        with self._lock:
+            if agent_id not in self.finals:
+                print(f"Agent {agent_id} disconnected before finishing")
+                self.finals[agent_id] = self.latest.get(agent_id, {})
+                if len(self.finals) == len(self.agents):
+                    self._all_final.set()
+
+    def _assign(self):
+        """Send every agent its disjoint slice and the synchronized start time"""
+        self.start_at = time.time() + self.start_delay
+        sensor_ranges = _split(self.num_sensors, len(self.agents))
+        reader_ranges = _split(self.num_readers, len(self.agents))
+
+        for i, (agent_id, channel) in enumerate(self.agents.items()):
+            sensor_offset, sensor_count = sensor_ranges[i]
+            reader_offset, reader_count = reader_ranges[i]
+            assignment = {
+                "type": "assign",
+                "sensorOffset": sensor_offset,
+                "numSensors": sensor_count,
+                "barnIds": self.barn_ids,
+                "readerIds": [
+                    f"RFID-READER-{str(n + 1).zfill(3)}"
+                    for n in range(reader_offset, reader_offset + reader_count)
+                ],
+                "livestockIds": self.livestock_ids[i::len(self.agents)],
+                "agentIndex": i,
+                "numAgents": len(self.agents),
+                "gasInterval": self.gas_interval,
+                "rfidInterval": self.rfid_interval,
+                "startAt": self.start_at,
+            }
+            channel.send(assignment)
+            print(
+                f"  {agent_id}: sensors {sensor_offset + 1}-{sensor_offset + sensor_count}, "
+                f"{reader_count} readers, {len(assignment['livestockIds'])} livestock"
+            )
+
+    def broadcast(self, message: Dict):
+        """Send a message to every agent"""
+        for agent_id, channel in self.agents.items():
+            try:
+                channel.send(message)
+            except OSError as e:
+                print(f"Could not reach agent {agent_id}: {e}")
+
+    def set_rate(self, gas_interval: Optional[float] = None, rfid_interval: Optional[float] = None):
+        """
+        Push new intervals to all agents
+
+        Args:
+            gas_interval: Seconds between readings per sensor
+            rfid_interval: Seconds between RFID events per agent
+        """
+        message = {"type": "rate"}
+        if gas_interval is not None:
+            message["gasInterval"] = gas_interval
+        if rfid_interval is not None:
+            message["rfidInterval"] = rfid_interval
+        print(f"Rate change: gas={gas_interval}s rfid={rfid_interval}s")
+        self.broadcast(message)
+
+    def _print_progress(self):
+        """Print merged progress"""
+        with self._lock:
+            totals = merge_metrics(list(self.latest.values()))
+        elapsed = max(time.time() - self.start_at, 0.001)
+        print(
+            f"[CTRL] t={elapsed:6.0f}s readings={totals['published']} "
+            f"({totals['published'] / elapsed:.1f}/s) events={totals['sent']} "
+            f"puback p99={totals['pubackLatency'].percentile(99):.1f}ms "
+            f"http p99={totals['httpLatency'].percentile(99):.1f}ms"
+        )
+
+    def print_report(self, elapsed: float):
+        """Print and optionally save the merged report"""
+        totals = merge_metrics(list(self.finals.values()))
+        elapsed = max(elapsed, 0.001)
+
+        print()
+        print("=" * 70)
+        print("Distributed Load Report")
+        print("=" * 70)
+        print(f"  Agents:            {len(self.agents)}")
+        print(f"  Duration:          {elapsed:.1f}s")
+        print(f"  Readings:          {totals['published']} ({totals['published'] / elapsed:.1f}/s)")
+        print(f"  Publish failures:  {totals['failed']}")
+        print(f"  Device errors:     {totals['errors']}")
+        print(f"  Unacked at stop:   {totals['pending']}")
+        print(f"  PUBACK latency:    {totals['pubackLatency'].format_summary()}")
+        print(f"  RFID events:       {totals['sent']} ({totals['sent'] / elapsed:.1f}/s)")
+        print(f"  RFID failures:     {totals['httpFailed']}")
+        print(f"  /api/logs latency: {totals['httpLatency'].format_summary()}")
+        print("  Per agent:")
+        for agent_id, report in self.finals.items():
+            gas = report.get("gas") or {}
+            rfid = report.get("rfid") or {}
+            print(f"    {agent_id:24} readings={gas.get('published', 0):<8} events={rfid.get('sent', 0)}")
+        print("=" * 70)
+
+        if self.report_file:
+            report = {
+                "agents": len(self.agents),
+                "duration": elapsed,
+                "readings": totals["published"],
+                "readingsPerSec": totals["published"] / elapsed,
+                "publishFailures": totals["failed"],
+                "deviceErrors": totals["errors"],
+                "pubackLatency": totals["pubackLatency"].summary(),
+                "rfidEvents": totals["sent"],
+                "rfidFailures": totals["httpFailed"],
+                "httpLatency": totals["httpLatency"].summary(),
+                "perAgent": self.finals,
+            }
+            with open(self.report_file, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Report written to {self.report_file}")
+
+    def run(self):
+        """Wait for agents, run the test and report"""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((self.host, self.port))
+        server.listen()
+        print(f"Controller listening on {self.host}:{self.port}, waiting for {self.num_agents} agent(s)...")
+
+        try:
+            self._accept_agents(server)
+            print(f"\nAssigning {self.num_sensors} sensors and {self.num_readers} readers:")
+            self._assign()
+
+            for agent_id, channel in self.agents.items():
+                threading.Thread(
+                    target=self._listen, args=(agent_id, channel), name=f"ctrl-{agent_id}", daemon=True
+                ).start()
+
+            time.sleep(max(self.start_at - time.time(), 0))
+            print(f"\nAll agents started, running for {self.duration}s")
+
+            schedule = list(self.rate_schedule)
+            end_at = self.start_at + self.duration
+            next_progress = time.time() + 10
+            while time.time() < end_at:
+                elapsed = time.time() - self.start_at
+                while schedule and schedule[0][0] <= elapsed:
+                    _, gas_interval, rfid_interval = schedule.pop(0)
+                    self.set_rate(gas_interval, rfid_interval)
+                if time.time() >= next_progress:
+                    self._print_progress()
+                    next_progress += 10
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            print("\n\nStopping agents...")
+        finally:
+            elapsed = time.time() - self.start_at if self.start_at else 0
+            self.broadcast({"type": "stop"})
+            self._all_final.wait(timeout=30)
+            for channel in self.agents.values():
+                channel.close()
+            server.close()
+            if self.start_at:
+                self.print_report(elapsed)
+
+
+class LoadAgent:
+    """Runs the simulators for the slice assigned by the controller"""
+
+    def __init__(
+        self,
+        controller_host: str = "localhost",
+        controller_port: int = 7070,
+        agent_id: Optional[str] = None,
+        broker_host: str = "localhost",
+        broker_port: int = 1883,
+        backend_url: str = "http://localhost:3001",
+        report_interval: int = 5,
+    ):
+        """
+        Initialize the agent
+
+        Args:
+            controller_host: Controller hostname
+            controller_port: Controller control port
+            agent_id: Unique agent name (defaults to host name plus random suffix)
+            broker_host: MQTT broker hostname
+            broker_port: MQTT broker port
+            backend_url: Backend API base URL
+            report_interval: Seconds between metric reports
+        """
+        self.controller_host = controller_host
+        self.controller_port = controller_port
+        self.agent_id = agent_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+        self.broker_host = broker_host
+        self.broker_port = broker_port
+        self.backend_url = backend_url
+        self.report_interval = report_interval
+
+        self.channel: Optional[ControlChannel] = None
+        self.gas: Optional[GasSensorSimulator] = None
+        self.rfid: Optional[RFIDReaderSimulator] = None
+        self.threads: List[threading.Thread] = []
+        self._stopped = threading.Event()
+
+    def _connect(self, timeout: int = 60):
+        """Connect to the controller, retrying until it is up"""
+        deadline = time.time() + timeout
+        while True:
+            try:
+                sock = socket.create_connection((self.controller_host, self.controller_port), timeout=10)
+                sock.settimeout(None)
+                self.channel = ControlChannel(sock)
+                return
+            except OSError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(1)
+
+    def _metrics(self, message_type: str = "metrics") -> Dict:
+        return {
+            "type": message_type,
+            "agentId": self.agent_id,
+            "gas": self.gas.get_metrics() if self.gas else None,
+            "rfid": self.rfid.get_metrics() if self.rfid else None,
+        }
+
+    def _report_loop(self):
+        """Send metrics periodically until stopped"""
+        while not self._stopped.wait(self.report_interval):
+            try:
+                self.channel.send(self._metrics())
+            except OSError:
+                return
+
+    def _start(self, assignment: Dict):
+        """Build the simulators and start them at the synchronized time"""
+        if assignment["numSensors"] > 0:
+            self.gas = GasSensorSimulator(
+                broker_host=self.broker_host,
+                broker_port=self.broker_port,
+                num_sensors=assignment["numSensors"],
+                interval=assignment["gasInterval"],
+                sensor_offset=assignment["sensorOffset"],
+                barn_ids=assignment["barnIds"],
+                codec=os.getenv("PAYLOAD_CODEC", "json"),
+            )
+        if assignment["readerIds"]:
+            self.rfid = RFIDReaderSimulator(
+                backend_url=self.backend_url,
+                interval=assignment["rfidInterval"],
+                mqtt_broker=self.broker_host,
+                mqtt_port=self.broker_port,
+                reader_ids=assignment["readerIds"],
+                livestock_ids=assignment["livestockIds"] or None,
+                barn_ids=assignment["barnIds"] if assignment["livestockIds"] else None,
+            )
+            if not assignment["livestockIds"]:
+                self._fetch_herd_slice(assignment["agentIndex"], assignment["numAgents"])
+
+        wait = assignment["startAt"] - time.time()
+        print(f"Agent {self.agent_id}: starting in {max(wait, 0):.1f}s")
+        time.sleep(max(wait, 0))
+
+        if self.gas:
+            self.gas.connect()
+            self.threads.append(threading.Thread(target=self.gas.run, name="gas-sensors", daemon=True))
+        if self.rfid:
+            self.threads.append(threading.Thread(target=self.rfid.run, name="rfid-readers", daemon=True))
+        self.threads.append(threading.Thread(target=self._report_loop, name="agent-metrics", daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def _fetch_herd_slice(self, index: int, count: int):
+        """
+        Fetch the herd and keep this agent's share of it
+
+        Used when the controller sent no livestock; slicing by agent index
+        keeps agents from sending events for the same animals.
+        """
+        self.rfid._authenticate()
+        if not self.rfid._fetch_livestock():
+            return  # run() retries and reports the failure
+        self.rfid.livestock_ids = self.rfid.livestock_ids[index::count]
+        print(f"Agent {self.agent_id}: {len(self.rfid.livestock_ids)} livestock (slice {index + 1}/{count})")
+        if not self.rfid.livestock_ids:
+            print(f"Agent {self.agent_id}: no livestock left for this agent, not running RFID readers")
+            self.rfid = None
+
+    def _apply_rate(self, message: Dict):
+        if self.gas and "gasInterval" in message:
+            self.gas.interval = message["gasInterval"]
+        if self.rfid and "rfidInterval" in message:
+            self.rfid.interval = message["rfidInterval"]
+        print(f"Agent {self.agent_id}: rate updated {message}")
+
+    def _stop(self):
+        """Stop simulators and send the final report"""
+        self._stopped.set()
+        if self.gas:
+            self.gas.stop()
+        if self.rfid:
+            self.rfid.stop()
+        for thread in self.threads:
+            thread.join(timeout=10)
+        try:
+            self.channel.send(self._metrics("final"))
+        except OSError:
+            pass
+
+    def run(self):
+        """Connect to the controller and follow its commands"""
+        print(f"Agent {self.agent_id}: connecting to controller {self.controller_host}:{self.controller_port}")
+        self._connect()
+        self.channel.send({"type": "hello", "agentId": self.agent_id})
+
+        try:
+            while True:
+                message = self.channel.receive()
+                if message is None:
+                    print(f"Agent {self.agent_id}: controller disconnected")
+                    break
+                if message["type"] == "assign":
+                    self._start(message)
+                elif message["type"] == "rate":
+                    self._apply_rate(message)
+                elif message["type"] == "stop":
+                    break
+        except KeyboardInterrupt:
+            print(f"\n\nStopping agent {self.agent_id}...")
+        finally:
+            self._stop()
+            self.channel.close()
+
+
+def _parse_schedule(spec: str) -> List[Tuple[float, float, float]]:
+    """Parse RATE_SCHEDULE entries "seconds:gasInterval:rfidInterval" (comma-separated)"""
+    schedule = []
+    for entry in spec.split(","):
+        if entry.strip():
+            at, gas_interval, rfid_interval = entry.strip().split(":")
+            schedule.append((float(at), float(gas_interval), float(rfid_interval)))
+    return schedule
+
+
+def _fetch_backend_data(backend_url: str) -> Tuple[List[str], List[str]]:
+    """Fetch livestock and barn IDs once so the controller can split them"""
+    loader = RFIDReaderSimulator(backend_url=backend_url)
+    loader._authenticate()
+    loader._fetch_livestock()
+    loader._fetch_barns()
+    return loader.livestock_ids, loader.barn_ids
+
+
+def main():
+    """Main entry point: `python distributed.py controller|agent`"""
+    role = sys.argv[1] if len(sys.argv) > 1 else "agent"
+    backend_url = os.getenv("BACKEND_API_URL", "http://localhost:3001")
+    controller_port = int(os.getenv("CONTROLLER_PORT", "7070"))
+
+    if role == "controller":
+        livestock_ids: List[str] = []
+        barn_ids = [b.strip() for b in os.getenv("GAS_BARN_IDS", "").split(",") if b.strip()]
+        num_sensors = int(os.getenv("NUM_GAS_SENSORS", "3"))
+        fleet = load_fleet(os.getenv("FLEET_FILE")) if os.getenv("FLEET_FILE") else None
+        if fleet:
+            livestock_ids, barn_ids, num_sensors = fleet["livestockIds"], fleet["barnIds"], fleet["numSensors"]
+        elif os.getenv("LOAD_FETCH_BACKEND_DATA", "true").lower() == "true":
+            livestock_ids, fetched_barns = _fetch_backend_data(backend_url)
+            barn_ids = barn_ids or fetched_barns
+
+        controller = LoadController(
+            host=os.getenv("CONTROLLER_BIND", "0.0.0.0"),
+            port=controller_port,
+            num_agents=int(os.getenv("NUM_AGENTS", "2")),
+            num_sensors=num_sensors,
+            num_readers=int(os.getenv("NUM_RFID_READERS", "3")),
+            gas_interval=float(os.getenv("GAS_SENSOR_INTERVAL", "10")),
+            rfid_interval=float(os.getenv("RFID_EVENT_INTERVAL", "30")),
+            duration=int(os.getenv("LOAD_DURATION", "300")),
+            start_delay=int(os.getenv("LOAD_START_DELAY", "5")),
+            barn_ids=barn_ids,
+            livestock_ids=livestock_ids,
+            rate_schedule=_parse_schedule(os.getenv("RATE_SCHEDULE", "")),
+            report_file=os.getenv("LOAD_REPORT_FILE") or None,
+        )
+        controller.run()
+    elif role == "agent":
+        agent = LoadAgent(
+            controller_host=os.getenv("CONTROLLER_HOST", "localhost"),
+            controller_port=controller_port,
+            agent_id=os.getenv("AGENT_ID") or None,
+            broker_host=os.getenv("MQTT_BROKER_HOST", "localhost"),
+            broker_port=int(os.getenv("MQTT_BROKER_PORT", "1883")),
+            backend_url=backend_url,
+        )
+        agent.run()
+    else:
+        print("Usage: python distributed.py controller|agent")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
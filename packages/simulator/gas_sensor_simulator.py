@@ -11,13 +11,19 @@ Task: 28.1 - Implement gas sensor simulator
 
 import json
 import random
+import threading
 import time
 import os
-from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence
 import paho.mqtt.client as mqtt
 from dotenv import load_dotenv
 
+from gateway_batcher import GatewayBatcher
+from incident_engine import get_incident_engine
+from metrics import LatencyHistogram
+from payload_codecs import get_codec
+from sim_clock import diurnal_factor, diurnal_wave, get_clock
+
 # Load environment variables
 load_dotenv()
 
@@ -31,6 +37,15 @@ class GasSensorSimulator:
         broker_port: int = 1883,
         num_sensors: int = 3,
         interval: int = 10,
+        gateway_mode: bool = False,
+        batch_size: int = 50,
+        batch_linger: float = 1.0,
+        codec: str = "json",
+        sensor_offset: int = 0,
+        barn_ids: Optional[List[str]] = None,
+        diurnal: bool = True,
+        verbose: bool = True,
+        sensors: Optional[Sequence[Dict]] = None,
     ):
         """
         Initialize the gas sensor simulator
@@ -40,44 +55,192 @@ class GasSensorSimulator:
             broker_port: MQTT broker port
             num_sensors: Number of sensors to simulate
             interval: Seconds between readings
+            gateway_mode: Batch readings per barn through an edge gateway
+            batch_size: Maximum readings per gateway batch
+            batch_linger: Maximum seconds a reading waits in a gateway batch
+            codec: Payload codec for readings (see payload_codecs.CODECS);
+                codecs other than json need gateway_mode, since the backend
+                parses sensors/gas/* readings as json
+            sensor_offset: First sensor number minus one (for disjoint fleets)
+            barn_ids: Barns to spread sensors across (round-robin)
+            diurnal: Follow a daily cycle in simulated time (warm afternoons,
+                gas building up in closed barns overnight)
+            verbose: Print every published reading
+            sensors: Prebuilt sensor configurations (e.g. a scenario's
+                SensorView) instead of generating num_sensors sensors
+
+        Raises:
+            ValueError: For an unknown codec, or a codec other than json
+                without gateway_mode
         """
         self.broker_host = broker_host
         self.broker_port = broker_port
-        self.num_sensors = num_sensors
+        self.num_sensors = len(sensors) if sensors is not None else num_sensors
         self.interval = interval
+        self.sensor_offset = sensor_offset
+        self.barn_ids = barn_ids or ["BARN-001"]
+        self.diurnal = diurnal
+        self.verbose = verbose
+        self.clock = get_clock()
+        self.incidents = get_incident_engine()
         self.client = None
-        self.sensors: List[Dict] = []
+        self.sensors: Sequence[Dict] = sensors if sensors is not None else []
         self.running = False
         self.heartbeat_interval = 30  # Send heartbeat every 30 seconds
         self.last_heartbeat = {}
         self.error_probability = 0.02  # 2% chance of error per reading
+        self.codec = get_codec(codec)
+        if self.codec.name != "json" and not gateway_mode:
+            raise ValueError(
+                f"Payload codec {self.codec.name} is only supported in gateway mode "
+                "(the backend parses sensors/gas/* readings as json)"
+            )
+        self.batcher = (
+            GatewayBatcher(
+                self._publish_batch,
+                batch_size=batch_size,
+                linger=batch_linger,
+                encode=self.codec.encode,
+            )
+            if gateway_mode
+            else None
+        )
+
+        # Publish statistics; PUBACK latency is measured per QoS 1 reading
+        self.published = 0
+        self.publish_failed = 0
+        self.errors_sent = 0
+        self.puback_latency = LatencyHistogram()
+        # Messages sent before this moment are not recorded (see reset_latency)
+        self._latency_since = 0.0
+        self._inflight: Dict[int, tuple] = {}
+        self._early_acks: Dict[int, float] = {}
+        self._stats_lock = threading.Lock()
+        # Set by stop() and never cleared: a stopped simulator stays stopped,
+        # even when the stop arrives while it is still connecting
+        self._wake = threading.Event()
+
+        # Runtime control (see control_api.py); the sensor list is replaced,
+        # never modified in place, so the run loop can iterate without a lock
+        self.paused = False
+        self._fleet_lock = threading.Lock()
+        self._next_sensor_number = sensor_offset + self.num_sensors
 
         # Initialize sensors with IDs and barn assignments
-        self._initialize_sensors()
+        if sensors is None:
+            self._initialize_sensors()
+        else:
+            self._print_sensors()
+
+    def _print_sensors(self):
+        """Print the sensor to barn assignment (first 20 sensors)"""
+        print(f"Initialized {self.num_sensors} gas sensors:")
+        for sensor in self.sensors[:20]:
+            print(f"  - {sensor['sensorId']} -> {sensor['barnId']}")
+        if len(self.sensors) > 20:
+            print(f"  ... and {len(self.sensors) - 20} more")
+
+    def _new_sensor(self, number: int, barn_id: str) -> Dict:
+        """Build a sensor configuration with a random baseline"""
+        return {
+            "sensorId": f"GAS-{str(number).zfill(3)}",
+            "barnId": barn_id,
+            "baseline": {
+                "methanePpm": random.uniform(200, 400),
+                "co2Ppm": random.uniform(800, 1500),
+                "nh3Ppm": random.uniform(5, 10),
+                "temperature": random.uniform(20, 25),
+                "humidity": random.uniform(50, 70),
+            },
+        }
 
     def _initialize_sensors(self):
         """Initialize sensor configurations"""
-        barn_ids = [
-            "BARN-001",
-        ]
-
-        for i in range(self.num_sensors):
-            sensor = {
-                "sensorId": f"GAS-{str(i + 1).zfill(3)}",
-                "barnId": barn_ids[i % len(barn_ids)],
-                "baseline": {
-                    "methanePpm": random.uniform(200, 400),
-                    "co2Ppm": random.uniform(800, 1500),
-                    "nh3Ppm": random.uniform(5, 10),
-                    "temperature": random.uniform(20, 25),
-                    "humidity": random.uniform(50, 70),
-                },
-            }
-            self.sensors.append(sensor)
+        barn_ids = self.barn_ids
 
-        print(f"Initialized {self.num_sensors} gas sensors:")
-        for sensor in self.sensors:
-            print(f"  - {sensor['sensorId']} -> {sensor['barnId']}")
+        for i in range(self.sensor_offset, self.sensor_offset + self.num_sensors):
+            self.sensors.append(self._new_sensor(i + 1, barn_ids[i % len(barn_ids)]))
+
+        self._print_sensors()
+
+    def add_sensors(self, count: int, barn_ids: Optional[List[str]] = None) -> List[str]:
+        """
+        Add sensors while the simulator runs
+
+        New sensors continue the GAS-### numbering, announce themselves with
+        an online status and publish from the next round on.
+
+        Args:
+            count: Number of sensors to add
+            barn_ids: Barns for the new sensors (round-robin, default: barn_ids)
+
+        Returns:
+            IDs of the added sensors
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        barn_ids = barn_ids or self.barn_ids
+        with self._fleet_lock:
+            first = self._next_sensor_number
+            added = [
+                self._new_sensor(first + i + 1, barn_ids[i % len(barn_ids)])
+                for i in range(count)
+            ]
+            self._next_sensor_number += count
+            self.sensors = list(self.sensors) + added
+            self.num_sensors = len(self.sensors)
+
+        if self.running:
+            for sensor in added:
+                self._send_device_status(sensor["sensorId"], "online")
+        print(f"[CONTROL] Added {count} gas sensors ({self.num_sensors} total)")
+        return [sensor["sensorId"] for sensor in added]
+
+    def remove_sensors(self, count: int = 0, sensor_ids: Optional[List[str]] = None) -> List[str]:
+        """
+        Remove sensors while the simulator runs
+
+        Removed sensors send an intentional offline status, like on shutdown.
+
+        Args:
+            count: Number of sensors to remove from the end of the fleet
+            sensor_ids: Specific sensors to remove (instead of count)
+
+        Returns:
+            IDs of the removed sensors
+        """
+        with self._fleet_lock:
+            if sensor_ids:
+                wanted = set(sensor_ids)
+                removed = [s for s in self.sensors if s["sensorId"] in wanted]
+                kept = [s for s in self.sensors if s["sensorId"] not in wanted]
+            else:
+                if count < 1:
+                    raise ValueError("count must be at least 1")
+                split = max(len(self.sensors) - count, 0)
+                removed, kept = list(self.sensors[split:]), list(self.sensors[:split])
+            self.sensors = kept
+            self.num_sensors = len(kept)
+
+        for sensor in removed:
+            self.last_heartbeat.pop(sensor["sensorId"], None)
+            if self.running:
+                self._send_device_status(
+                    sensor["sensorId"],
+                    "offline",
+                    reason="intentional",
+                    message="Sensor removed at runtime",
+                )
+        print(f"[CONTROL] Removed {len(removed)} gas sensors ({self.num_sensors} total)")
+        return [sensor["sensorId"] for sensor in removed]
+
+    def pause(self):
+        """Stop publishing readings; heartbeats continue so sensors stay online"""
+        self.paused = True
+
+    def resume(self):
+        """Resume publishing readings"""
+        self.paused = False
 
     def _generate_reading(self, sensor: Dict) -> Dict:
         """
@@ -88,6 +251,9 @@ class GasSensorSimulator:
         - Warning: 20% chance - elevated levels
         - Danger: 5% chance - critical levels
         
+        Active incidents (see incident_engine.py) can force the condition
+        or pull gas levels up for every sensor in a barn at once.
+        
         Args:
             sensor: Sensor configuration
             
@@ -95,16 +261,26 @@ class GasSensorSimulator:
             Sensor reading dictionary
         """
         baseline = sensor["baseline"]
+
+        # Daily cycle: temperature peaks mid-afternoon, humidity the opposite,
+        # gases accumulate overnight while the barn is closed
+        hour = self.clock.hour_of_day()
+        gas_factor = diurnal_factor(hour, peak_hour=4, amplitude=0.2) if self.diurnal else 1.0
+        temperature_shift = 4 * diurnal_wave(hour, peak_hour=14) if self.diurnal else 0.0
+
         condition = random.choices(
             ["normal", "warning", "danger"],
             weights=[0.75, 0.20, 0.05],
         )[0]
+        forced = self.incidents.condition("gas", sensor["sensorId"], sensor["barnId"])
+        if forced:
+            condition = forced
 
         if condition == "normal":
             # Normal conditions - small variations around baseline
-            methane = baseline["methanePpm"] + random.uniform(-50, 50)
-            co2 = baseline["co2Ppm"] + random.uniform(-200, 200)
-            nh3 = baseline["nh3Ppm"] + random.uniform(-2, 2)
+            methane = baseline["methanePpm"] * gas_factor + random.uniform(-50, 50)
+            co2 = baseline["co2Ppm"] * gas_factor + random.uniform(-200, 200)
+            nh3 = baseline["nh3Ppm"] * gas_factor + random.uniform(-2, 2)
         elif condition == "warning":
             # Warning conditions - elevated levels
             methane = random.uniform(500, 900)
@@ -116,9 +292,18 @@ class GasSensorSimulator:
             co2 = random.uniform(3000, 5000)
             nh3 = random.uniform(25, 50)
 
+        # Gradual build-ups (ventilation failure) shift all three gases
+        levels = self.incidents.apply_buildup(
+            "gas",
+            sensor["sensorId"],
+            sensor["barnId"],
+            {"methanePpm": methane, "co2Ppm": co2, "nh3Ppm": nh3},
+        )
+        methane, co2, nh3 = levels["methanePpm"], levels["co2Ppm"], levels["nh3Ppm"]
+
         # Temperature and humidity have smaller variations
-        temperature = baseline["temperature"] + random.uniform(-3, 3)
-        humidity = baseline["humidity"] + random.uniform(-10, 10)
+        temperature = baseline["temperature"] + temperature_shift + random.uniform(-3, 3)
+        humidity = baseline["humidity"] - temperature_shift * 2.5 + random.uniform(-10, 10)
 
         # Ensure values are within realistic bounds
         methane = max(0, min(5000, methane))
@@ -135,7 +320,7 @@ class GasSensorSimulator:
             "nh3Ppm": round(nh3, 2),
             "temperature": round(temperature, 2),
             "humidity": round(humidity, 2),
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": self.clock.iso_now(),
         }
 
         return reading
@@ -144,7 +329,7 @@ class GasSensorSimulator:
         """Callback for when the client connects to the broker"""
         if rc == 0:
             print(f"Connected to MQTT broker at {self.broker_host}:{self.broker_port}")
-            self.running = True
+            self.running = not self._wake.is_set()
             # Send online status for all sensors
             for sensor in self.sensors:
                 self._send_device_status(sensor['sensorId'], 'online')
@@ -159,8 +344,71 @@ class GasSensorSimulator:
         # Note: Can't send offline status here as we're already disconnected
 
     def _on_publish(self, client, userdata, mid):
-        """Callback for when a message is published"""
-        pass  # Silent success
+        """Callback for when a message is published (PUBACK for QoS 1)"""
+        acked_at = time.time()
+        with self._stats_lock:
+            entry = self._inflight.pop(mid, None)
+            if entry is None:
+                # Acknowledged before _publish() registered the mid
+                self._early_acks[mid] = acked_at
+                return
+        sent_at, track_latency = entry
+        if track_latency and sent_at >= self._latency_since:
+            self.puback_latency.record((acked_at - sent_at) * 1000)
+
+    def _publish(self, topic: str, payload, qos: int = 1, track_latency: bool = False):
+        """
+        Publish a message and register it for acknowledgement tracking
+        
+        Args:
+            topic: MQTT topic
+            payload: Encoded payload
+            qos: MQTT QoS level
+            track_latency: Record PUBACK latency for this message
+            
+        Returns:
+            paho MQTTMessageInfo
+        """
+        sent_at = time.time()
+        result = self.client.publish(topic, payload, qos=qos)
+        if result.rc != mqtt.MQTT_ERR_SUCCESS:
+            return result
+        with self._stats_lock:
+            acked_at = self._early_acks.pop(result.mid, None)
+            if acked_at is None:
+                self._inflight[result.mid] = (sent_at, track_latency)
+        if acked_at is not None and track_latency and sent_at >= self._latency_since:
+            self.puback_latency.record((acked_at - sent_at) * 1000)
+        return result
+
+    def reset_latency(self):
+        """
+        Start a new PUBACK latency window
+
+        Acknowledgements of messages sent before the reset still arrive
+        afterwards; they are dropped instead of counted in the new window.
+        """
+        with self._stats_lock:
+            self._latency_since = time.time()
+            self.puback_latency = LatencyHistogram()
+
+    def pending_messages(self) -> int:
+        """Messages published but not yet acknowledged by the broker"""
+        with self._stats_lock:
+            return len(self._inflight)
+
+    def get_metrics(self) -> Dict:
+        """Return publish counters and the PUBACK latency histogram"""
+        return {
+            "sensors": len(self.sensors),
+            "interval": self.interval,
+            "paused": self.paused,
+            "published": self.published,
+            "failed": self.publish_failed,
+            "errors": self.errors_sent,
+            "pending": self.pending_messages(),
+            "pubackLatency": self.puback_latency.to_dict(),
+        }
 
     def _send_device_status(self, device_id: str, status: str, reason: str = None, message: str = None):
         """
@@ -175,7 +423,7 @@ class GasSensorSimulator:
         topic = f"livestock/devices/{device_id}/status"
         payload = {
             "status": status,
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": self.clock.iso_now(),
             "metadata": {
                 "type": "gas_sensor",
                 "version": "1.0.0"
@@ -188,7 +436,7 @@ class GasSensorSimulator:
             payload["message"] = message
             
         try:
-            self.client.publish(topic, json.dumps(payload), qos=1)
+            self._publish(topic, json.dumps(payload), qos=1)
         except Exception as e:
             print(f"Error sending device status: {e}")
 
@@ -201,12 +449,12 @@ class GasSensorSimulator:
         """
         topic = f"livestock/devices/{device_id}/heartbeat"
         payload = {
-            "timestamp": datetime.utcnow().isoformat() + "Z"
+            "timestamp": self.clock.iso_now()
         }
         
         try:
-            self.client.publish(topic, json.dumps(payload), qos=0)
-            self.last_heartbeat[device_id] = time.time()
+            self._publish(topic, json.dumps(payload), qos=0)
+            self.last_heartbeat[device_id] = self.clock.time()
         except Exception as e:
             print(f"Error sending heartbeat: {e}")
 
@@ -223,7 +471,7 @@ class GasSensorSimulator:
         payload = {
             "error": error,
             "message": error,
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": self.clock.iso_now(),
             "metadata": {
                 "type": "gas_sensor"
             }
@@ -233,7 +481,8 @@ class GasSensorSimulator:
             payload["errorCode"] = error_code
             
         try:
-            self.client.publish(topic, json.dumps(payload), qos=1)
+            self._publish(topic, json.dumps(payload), qos=1)
+            self.errors_sent += 1
             print(f"[ERROR] {device_id}: {error}")
         except Exception as e:
             print(f"Error sending device error: {e}")
@@ -256,15 +505,46 @@ class GasSensorSimulator:
             timeout = 10
             start_time = time.time()
             while not self.running and (time.time() - start_time) < timeout:
-                time.sleep(0.1)
+                if self._wake.wait(0.1):
+                    return  # Stopped while connecting; run() disconnects
 
             if not self.running:
                 raise Exception("Failed to connect within timeout")
 
+            if self.batcher:
+                self.batcher.start()
+
         except Exception as e:
             print(f"Error connecting to MQTT broker: {e}")
             raise
 
+    def _publish_batch(self, topic: str, payload: bytes, count: int) -> bool:
+        """
+        Publish a gateway batch message
+
+        Counts the readings it carries as published (or failed), so gateway
+        mode reports the same per-reading throughput as individual publishing.
+        """
+        try:
+            result = self._publish(topic, payload, qos=1, track_latency=True)
+            success = result.rc == mqtt.MQTT_ERR_SUCCESS
+        except Exception as e:
+            print(f"Error publishing batch: {e}")
+            success = False
+        # Batches are published from both the run loop and the linger flusher
+        with self._stats_lock:
+            if success:
+                self.published += count
+            else:
+                self.publish_failed += count
+        return success
+
+    def _heartbeat_if_due(self, sensor_id: str):
+        """Send a heartbeat if the last one is older than heartbeat_interval"""
+        last_hb = self.last_heartbeat.get(sensor_id, 0)
+        if self.clock.time() - last_hb >= self.heartbeat_interval:
+            self._send_heartbeat(sensor_id)
+
     def publish_reading(self, sensor: Dict):
         """
         Publish a sensor reading to MQTT
@@ -273,15 +553,13 @@ class GasSensorSimulator:
             sensor: Sensor configuration
         """
         sensor_id = sensor['sensorId']
+        self._heartbeat_if_due(sensor_id)
         
-        # Check if we should send heartbeat
-        current_time = time.time()
-        last_hb = self.last_heartbeat.get(sensor_id, 0)
-        if current_time - last_hb >= self.heartbeat_interval:
-            self._send_heartbeat(sensor_id)
-        
-        # Simulate random errors
-        if random.random() < self.error_probability:
+        # Simulate random errors (more during error bursts)
+        error_probability = self.incidents.error_probability(
+            "gas", sensor_id, sensor["barnId"], self.error_probability
+        )
+        if random.random() < error_probability:
             error_types = [
                 ("SENSOR_READ_FAIL", "Failed to read sensor data"),
                 ("SENSOR_CALIBRATION", "Sensor calibration error"),
@@ -293,12 +571,23 @@ class GasSensorSimulator:
             return  # Skip this reading
         
         reading = self._generate_reading(sensor)
+
+        # Gateway mode: the batcher publishes on the barn's batch topic and
+        # counts the readings once their batch is published
+        if self.batcher:
+            self.batcher.add(reading)
+            return
+
         topic = f"sensors/gas/{reading['sensorId']}"
-        payload = json.dumps(reading)
+        payload = self.codec.encode(reading)
 
         try:
-            result = self.client.publish(topic, payload, qos=1)
+            result = self._publish(topic, payload, qos=1, track_latency=True)
             if result.rc == mqtt.MQTT_ERR_SUCCESS:
+                with self._stats_lock:
+                    self.published += 1
+                if not self.verbose:
+                    return
                 # Determine alert level for display
                 alert_level = "normal"
                 if (
@@ -321,8 +610,12 @@ class GasSensorSimulator:
                     f"H={reading['humidity']:.1f}%"
                 )
             else:
+                with self._stats_lock:
+                    self.publish_failed += 1
                 print(f"Failed to publish reading for {sensor['sensorId']}")
         except Exception as e:
+            with self._stats_lock:
+                self.publish_failed += 1
             print(f"Error publishing reading: {e}")
             self._send_device_error(sensor_id, f"Publish error: {str(e)}", "MQTT_PUBLISH_FAIL")
 
@@ -330,25 +623,52 @@ class GasSensorSimulator:
         """Run the simulator continuously"""
         print(f"\nStarting gas sensor simulator...")
         print(f"Publishing readings every {self.interval} seconds")
+        if self.clock.mode != "realtime":
+            print(f"Simulation clock: {self.clock.mode} (x{self.clock.speedup or 'max'}) from {self.clock.iso_now()}")
+        if self.codec.name != "json":
+            print(f"Payload codec: {self.codec.name} (gateway batches)")
         print(f"Press Ctrl+C to stop\n")
 
         try:
-            while self.running:
-                # Publish readings for all sensors
-                for sensor in self.sensors:
-                    self.publish_reading(sensor)
-
-                # Wait for next interval
-                time.sleep(self.interval)
+            with self.clock.participant():
+                next_tick = self.clock.time()
+                while self.running and not self._wake.is_set():
+                    # Publish readings for all sensors
+                    for sensor in self.sensors:
+                        if not self.running:
+                            break
+                        if self.incidents.is_offline(
+                            "gas", sensor["sensorId"], sensor["barnId"], self._send_device_status
+                        ):
+                            continue
+                        if self.paused:
+                            self._heartbeat_if_due(sensor["sensorId"])
+                        else:
+                            self.publish_reading(sensor)
+
+                    # Wait for next interval, measured from the start of this
+                    # round so publish time doesn't stretch the period
+                    next_tick = max(next_tick + self.interval, self.clock.time())
+                    self.clock.sleep(next_tick - self.clock.time(), self._wake)
 
         except KeyboardInterrupt:
             print("\n\nStopping gas sensor simulator...")
         finally:
             self.disconnect()
 
+    def stop(self):
+        """Stop the run loop (it disconnects on exit)"""
+        self.running = False
+        self._wake.set()
+
     def disconnect(self):
         """Disconnect from the MQTT broker"""
         if self.client:
+            # Flush readings still waiting in gateway batches
+            if self.batcher:
+                self.batcher.stop()
+                self.batcher.print_report()
+
             # Send offline status for all sensors before disconnecting
             print("\nSending offline status for all sensors...")
             for sensor in self.sensors:
@@ -372,6 +692,10 @@ def main():
     broker_port = int(os.getenv("MQTT_BROKER_PORT", "1883"))
     num_sensors = int(os.getenv("NUM_GAS_SENSORS", "3"))
     interval = int(os.getenv("GAS_SENSOR_INTERVAL", "10"))
+    gateway_mode = os.getenv("GATEWAY_MODE", "false").lower() == "true"
+    batch_size = int(os.getenv("GATEWAY_BATCH_SIZE", "50"))
+    batch_linger = int(os.getenv("GATEWAY_LINGER_MS", "1000")) / 1000
+    codec = os.getenv("PAYLOAD_CODEC", "json")
 
     # Create and run simulator
     simulator = GasSensorSimulator(
@@ -379,6 +703,10 @@ def main():
         broker_port=broker_port,
         num_sensors=num_sensors,
         interval=interval,
+        gateway_mode=gateway_mode,
+        batch_size=batch_size,
+        batch_linger=batch_linger,
+        codec=codec,
     )
 
     try:
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Edge Gateway Batcher for Livestock IoT Simulator
+
+Packs readings from many gas sensors in a barn into a single MQTT message on
+`sensors/gateway/{barnId}/batch`, emulating an edge gateway in front of the
+sensors. A batch is flushed when it reaches the configured size or when its
+oldest reading has waited longer than the linger time.
+
+Tracks how many messages and bytes batching saves compared to publishing each
+reading on `sensors/gas/{sensorId}`. Bytes are only counted for batches that
+were actually published.
+
+Requirements: Simulator for load testing
+"""
+
+import json
+import threading
+from typing import Callable, Dict, List
+
+from sim_clock import get_clock
+
+
+class GatewayBatcher:
+    """Aggregates sensor readings per barn into batched MQTT messages"""
+
+    # Approximate MQTT PUBLISH framing: fixed header (2) + topic length
+    # prefix (2) + packet identifier for QoS 1 (2). Topic bytes are added
+    # separately since they differ per message.
+    PUBLISH_OVERHEAD = 6
+
+    def __init__(
+        self,
+        publish: Callable[[str, bytes, int], bool],
+        batch_size: int = 50,
+        linger: float = 1.0,
+        encode: Callable[[Dict], bytes] = lambda document: json.dumps(document).encode("utf-8"),
+    ):
+        """
+        Initialize the gateway batcher
+
+        Args:
+            publish: Function publishing (topic, payload, reading count) and
+                returning success
+            batch_size: Maximum readings per batch message
+            linger: Maximum seconds a reading waits before its batch is flushed
+            encode: Payload encoder
+        """
+        self.publish = publish
+        self.batch_size = max(1, batch_size)
+        self.linger = linger
+        self.encode = encode
+        self.clock = get_clock()
+
+        self.buffers: Dict[str, List[Dict]] = {}
+        self.buffer_started: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._stop = threading.Event()
+
+        # Savings accounting
+        self.readings = 0
+        self.delivered = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.bytes_individual = 0
+        self.bytes_batched = 0
+
+    @staticmethod
+    def batch_topic(barn_id: str) -> str:
+        """Topic a gateway publishes batches for a barn on"""
+        return f"sensors/gateway/{barn_id}/batch"
+
+    def add(self, reading: Dict):
+        """
+        Queue a reading, flushing its barn's batch when full
+
+        Args:
+            reading: Sensor reading as produced by GasSensorSimulator
+        """
+        barn_id = reading["barnId"]
+
+        with self._lock:
+            self.readings += 1
+            buffer = self.buffers.setdefault(barn_id, [])
+            if not buffer:
+                self.buffer_started[barn_id] = self.clock.time()
+            buffer.append(reading)
+            if len(buffer) < self.batch_size:
+                return
+            batch = self._take(barn_id)
+
+        self._send(barn_id, batch)
+
+    def _take(self, barn_id: str) -> List[Dict]:
+        """Remove and return a barn's buffered readings (lock must be held)"""
+        self.buffer_started.pop(barn_id, None)
+        return self.buffers.pop(barn_id, [])
+
+    def _send(self, barn_id: str, readings: List[Dict]):
+        """Publish one batch message"""
+        if not readings:
+            return
+
+        # Readings inherit barnId from the batch envelope
+        topic = self.batch_topic(barn_id)
+        payload = self.encode({
+            "gatewayId": f"GW-{barn_id}",
+            "barnId": barn_id,
+            "count": len(readings),
+            "readings": [{k: v for k, v in r.items() if k != "barnId"} for r in readings],
+        })
+
+        if self.publish(topic, payload, len(readings)):
+            self.batches += 1
+            self.delivered += len(readings)
+            self.bytes_batched += len(topic) + len(payload) + self.PUBLISH_OVERHEAD
+            self.bytes_individual += self._individual_size(barn_id, readings, len(payload))
+            print(f"[BATCH  ] GW-{barn_id}: {len(readings)} readings, {len(payload)} bytes")
+        else:
+            self.failed_batches += 1
+            print(f"Failed to publish batch for {barn_id}")
+
+    def _individual_size(self, barn_id: str, readings: List[Dict], payload_size: int) -> int:
+        """
+        Estimate the bytes the readings of a published batch would have taken
+        as individual messages, without encoding each reading again
+
+        The batch payload already holds every reading minus its barnId, so the
+        estimate is the payload without its envelope, plus the barnId field and
+        the topic and framing of one message per reading.
+        """
+        envelope = len(self.encode({
+            "gatewayId": f"GW-{barn_id}",
+            "barnId": barn_id,
+            "count": len(readings),
+            "readings": [],
+        }))
+        barn_field = len(self.encode({"barnId": barn_id})) - len(self.encode({}))
+        topics = sum(len("sensors/gas/") + len(r["sensorId"]) for r in readings)
+        return (
+            payload_size - envelope
+            + len(readings) * (barn_field + self.PUBLISH_OVERHEAD)
+            + topics
+        )
+
+    def flush_expired(self):
+        """Flush every batch whose oldest reading exceeded the linger time"""
+        now = self.clock.time()
+        with self._lock:
+            expired = [
+                barn_id
+                for barn_id, started in self.buffer_started.items()
+                if now - started >= self.linger
+            ]
+            batches = [(barn_id, self._take(barn_id)) for barn_id in expired]
+
+        for barn_id, readings in batches:
+            self._send(barn_id, readings)
+
+    def flush_all(self):
+        """Flush every pending batch regardless of age"""
+        with self._lock:
+            batches = [(barn_id, self._take(barn_id)) for barn_id in list(self.buffers)]
+
+        for barn_id, readings in batches:
+            self._send(barn_id, readings)
+
+    def _flush_loop(self):
+        """
+        Background loop enforcing the linger time
+
+        Polls in wall-clock time while buffer ages are in simulated time, so
+        the flusher never holds back a fast (discrete-event) clock.
+        """
+        tick = max(self.linger / 4 / (self.clock.speedup or 1), 0.01)
+        while not self._stop.wait(tick):
+            self.flush_expired()
+
+    def start(self):
+        """Start the background linger flusher"""
+        self._stop.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, name="gateway-batcher", daemon=True)
+        self._flusher.start()
+
+    def stop(self):
+        """Stop the flusher and publish any remaining readings"""
+        self._stop.set()
+        if self._flusher:
+            self._flusher.join(timeout=2)
+            self._flusher = None
+        self.flush_all()
+
+    def stats(self) -> Dict:
+        """Return message and byte savings"""
+        saved_messages = self.delivered - self.batches
+        saved_bytes = self.bytes_individual - self.bytes_batched
+        return {
+            "readings": self.readings,
+            "delivered": self.delivered,
+            "batches": self.batches,
+            "failedBatches": self.failed_batches,
+            "messagesSaved": saved_messages,
+            "bytesIndividual": self.bytes_individual,
+            "bytesBatched": self.bytes_batched,
+            "bytesSaved": saved_bytes,
+            "avgBatchSize": round(self.delivered / self.batches, 1) if self.batches else 0.0,
+        }
+
+    def print_report(self):
+        """Print message and byte savings"""
+        s = self.stats()
+        message_ratio = s["messagesSaved"] / s["delivered"] * 100 if s["delivered"] else 0.0
+        byte_ratio = s["bytesSaved"] / s["bytesIndividual"] * 100 if s["bytesIndividual"] else 0.0
+        print("\nGateway batching:")
+        print(
+            f"  Readings:       {s['delivered']}/{s['readings']} delivered in {s['batches']} batches "
+            f"(avg {s['avgBatchSize']}, {s['failedBatches']} failed)"
+        )
+        print(f"  Messages saved: {s['messagesSaved']} ({message_ratio:.1f}%)")
+        print(
+            f"  Bytes:          {s['bytesBatched']} batched vs {s['bytesIndividual']} individual "
+            f"({byte_ratio:.1f}% saved)"
+        )
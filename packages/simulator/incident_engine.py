@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Correlated Incident Engine for Livestock IoT Simulator
+
+Without incidents every reading picks its condition and every device its
+errors independently. Real incidents hit groups of devices at once, and
+those spiky, alert-heavy loads stress the backend's alert path and
+WebSocket broadcasts the most:
+
+- condition: every selected gas sensor reports danger/warning/normal levels
+- gasBuildup: gas levels climb gradually towards danger (ventilation failure)
+- disconnect: selected devices go offline together and reconnect at the
+  end, optionally spread over a window (power cut, network outage)
+- errorBurst: selected devices report errors at a high rate
+
+An incident is time-bounded in simulated time and applies to devices chosen
+by a DeviceSelector (kind, barn, ID prefix, explicit IDs, fraction). The gas
+and RFID simulators share one engine (get_incident_engine) and consult it for
+each reading or event; with no incidents the checks return immediately.
+
+Incidents are created from the same spec dicts in scenario files and the
+control API, e.g. {"type": "disconnect", "barn": "BARN-001",
+"duration": 600, "reconnectSpread": 60}.
+
+Requirements: Simulator for load testing
+"""
+
+import random
+import threading
+import zlib
+from typing import Callable, Dict, List, Optional
+
+from sim_clock import get_clock
+
+CONDITIONS = ("normal", "warning", "danger")
+
+# Gas levels a build-up converges to (danger thresholds are 1000/3000/25)
+BUILDUP_LEVELS = {"methanePpm": 1800, "co2Ppm": 4500, "nh3Ppm": 45}
+
+# Callback used to announce status changes: (device_id, status, reason, message)
+StatusCallback = Callable[[str, str, Optional[str], Optional[str]], None]
+
+
+def _unit_hash(device_id: str, salt: str = "") -> float:
+    """Stable value in [0, 1) per device, so selections repeat across runs"""
+    return zlib.crc32(f"{salt}{device_id}".encode()) / 2**32
+
+
+class DeviceSelector:
+    """Chooses the devices an incident applies to"""
+
+    def __init__(
+        self,
+        kind: Optional[str] = None,
+        barn: Optional[str] = None,
+        prefix: Optional[str] = None,
+        devices: Optional[List[str]] = None,
+        fraction: float = 1.0,
+    ):
+        """
+        Args:
+            kind: "gas" or "rfid" (default: both)
+            barn: Devices in this barn (gas sensors carry a barn ID)
+            prefix: Devices whose ID starts with this prefix
+            devices: Explicit device IDs
+            fraction: Share of the matching devices affected (stable per ID)
+
+        A device matches when it has the right kind and matches any of barn,
+        prefix or devices; with none of them given every device matches.
+        """
+        if not 0 < fraction <= 1:
+            raise ValueError("fraction must be between 0 and 1")
+        self.kind = kind
+        self.barn = barn
+        self.prefix = prefix
+        self.devices = set(devices) if devices else None
+        self.fraction = fraction
+
+    def matches(self, kind: str, device_id: str, barn_id: Optional[str] = None) -> bool:
+        if self.kind and self.kind != kind:
+            return False
+        if self.barn or self.prefix or self.devices:
+            if not (
+                (self.barn and barn_id == self.barn)
+                or (self.prefix and device_id.startswith(self.prefix))
+                or (self.devices and device_id in self.devices)
+            ):
+                return False
+        return self.fraction >= 1 or _unit_hash(device_id, "fraction") < self.fraction
+
+    def describe(self) -> Dict:
+        target = {"kind": self.kind, "barn": self.barn, "prefix": self.prefix}
+        if self.devices:
+            target["devices"] = len(self.devices)
+        if self.fraction < 1:
+            target["fraction"] = self.fraction
+        return {key: value for key, value in target.items() if value is not None}
+
+
+class Incident:
+    """A perturbation of selected devices between start and end (simulated time)"""
+
+    type = "incident"
+
+    def __init__(self, selector: DeviceSelector, start: float, duration: float):
+        if duration <= 0:
+            raise ValueError("Incident duration must be positive")
+        self.selector = selector
+        self.start = start
+        self.end = start + duration
+
+    def active(self, now: float) -> bool:
+        return self.start <= now < self.end
+
+    def finished(self, now: float) -> bool:
+        return now >= self.end
+
+    def describe(self, now: float) -> Dict:
+        return {
+            "type": self.type,
+            "target": self.selector.describe(),
+            "startsIn": round(max(self.start - now, 0), 1),
+            "remaining": round(max(self.end - max(now, self.start), 0), 1),
+        }
+
+
+class ConditionIncident(Incident):
+    """Forces gas sensors into one condition"""
+
+    type = "condition"
+
+    def __init__(self, selector: DeviceSelector, start: float, duration: float, condition: str = "danger"):
+        if condition not in CONDITIONS:
+            raise ValueError(f"condition must be one of: {', '.join(CONDITIONS)}")
+        super().__init__(selector, start, duration)
+        self.condition = condition
+
+    def describe(self, now: float) -> Dict:
+        return {**super().describe(now), "condition": self.condition}
+
+
+class GasBuildupIncident(Incident):
+    """Gas levels rise towards danger levels over a ramp and stay there"""
+
+    type = "gasBuildup"
+
+    def __init__(self, selector: DeviceSelector, start: float, duration: float, ramp: Optional[float] = None, peak: float = 1.0):
+        """
+        Args:
+            ramp: Seconds to reach the peak (default: half the duration)
+            peak: Share of the way to BUILDUP_LEVELS at the peak (0-1)
+        """
+        super().__init__(selector, start, duration)
+        self.ramp = ramp if ramp is not None else duration / 2
+        self.peak = max(0.0, min(1.0, peak))
+
+    def severity(self, now: float) -> float:
+        """0 at the start, rising linearly to peak after ramp seconds"""
+        if self.ramp <= 0:
+            return self.peak
+        return self.peak * min((now - self.start) / self.ramp, 1.0)
+
+    def describe(self, now: float) -> Dict:
+        severity = self.severity(now) if self.active(now) else 0.0
+        return {**super().describe(now), "severity": round(severity, 2)}
+
+
+class ErrorBurstIncident(Incident):
+    """Raises the per-reading error probability"""
+
+    type = "errorBurst"
+
+    def __init__(self, selector: DeviceSelector, start: float, duration: float, probability: float = 0.5):
+        if not 0 <= probability <= 1:
+            raise ValueError("probability must be between 0 and 1")
+        super().__init__(selector, start, duration)
+        self.probability = probability
+
+    def describe(self, now: float) -> Dict:
+        return {**super().describe(now), "probability": self.probability}
+
+
+class DisconnectIncident(Incident):
+    """Devices go offline together and reconnect, optionally spread out"""
+
+    type = "disconnect"
+
+    def __init__(
+        self,
+        selector: DeviceSelector,
+        start: float,
+        duration: float,
+        reconnect_spread: float = 0.0,
+        reason: str = "network",
+    ):
+        """
+        Args:
+            reconnect_spread: Seconds over which devices come back after the
+                end (0 = all at once, a reconnect storm)
+            reason: Disconnect reason sent with the offline status
+                (network, timeout, error)
+        """
+        super().__init__(selector, start, duration)
+        self.reconnect_spread = reconnect_spread
+        self.reason = reason
+        # Devices that announced offline and have not reconnected yet
+        self.offline = set()
+        self._lock = threading.Lock()
+
+    def reconnect_at(self, device_id: str) -> float:
+        return self.end + self.reconnect_spread * _unit_hash(device_id, "reconnect")
+
+    def finished(self, now: float) -> bool:
+        # Wait for every device to reconnect; give up an hour after the spread
+        # in case a device was removed while offline
+        done = now >= self.end + self.reconnect_spread
+        return done and (not self.offline or now >= self.end + self.reconnect_spread + 3600)
+
+    def is_offline(self, device_id: str, now: float, announce: StatusCallback) -> bool:
+        """
+        Whether a device is offline, announcing status changes on the way
+
+        Args:
+            device_id: Selected device
+            now: Current simulated time
+            announce: Sends a device status (the simulator's _send_device_status)
+        """
+        if now < self.start:
+            return False
+        with self._lock:
+            if now < self.end:
+                if device_id not in self.offline:
+                    self.offline.add(device_id)
+                    announce(device_id, "offline", self.reason, "Incident: connection lost")
+                return True
+            if device_id not in self.offline:
+                return False
+            if now < self.reconnect_at(device_id):
+                return True
+            self.offline.discard(device_id)
+        announce(device_id, "online", None, None)
+        return False
+
+    def pending(self, now: float) -> bool:
+        """Whether devices are (or may still go) offline or have to reconnect"""
+        return now >= self.start and (now < self.end or bool(self.offline))
+
+    def end_early(self, now: float):
+        """End the outage now; offline devices reconnect on their next check"""
+        with self._lock:
+            self.end = min(self.end, now)
+            self.reconnect_spread = 0.0
+
+    def describe(self, now: float) -> Dict:
+        return {**super().describe(now), "offline": len(self.offline), "reconnectSpread": self.reconnect_spread}
+
+
+class IncidentEngine:
+    """Holds scheduled incidents and answers per-device questions"""
+
+    def __init__(self):
+        self.clock = get_clock()
+        # Replaced, never modified in place, so readers need no lock
+        self.incidents: List[Incident] = []
+        self._lock = threading.Lock()
+
+    def add(self, incident: Incident) -> Incident:
+        """Schedule an incident"""
+        with self._lock:
+            self.incidents = self.incidents + [incident]
+        return incident
+
+    def clear(self):
+        """
+        Drop all incidents
+
+        Disconnects with devices still offline are ended instead of dropped,
+        so those devices announce themselves online on their next check.
+        """
+        now = self.clock.time()
+        with self._lock:
+            ending = [
+                incident
+                for incident in self.incidents
+                if isinstance(incident, DisconnectIncident) and incident.offline
+            ]
+            for incident in ending:
+                incident.end_early(now)
+            self.incidents = ending
+
+    def _current(self) -> List[Incident]:
+        """Incidents that are not finished, pruning finished ones"""
+        incidents = self.incidents
+        if not incidents:
+            return incidents
+        now = self.clock.time()
+        if any(incident.finished(now) for incident in incidents):
+            with self._lock:
+                self.incidents = [i for i in self.incidents if not i.finished(now)]
+                incidents = self.incidents
+        return incidents
+
+    def condition(self, kind: str, device_id: str, barn_id: Optional[str] = None) -> Optional[str]:
+        """Forced condition for a gas sensor, or None (latest incident wins)"""
+        incidents = self._current()
+        if not incidents:
+            return None
+        now = self.clock.time()
+        for incident in reversed(incidents):
+            if (
+                isinstance(incident, ConditionIncident)
+                and incident.active(now)
+                and incident.selector.matches(kind, device_id, barn_id)
+            ):
+                return incident.condition
+        return None
+
+    def apply_buildup(self, kind: str, device_id: str, barn_id: Optional[str], levels: Dict[str, float]) -> Dict[str, float]:
+        """
+        Pull gas levels towards BUILDUP_LEVELS by the strongest active build-up
+
+        Args:
+            levels: methanePpm/co2Ppm/nh3Ppm as generated
+
+        Returns:
+            The adjusted levels (unchanged without a build-up)
+        """
+        incidents = self._current()
+        if not incidents:
+            return levels
+        now = self.clock.time()
+        severity = max(
+            (
+                incident.severity(now)
+                for incident in incidents
+                if isinstance(incident, GasBuildupIncident)
+                and incident.active(now)
+                and incident.selector.matches(kind, device_id, barn_id)
+            ),
+            default=0.0,
+        )
+        if severity <= 0:
+            return levels
+        # Keep some sensor noise around the target so peaks don't flatline
+        return {
+            key: value + severity * (BUILDUP_LEVELS[key] * random.uniform(0.9, 1.1) - value)
+            if key in BUILDUP_LEVELS
+            else value
+            for key, value in levels.items()
+        }
+
+    def error_probability(self, kind: str, device_id: str, barn_id: Optional[str], base: float) -> float:
+        """Error probability for a device: the base rate or an active burst"""
+        incidents = self._current()
+        if not incidents:
+            return base
+        now = self.clock.time()
+        for incident in incidents:
+            if (
+                isinstance(incident, ErrorBurstIncident)
+                and incident.active(now)
+                and incident.selector.matches(kind, device_id, barn_id)
+            ):
+                base = max(base, incident.probability)
+        return base
+
+    def has_disconnects(self, kind: str) -> bool:
+        """
+        Whether a disconnect of this device kind is in progress
+
+        Lets a simulator skip checking each of its devices when no device
+        can change state.
+        """
+        incidents = self._current()
+        if not incidents:
+            return False
+        now = self.clock.time()
+        return any(
+            isinstance(incident, DisconnectIncident)
+            and incident.selector.kind in (None, kind)
+            and incident.pending(now)
+            for incident in incidents
+        )
+
+    def is_offline(self, kind: str, device_id: str, barn_id: Optional[str], announce: StatusCallback) -> bool:
+        """
+        Whether a device is disconnected by an incident
+
+        Offline and online statuses are sent through announce the first time
+        a device is checked after its state changes, so call this for every
+        device on every round (also while paused).
+        """
+        incidents = self._current()
+        if not incidents:
+            return False
+        now = self.clock.time()
+        offline = False
+        for incident in incidents:
+            if isinstance(incident, DisconnectIncident) and incident.selector.matches(kind, device_id, barn_id):
+                # Check all so overlapping outages each track their devices
+                offline = incident.is_offline(device_id, now, announce) or offline
+        return offline
+
+    def describe(self) -> List[Dict]:
+        """Summaries of current incidents (for status output)"""
+        now = self.clock.time()
+        return [incident.describe(now) for incident in self._current()]
+
+
+def incident_from_spec(spec: Dict, start: Optional[float] = None) -> Incident:
+    """
+    Build an incident from a scenario or control API spec
+
+    Args:
+        spec: {"type": ..., "duration": seconds, target fields, type fields}.
+            Types: danger, warning, normal (condition), gasBuildup (ramp,
+            peak), errorBurst (probability), disconnect (reconnectSpread,
+            reason). Target fields: kind, barn, prefix, devices, fraction.
+        start: Simulated start time (default: now)
+
+    Returns:
+        The incident (not yet added to an engine)
+    """
+    if start is None:
+        start = get_clock().time()
+    incident_type = spec.get("type", "danger")
+    duration = float(spec.get("duration", 60))
+    kind = spec.get("kind")
+    if incident_type in CONDITIONS + ("gasBuildup",):
+        kind = "gas"
+    selector = DeviceSelector(
+        kind=kind,
+        barn=spec.get("barn"),
+        prefix=spec.get("prefix"),
+        devices=spec.get("devices"),
+        fraction=float(spec.get("fraction", 1.0)),
+    )
+
+    if incident_type in CONDITIONS:
+        return ConditionIncident(selector, start, duration, condition=incident_type)
+    if incident_type == "gasBuildup":
+        ramp = spec.get("ramp")
+        return GasBuildupIncident(
+            selector,
+            start,
+            duration,
+            ramp=float(ramp) if ramp is not None else None,
+            peak=float(spec.get("peak", 1.0)),
+        )
+    if incident_type == "errorBurst":
+        return ErrorBurstIncident(selector, start, duration, probability=float(spec.get("probability", 0.5)))
+    if incident_type == "disconnect":
+        return DisconnectIncident(
+            selector,
+            start,
+            duration,
+            reconnect_spread=float(spec.get("reconnectSpread", 0)),
+            reason=spec.get("reason", "network"),
+        )
+    raise ValueError(
+        f"Unknown incident type '{incident_type}' "
+        f"(choose from: {', '.join(CONDITIONS)}, gasBuildup, errorBurst, disconnect)"
+    )
+
+
+_engine: Optional[IncidentEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_incident_engine() -> IncidentEngine:
+    """Return the process-wide incident engine shared by all simulators"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = IncidentEngine()
+        return _engine
@@ -9,33 +9,58 @@ Task: 28 - Python Simulator
 """
 
 import os
-import sys
 import threading
 import time
+from typing import Dict, Optional
 from dotenv import load_dotenv
 
 # Import simulators
+from control_api import control_api_from_env
 from gas_sensor_simulator import GasSensorSimulator
+from profiler import install_signal_handler, profiler_from_env
+from provisioning import load_fleet
 from rfid_reader_simulator import RFIDReaderSimulator
+from scenario import Scenario, ScenarioRunner, load_scenario
+from sim_clock import get_clock
+from soak_monitor import soak_monitor_from_env
+from websocket_load_simulator import WebSocketLoadSimulator
+from workload_generators import MixedWorkloadSimulator, WorkloadProfile
 
 # Load environment variables
 load_dotenv()
 
+# Running simulator instances by name, for monitoring and runtime control
+simulators = {}
 
-def run_gas_sensors():
+
+def run_gas_sensors(fleet: Optional[Dict] = None, scenario: Optional[Scenario] = None):
     """Run gas sensor simulator in a thread"""
     try:
         broker_host = os.getenv("MQTT_BROKER_HOST", "localhost")
         broker_port = int(os.getenv("MQTT_BROKER_PORT", "1883"))
         num_sensors = int(os.getenv("NUM_GAS_SENSORS", "3"))
         interval = int(os.getenv("GAS_SENSOR_INTERVAL", "10"))
+        barn_ids = None
+        if fleet:
+            num_sensors, barn_ids = fleet["numSensors"], fleet["barnIds"]
+
+        sensors = None
+        if scenario:
+            sensors, interval = scenario.sensors(), scenario.gas_interval
 
         simulator = GasSensorSimulator(
             broker_host=broker_host,
             broker_port=broker_port,
             num_sensors=num_sensors,
             interval=interval,
+            gateway_mode=os.getenv("GATEWAY_MODE", "false").lower() == "true",
+            batch_size=int(os.getenv("GATEWAY_BATCH_SIZE", "50")),
+            batch_linger=int(os.getenv("GATEWAY_LINGER_MS", "1000")) / 1000,
+            codec=os.getenv("PAYLOAD_CODEC", "json"),
+            barn_ids=barn_ids,
+            sensors=sensors,
         )
+        simulators["gas"] = simulator
 
         simulator.connect()
         simulator.run()
@@ -43,7 +68,7 @@ def run_gas_sensors():
         print(f"Gas sensor simulator error: {e}")
 
 
-def run_rfid_readers():
+def run_rfid_readers(fleet: Optional[Dict] = None, scenario: Optional[Scenario] = None):
     """Run RFID reader simulator in a thread"""
     try:
         backend_url = os.getenv("BACKEND_API_URL", "http://localhost:3001")
@@ -52,18 +77,75 @@ def run_rfid_readers():
         # Give gas sensors time to start first
         time.sleep(2)
 
+        livestock_ids = fleet["livestockIds"] if fleet else None
+        barn_ids = fleet["barnIds"] if fleet else None
+        reader_ids = None
+        profile = os.getenv("WORKLOAD_PROFILE")
+        if scenario:
+            interval = scenario.rfid_interval
+            livestock_ids = scenario.livestock_ids()
+            barn_ids = scenario.barn_ids() if livestock_ids is not None else None
+            reader_ids = scenario.reader_ids()
+            profile = scenario.workload
+
         simulator = RFIDReaderSimulator(
             backend_url=backend_url,
             interval=interval,
+            livestock_ids=livestock_ids,
+            barn_ids=barn_ids,
+            reader_ids=reader_ids,
+        )
+        simulators["rfid"] = simulator
+
+        # Mix weight entries and health events into the write load when a
+        # workload profile is configured
+        if profile:
+            workload = MixedWorkloadSimulator(
+                simulator,
+                WorkloadProfile.parse(profile),
+                interval=float(os.getenv("WORKLOAD_INTERVAL", str(interval))),
+            )
+            simulators["workload"] = workload
+            workload.run()
+        else:
+            simulator.run()
+    except Exception as e:
+        print(f"RFID reader simulator error: {e}")
+
+
+def run_websocket_clients():
+    """Run WebSocket dashboard load simulator in a thread"""
+    try:
+        backend_url = os.getenv("BACKEND_WS_URL") or os.getenv("BACKEND_API_URL", "http://localhost:3001")
+        num_clients = int(os.getenv("NUM_WS_CLIENTS", "0"))
+        barn_ids = [b.strip() for b in os.getenv("WS_BARN_IDS", "BARN-001").split(",") if b.strip()]
+
+        # Give sensors time to start broadcasting first
+        time.sleep(3)
+
+        simulator = WebSocketLoadSimulator(
+            backend_url=backend_url,
+            num_clients=num_clients,
+            barn_ids=barn_ids,
+            duration=int(os.getenv("WS_TEST_DURATION", "60")),
+            connect_concurrency=int(os.getenv("WS_CONNECT_CONCURRENCY", "100")),
         )
 
         simulator.run()
     except Exception as e:
-        print(f"RFID reader simulator error: {e}")
+        print(f"WebSocket load simulator error: {e}")
 
 
 def main():
     """Main entry point - runs both simulators concurrently"""
+    # Barns, sensors and livestock created by provisioning.py (optional)
+    fleet = load_fleet(os.getenv("FLEET_FILE")) if os.getenv("FLEET_FILE") else None
+
+    # Declarative scenario (optional); replaces fleet and rate env vars
+    scenario = load_scenario(os.getenv("SCENARIO_FILE")) if os.getenv("SCENARIO_FILE") else None
+    if scenario:
+        scenario.configure_clock()
+
     print("=" * 70)
     print("Livestock IoT Monitoring System - Simulator")
     print("=" * 70)
@@ -75,36 +157,90 @@ def main():
     print("Configuration:")
     print(f"  MQTT Broker: {os.getenv('MQTT_BROKER_HOST', 'localhost')}:{os.getenv('MQTT_BROKER_PORT', '1883')}")
     print(f"  Backend API: {os.getenv('BACKEND_API_URL', 'http://localhost:3001')}")
-    print(f"  Gas Sensors: {os.getenv('NUM_GAS_SENSORS', '3')}")
-    print(f"  Gas Interval: {os.getenv('GAS_SENSOR_INTERVAL', '10')}s")
-    print(f"  RFID Interval: {os.getenv('RFID_EVENT_INTERVAL', '30')}s")
+    if scenario:
+        print(f"  Scenario: {scenario.summary()}")
+    elif fleet:
+        print(f"  Fleet: {len(fleet['barnIds'])} barns, {fleet['numSensors']} sensors, {len(fleet['livestockIds'])} livestock")
+    else:
+        print(f"  Gas Sensors: {os.getenv('NUM_GAS_SENSORS', '3')}")
+    print(f"  Gateway Mode: {os.getenv('GATEWAY_MODE', 'false')}")
+    if scenario:
+        print(f"  Gas Interval: {scenario.gas_interval:g}s")
+        print(f"  RFID Interval: {scenario.rfid_interval:g}s")
+        print(f"  Workload Profile: {scenario.workload or 'rfid only'}")
+    else:
+        print(f"  Gas Interval: {os.getenv('GAS_SENSOR_INTERVAL', '10')}s")
+        print(f"  RFID Interval: {os.getenv('RFID_EVENT_INTERVAL', '30')}s")
+        print(f"  Workload Profile: {os.getenv('WORKLOAD_PROFILE', 'rfid only')}")
+    print(f"  WebSocket Clients: {os.getenv('NUM_WS_CLIENTS', '0')}")
+    print(f"  Soak Output: {os.getenv('SOAK_OUTPUT', 'disabled')}")
+    print(f"  Simulation Clock: {get_clock().mode}")
+    print(f"  Control API: {os.getenv('CONTROL_API_PORT', 'disabled')}")
     print()
     print("Press Ctrl+C to stop all simulators")
     print("=" * 70)
     print()
 
     # Create threads for each simulator
-    gas_thread = threading.Thread(target=run_gas_sensors, daemon=True)
-    rfid_thread = threading.Thread(target=run_rfid_readers, daemon=True)
+    gas_thread = threading.Thread(target=run_gas_sensors, args=(fleet, scenario), name="gas-sensors", daemon=True)
+    rfid_thread = threading.Thread(target=run_rfid_readers, args=(fleet, scenario), name="rfid-readers", daemon=True)
+    ws_thread = threading.Thread(target=run_websocket_clients, name="websocket-clients", daemon=True)
+
+    # Sampling profiler, toggled at runtime with SIGUSR1
+    profiler = profiler_from_env()
+    install_signal_handler(profiler)
+    if os.getenv("PROFILE_ON_START", "false").lower() == "true":
+        profiler.start()
+
+    # Resource and rate drift tracking for long soak runs
+    soak = soak_monitor_from_env(simulators)
+    # Time zero of the schedule is when the gas and RFID loops run
+    runner = ScenarioRunner(scenario, simulators, loops=2) if scenario else None
 
+    # Live rate, fleet and fault changes over local HTTP
+    control = control_api_from_env(simulators, profiler)
+
+    threads = [gas_thread, rfid_thread, ws_thread]
     try:
         # Start both simulators
         gas_thread.start()
         rfid_thread.start()
-
-        # Keep main thread alive
-        while True:
+        if int(os.getenv("NUM_WS_CLIENTS", "0")) > 0:
+            ws_thread.start()
+        if soak:
+            soak.start()
+        if runner:
+            runner.start()
+        if control:
+            control.start()
+
+        # Keep main thread alive until the simulators finish (e.g. at the
+        # end of a scenario)
+        while any(thread.is_alive() for thread in threads):
             time.sleep(1)
+        print("\nAll simulators finished")
 
     except KeyboardInterrupt:
         print("\n\nStopping all simulators...")
+        if runner:
+            runner.stop()
+        for simulator in list(simulators.values()):
+            simulator.stop()
         print("Waiting for threads to finish...")
-        
-        # Give threads time to clean up
-        time.sleep(2)
-        
+
+        # Give threads time to send offline status and disconnect
+        for thread in threads:
+            if thread.is_alive():
+                thread.join(timeout=5)
+
         print("All simulators stopped")
-        sys.exit(0)
+    finally:
+        if profiler.running:
+            profiler.stop()
+        if soak:
+            soak.stop()
+        if control:
+            control.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Shared metrics helpers for the Livestock IoT Simulator
+
+Provides a mergeable latency histogram used by the load-testing modes to
+report delivery lag and request latency percentiles without keeping every
+sample in memory.
+
+Requirements: Simulator for load testing
+"""
+
+import math
+import threading
+from typing import Dict, Optional
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram (milliseconds) that can be merged"""
+
+    # Each bucket is ~5% wide, which keeps percentile error small while
+    # covering 0.01ms .. hours in a few hundred buckets.
+    GROWTH = 1.05
+    MIN_VALUE_MS = 0.01
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _bucket_for(self, value_ms: float) -> int:
+        if value_ms <= self.MIN_VALUE_MS:
+            return 0
+        return int(math.log(value_ms / self.MIN_VALUE_MS, self.GROWTH)) + 1
+
+    def _bucket_upper(self, index: int) -> float:
+        return self.MIN_VALUE_MS * (self.GROWTH ** index)
+
+    def record(self, value_ms: float):
+        """
+        Record a single latency sample
+
+        Args:
+            value_ms: Latency in milliseconds (negative values clamp to 0)
+        """
+        value_ms = max(0.0, value_ms)
+        index = self._bucket_for(value_ms)
+        with self._lock:
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+            self.count += 1
+            self.total += value_ms
+            self.min = value_ms if self.min is None else min(self.min, value_ms)
+            self.max = value_ms if self.max is None else max(self.max, value_ms)
+
+    def merge(self, other: "LatencyHistogram"):
+        """Merge another histogram into this one"""
+        with self._lock:
+            for index, count in other.buckets.items():
+                self.buckets[index] = self.buckets.get(index, 0) + count
+            self.count += other.count
+            self.total += other.total
+            if other.min is not None:
+                self.min = other.min if self.min is None else min(self.min, other.min)
+            if other.max is not None:
+                self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, p: float) -> float:
+        """
+        Estimate a percentile
+
+        Args:
+            p: Percentile between 0 and 100
+
+        Returns:
+            Latency in milliseconds (0.0 if no samples)
+        """
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            rank = max(1, math.ceil(self.count * p / 100.0))
+            seen = 0
+            for index in sorted(self.buckets):
+                seen += self.buckets[index]
+                if seen >= rank:
+                    return min(self._bucket_upper(index), self.max)
+            return self.max
+
+    def mean(self) -> float:
+        """Mean latency in milliseconds"""
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> Dict:
+        """Return count, mean and common percentiles as a dictionary"""
+        return {
+            "count": self.count,
+            "mean": round(self.mean(), 2),
+            "min": round(self.min or 0.0, 2),
+            "p50": round(self.percentile(50), 2),
+            "p95": round(self.percentile(95), 2),
+            "p99": round(self.percentile(99), 2),
+            "max": round(self.max or 0.0, 2),
+        }
+
+    def format_summary(self) -> str:
+        """Return a one-line human readable summary"""
+        s = self.summary()
+        return (
+            f"n={s['count']} mean={s['mean']:.1f}ms p50={s['p50']:.1f}ms "
+            f"p95={s['p95']:.1f}ms p99={s['p99']:.1f}ms max={s['max']:.1f}ms"
+        )
+
+    def to_dict(self) -> Dict:
+        """Serialize for transport (e.g. JSON)"""
+        with self._lock:
+            return {
+                "buckets": {str(k): v for k, v in self.buckets.items()},
+                "count": self.count,
+                "total": self.total,
+                "min": self.min,
+                "max": self.max,
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LatencyHistogram":
+        """Deserialize a histogram produced by to_dict()"""
+        histogram = cls()
+        histogram.buckets = {int(k): v for k, v in data.get("buckets", {}).items()}
+        histogram.count = data.get("count", 0)
+        histogram.total = data.get("total", 0.0)
+        histogram.min = data.get("min")
+        histogram.max = data.get("max")
+        return histogram
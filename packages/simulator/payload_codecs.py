@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Payload Codecs for Livestock IoT Simulator
+
+Interchangeable encodings for sensor payloads, selectable per run with
+PAYLOAD_CODEC:
+
+- json: Current device format (verbose keys, ISO timestamps)
+- compact-json: Short keys, epoch millisecond timestamps, no whitespace
+- msgpack / cbor: Binary encodings of the verbose document
+- msgpack-compact / cbor-compact: Binary encodings of the compact document
+
+Run this module directly to benchmark bytes per reading and encode/decode
+throughput for every codec before deciding to reflash the ESP32s:
+
+    python payload_codecs.py --benchmark 20000
+
+Note: the backend currently only parses `json`; other codecs are for
+evaluation against stand-in brokers or a backend with matching decoders.
+
+Requirements: Simulator for load testing
+"""
+
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+# Short keys used by the compact encodings
+COMPACT_KEYS = {
+    "sensorId": "s",
+    "barnId": "b",
+    "methanePpm": "m",
+    "co2Ppm": "c",
+    "nh3Ppm": "n",
+    "temperature": "t",
+    "humidity": "h",
+    "timestamp": "ts",
+    "gatewayId": "g",
+    "count": "k",
+    "readings": "r",
+}
+VERBOSE_KEYS = {short: key for key, short in COMPACT_KEYS.items()}
+
+
+def _iso_to_epoch_ms(value: str) -> int:
+    """Convert an ISO 8601 timestamp (with Z suffix) to epoch milliseconds"""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+def _epoch_ms_to_iso(value: int) -> str:
+    """Convert epoch milliseconds back to an ISO 8601 timestamp"""
+    moment = datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    return moment.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def compact(document: Any) -> Any:
+    """Shorten keys and convert timestamps to epoch milliseconds (recursive)"""
+    if isinstance(document, dict):
+        result = {}
+        for key, value in document.items():
+            if key == "timestamp" and isinstance(value, str):
+                value = _iso_to_epoch_ms(value)
+            result[COMPACT_KEYS.get(key, key)] = compact(value)
+        return result
+    if isinstance(document, list):
+        return [compact(item) for item in document]
+    return document
+
+
+def expand(document: Any) -> Any:
+    """Inverse of compact()"""
+    if isinstance(document, dict):
+        result = {}
+        for key, value in document.items():
+            key = VERBOSE_KEYS.get(key, key)
+            if key == "timestamp" and isinstance(value, int):
+                value = _epoch_ms_to_iso(value)
+            result[key] = expand(value)
+        return result
+    if isinstance(document, list):
+        return [expand(item) for item in document]
+    return document
+
+
+class JsonCodec:
+    """Current device format: json.dumps with verbose keys"""
+
+    name = "json"
+
+    def encode(self, document: Dict) -> bytes:
+        return json.dumps(document).encode("utf-8")
+
+    def decode(self, payload: bytes) -> Dict:
+        return json.loads(payload)
+
+
+class CompactJsonCodec:
+    """JSON with short keys, epoch timestamps and no whitespace"""
+
+    name = "compact-json"
+
+    def encode(self, document: Dict) -> bytes:
+        return json.dumps(compact(document), separators=(",", ":")).encode("utf-8")
+
+    def decode(self, payload: bytes) -> Dict:
+        return expand(json.loads(payload))
+
+
+class MsgPackCodec:
+    """MessagePack encoding (requires the msgpack package)"""
+
+    def __init__(self, compact_keys: bool = False):
+        try:
+            import msgpack
+        except ImportError:
+            raise ImportError("MessagePack codec requires msgpack: pip install msgpack")
+        self._msgpack = msgpack
+        self.compact_keys = compact_keys
+        self.name = "msgpack-compact" if compact_keys else "msgpack"
+
+    def encode(self, document: Dict) -> bytes:
+        return self._msgpack.packb(compact(document) if self.compact_keys else document)
+
+    def decode(self, payload: bytes) -> Dict:
+        document = self._msgpack.unpackb(payload)
+        return expand(document) if self.compact_keys else document
+
+
+class CborCodec:
+    """CBOR encoding (requires the cbor2 package)"""
+
+    def __init__(self, compact_keys: bool = False):
+        try:
+            import cbor2
+        except ImportError:
+            raise ImportError("CBOR codec requires cbor2: pip install cbor2")
+        self._cbor2 = cbor2
+        self.compact_keys = compact_keys
+        self.name = "cbor-compact" if compact_keys else "cbor"
+
+    def encode(self, document: Dict) -> bytes:
+        return self._cbor2.dumps(compact(document) if self.compact_keys else document)
+
+    def decode(self, payload: bytes) -> Dict:
+        document = self._cbor2.loads(payload)
+        return expand(document) if self.compact_keys else document
+
+
+CODECS: Dict[str, Callable[[], Any]] = {
+    "json": JsonCodec,
+    "compact-json": CompactJsonCodec,
+    "msgpack": lambda: MsgPackCodec(),
+    "msgpack-compact": lambda: MsgPackCodec(compact_keys=True),
+    "cbor": lambda: CborCodec(),
+    "cbor-compact": lambda: CborCodec(compact_keys=True),
+}
+
+
+def get_codec(name: str):
+    """
+    Create a codec by name
+
+    Args:
+        name: One of CODECS
+
+    Returns:
+        Codec instance with encode() and decode()
+    """
+    if name not in CODECS:
+        raise ValueError(f"Unknown payload codec '{name}' (choose from: {', '.join(CODECS)})")
+    return CODECS[name]()
+
+
+def benchmark(readings: List[Dict], batch_size: int = 50) -> List[Dict]:
+    """
+    Measure size and encode/decode throughput of every available codec
+
+    Args:
+        readings: Sample readings to encode
+        batch_size: Readings per gateway batch for the batched size column
+
+    Returns:
+        One result dictionary per codec
+    """
+    # Same envelope as GatewayBatcher: readings inherit barnId from the batch
+    stripped = [{k: v for k, v in r.items() if k != "barnId"} for r in readings]
+    batches = [
+        {"gatewayId": "GW-1", "barnId": "BARN-001", "count": batch_size, "readings": stripped[i:i + batch_size]}
+        for i in range(0, len(stripped), batch_size)
+    ]
+
+    results = []
+    for name in CODECS:
+        try:
+            codec = get_codec(name)
+        except ImportError as e:
+            print(f"Skipping {name}: {e}")
+            continue
+
+        start = time.perf_counter()
+        payloads = [codec.encode(reading) for reading in readings]
+        encode_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for payload in payloads:
+            codec.decode(payload)
+        decode_time = time.perf_counter() - start
+
+        batched_bytes = sum(len(codec.encode(batch)) for batch in batches)
+
+        results.append({
+            "codec": name,
+            "bytesPerReading": sum(len(p) for p in payloads) / len(payloads),
+            "batchedBytesPerReading": batched_bytes / len(readings),
+            "encodePerSec": len(readings) / encode_time if encode_time else 0.0,
+            "decodePerSec": len(readings) / decode_time if decode_time else 0.0,
+        })
+    return results
+
+
+def main():
+    """Run the codec benchmark"""
+    from gas_sensor_simulator import GasSensorSimulator
+
+    count = 10000
+    if len(sys.argv) > 2 and sys.argv[1] == "--benchmark":
+        count = int(sys.argv[2])
+
+    simulator = GasSensorSimulator(num_sensors=10)
+    readings = [simulator._generate_reading(simulator.sensors[i % 10]) for i in range(count)]
+
+    results = benchmark(readings)
+    baseline = results[0]["bytesPerReading"]
+
+    print(f"\nPayload codec benchmark ({count} readings)")
+    print("=" * 86)
+    print(f"{'Codec':16} {'Bytes/reading':>14} {'vs json':>8} {'Batched B/rdg':>14} {'Encode/s':>14} {'Decode/s':>14}")
+    print("-" * 86)
+    for r in results:
+        print(
+            f"{r['codec']:16} {r['bytesPerReading']:14.1f} {r['bytesPerReading'] / baseline * 100:7.0f}% "
+            f"{r['batchedBytesPerReading']:14.1f} {r['encodePerSec']:14,.0f} {r['decodePerSec']:14,.0f}"
+        )
+    print("=" * 86)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Runtime Profiler for Livestock IoT Simulator
+
+A sampling profiler and allocation tracer that can be switched on and off
+while the simulators run, to find out whether time goes to reading
+generation, payload encoding, the paho network thread or HTTP calls.
+
+- Samples the stacks of all threads (gas, RFID, paho, ...) at a fixed rate
+- Writes collapsed stacks ("thread;frame;frame count") for flamegraph.pl
+  or speedscope
+- Records the top allocation sites with tracemalloc
+
+Nothing runs while the profiler is stopped, so the disabled overhead is a
+single signal handler. Toggle with `kill -USR1 <pid>` (see install_signal_handler)
+or from code / the control API via start() and stop().
+
+Requirements: Simulator for load testing
+"""
+
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+
+
+class SamplingProfiler:
+    """Samples all thread stacks and traces allocations on demand"""
+
+    def __init__(
+        self,
+        output_dir: str = "profiles",
+        sample_interval: float = 0.005,
+        trace_allocations: bool = True,
+        top_allocations: int = 25,
+    ):
+        """
+        Initialize the profiler (does not start sampling)
+
+        Args:
+            output_dir: Directory for collapsed stacks and allocation reports
+            sample_interval: Seconds between stack samples
+            trace_allocations: Enable tracemalloc while profiling
+            top_allocations: Allocation sites to include in the report
+        """
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.trace_allocations = trace_allocations
+        self.top_allocations = top_allocations
+
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """True while sampling"""
+        return self._sampler is not None
+
+    def _sample_once(self, names: Dict[int, str]):
+        """Record one stack sample for every thread except the sampler"""
+        own_id = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            frames.append(names.get(thread_id, f"thread-{thread_id}"))
+            self.stacks[";".join(reversed(frames))] += 1
+        self.samples += 1
+
+    def _sample_loop(self):
+        """Sampler thread body"""
+        while not self._stop.is_set():
+            names = {t.ident: t.name for t in threading.enumerate()}
+            self._sample_once(names)
+            self._stop.wait(self.sample_interval)
+
+    def start(self) -> bool:
+        """
+        Start sampling and allocation tracing
+
+        Returns:
+            False if the profiler was already running
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self.stacks = Counter()
+            self.samples = 0
+            self.started_at = time.time()
+            self._stop.clear()
+            if self.trace_allocations and not tracemalloc.is_tracing():
+                tracemalloc.start(16)
+            self._sampler = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+            self._sampler.start()
+        print(f"[PROFILE] Started (interval {self.sample_interval * 1000:.1f}ms)")
+        return True
+
+    def stop(self) -> Optional[Dict[str, str]]:
+        """
+        Stop profiling and write the reports
+
+        Returns:
+            Paths of the written files, or None if the profiler was not running
+        """
+        with self._lock:
+            if not self.running:
+                return None
+            self._stop.set()
+            self._sampler.join(timeout=2)
+            self._sampler = None
+
+            snapshot = None
+            if self.trace_allocations and tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+
+        paths = self.dump(snapshot)
+        duration = time.time() - self.started_at
+        print(f"[PROFILE] Stopped after {duration:.1f}s, {self.samples} samples")
+        for kind, path in paths.items():
+            print(f"[PROFILE]   {kind}: {path}")
+        return paths
+
+    def toggle(self):
+        """Start if stopped, stop and dump if running"""
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def dump(self, snapshot: Optional[tracemalloc.Snapshot] = None) -> Dict[str, str]:
+        """
+        Write collapsed stacks and the allocation report
+
+        Args:
+            snapshot: tracemalloc snapshot to report on (optional)
+
+        Returns:
+            Mapping of report kind to file path
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        paths = {}
+
+        stacks_path = os.path.join(self.output_dir, f"stacks-{stamp}.collapsed")
+        with open(stacks_path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        paths["stacks"] = stacks_path
+
+        if snapshot is not None:
+            snapshot = snapshot.filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ])
+            alloc_path = os.path.join(self.output_dir, f"allocations-{stamp}.txt")
+            with open(alloc_path, "w") as f:
+                f.write(f"Top {self.top_allocations} allocation sites\n\n")
+                for stat in snapshot.statistics("traceback")[: self.top_allocations]:
+                    f.write(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                    for line in stat.traceback.format(limit=8):
+                        f.write(f"  {line}\n")
+                    f.write("\n")
+            paths["allocations"] = alloc_path
+
+        return paths
+
+
+def install_signal_handler(profiler: SamplingProfiler, signum: int = getattr(signal, "SIGUSR1", None)):
+    """
+    Toggle the profiler when the process receives a signal
+
+    Must be called from the main thread. The work happens in a helper thread
+    so the interrupted thread is not blocked while reports are written.
+
+    Args:
+        profiler: Profiler to toggle
+        signum: Signal number (default SIGUSR1; unavailable on Windows)
+    """
+    if signum is None:
+        print("Profiler signal toggle not supported on this platform")
+        return
+
+    def handler(_signum, _frame):
+        threading.Thread(target=profiler.toggle, name="profiler-toggle", daemon=True).start()
+
+    signal.signal(signum, handler)
+    print(f"Profiler: send signal {signum} to PID {os.getpid()} to start/stop profiling")
+
+
+def profiler_from_env() -> SamplingProfiler:
+    """Create a profiler configured from environment variables"""
+    return SamplingProfiler(
+        output_dir=os.getenv("PROFILE_OUTPUT_DIR", "profiles"),
+        sample_interval=float(os.getenv("PROFILE_SAMPLE_MS", "5")) / 1000,
+        trace_allocations=os.getenv("PROFILE_ALLOCATIONS", "true").lower() == "true",
+    )
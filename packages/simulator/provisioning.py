@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Fleet Provisioning for Livestock IoT Monitoring System
+
+Creates farms, barns and livestock through the REST API and assigns the
+simulated gas sensors to their barns (POST /api/barns/:id/sensors), so the
+simulators send data for entities that exist in the backend.
+
+- Requests run concurrently with a configurable limit
+- Transient failures (connection errors, 429, 5xx) are retried with backoff
+- The resulting ID mapping is cached in FLEET_FILE; rerunning skips
+  everything already provisioned, so a fleet is prepared once and reused
+
+Sensors are assigned round-robin in barn order (GAS-001 -> barn 1,
+GAS-002 -> barn 2, ...), which is how GasSensorSimulator spreads sensors
+across barn_ids, so the gas simulator reproduces the mapping from the list
+of barn IDs alone.
+
+Usage:
+    python provisioning.py                    # writes .fleet.json
+    FLEET_FILE=.fleet.json python main.py     # simulators use the fleet
+
+Requirements: Simulator for load testing
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from auth_manager import AuthManager
+
+# Load environment variables
+load_dotenv()
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class ProvisioningError(Exception):
+    """A request failed permanently or exhausted its retries"""
+
+
+class FleetProvisioner:
+    """Provisions farms, barns, livestock and sensor assignments"""
+
+    SPECIES = ["cattle", "goat", "sheep"]
+
+    def __init__(
+        self,
+        backend_url: str = "http://localhost:3001",
+        auth_manager: Optional[AuthManager] = None,
+        num_farms: int = 1,
+        barns_per_farm: int = 10,
+        sensors_per_barn: int = 2,
+        livestock_per_barn: int = 20,
+        prefix: str = "SIM",
+        concurrency: int = 16,
+        retries: int = 3,
+        backoff: float = 0.5,
+        fleet_file: str = ".fleet.json",
+    ):
+        """
+        Initialize the provisioner
+
+        Args:
+            backend_url: Backend API base URL
+            auth_manager: Token pool (defaults to one built from env; needs an ADMIN user)
+            num_farms: Farms to create
+            barns_per_farm: Barns per farm
+            sensors_per_barn: Gas sensors assigned to each barn
+            livestock_per_barn: Livestock created in each barn
+            prefix: Prefix for barn codes, ear tags and farm names
+            concurrency: Maximum requests in flight
+            retries: Retries per request for transient failures
+            backoff: Initial retry delay in seconds (doubled per retry, with jitter)
+            fleet_file: Local JSON cache of the provisioned IDs
+        """
+        self.backend_url = backend_url.rstrip("/")
+        self.auth = auth_manager or AuthManager.from_env(self.backend_url)
+        self.num_farms = num_farms
+        self.barns_per_farm = barns_per_farm
+        self.sensors_per_barn = sensors_per_barn
+        self.livestock_per_barn = livestock_per_barn
+        self.prefix = prefix
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.fleet_file = fleet_file
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.fleet = self._load()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retried = 0
+
+    def _empty_fleet(self) -> Dict:
+        return {
+            "backendUrl": self.backend_url,
+            "prefix": self.prefix,
+            "farms": {},
+            "barns": {},
+            "sensors": {},
+            "livestock": {},
+        }
+
+    def _load(self) -> Dict:
+        """Load the cached fleet for this backend and prefix, if any"""
+        try:
+            with open(self.fleet_file) as f:
+                fleet = json.load(f)
+        except (OSError, ValueError):
+            return self._empty_fleet()
+        if fleet.get("backendUrl") != self.backend_url or fleet.get("prefix") != self.prefix:
+            print(f"Ignoring {self.fleet_file}: provisioned for another backend or prefix")
+            return self._empty_fleet()
+        return fleet
+
+    def _save(self):
+        """Write the fleet cache atomically"""
+        with self._lock:
+            data = json.dumps(self.fleet, indent=2)
+        tmp_file = f"{self.fleet_file}.tmp"
+        with open(tmp_file, "w") as f:
+            f.write(data)
+        os.replace(tmp_file, self.fleet_file)
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Send an authenticated request, retrying transient failures
+
+        Returns:
+            The final response (may be a 4xx for the caller to handle)
+
+        Raises:
+            ProvisioningError: If every attempt failed with a transient error
+        """
+        kwargs.setdefault("timeout", 30)
+        url = f"{self.backend_url}{path}"
+        last_error = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                with self._lock:
+                    self.retried += 1
+                time.sleep(self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+            headers = self.auth.get_auth_headers()
+            try:
+                response = self.session.request(method, url, headers=headers, **kwargs)
+            except requests.exceptions.RequestException as e:
+                last_error = str(e)
+                continue
+            finally:
+                with self._lock:
+                    self.requests += 1
+
+            if response.status_code == 401 and "Authorization" in headers:
+                self.auth.invalidate(headers["Authorization"][len("Bearer "):])
+                last_error = "HTTP 401"
+                continue
+            if response.status_code in RETRYABLE_STATUS:
+                last_error = f"HTTP {response.status_code}"
+                continue
+            return response
+
+        raise ProvisioningError(f"{method} {path} failed after {self.retries + 1} attempts: {last_error}")
+
+    def _find(self, path: str, search: str, key: str, value: str) -> Optional[Dict]:
+        """Look up an existing entity by an exact field match"""
+        response = self._request("GET", path, params={"search": search, "limit": 100})
+        if response.status_code != 200:
+            return None
+        for item in response.json().get("data") or []:
+            if str(item.get(key, "")).lower() == value.lower():
+                return item
+        return None
+
+    def _create(self, path: str, payload: Dict, lookup: Callable[[], Optional[Dict]]) -> Dict:
+        """
+        Create an entity, resolving duplicates left by an earlier attempt
+
+        A request can succeed on the server after the client gave up on it,
+        so a uniqueness error on create is resolved by looking the entity up.
+        """
+        response = self._request("POST", path, json=payload)
+        if response.status_code in (200, 201):
+            return response.json()
+        if response.status_code in (400, 409):
+            existing = lookup()
+            if existing:
+                return existing
+        raise ProvisioningError(f"POST {path} failed: HTTP {response.status_code} - {response.text[:200]}")
+
+    def _run_concurrently(self, label: str, tasks: Dict[str, Callable[[], object]], store: Callable[[str, object], None]):
+        """
+        Run tasks with the concurrency limit and store each result
+
+        Args:
+            label: Entity name for progress output
+            tasks: Key -> zero-argument task
+            store: Called with (key, result) for every successful task
+        """
+        if not tasks:
+            return
+        started = time.time()
+        failures = []
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="provision") as pool:
+            futures = {pool.submit(task): key for key, task in tasks.items()}
+            for done, future in enumerate(as_completed(futures), 1):
+                key = futures[future]
+                try:
+                    result = future.result()
+                except ProvisioningError as e:
+                    failures.append(f"{key}: {e}")
+                    continue
+                with self._lock:
+                    store(key, result)
+                if done % 500 == 0:
+                    print(f"  {label}: {done}/{len(tasks)}")
+        self._save()
+
+        elapsed = time.time() - started
+        print(f"  {label}: {len(tasks) - len(failures)}/{len(tasks)} in {elapsed:.1f}s")
+        if failures:
+            for failure in failures[:10]:
+                print(f"    {failure}")
+            raise ProvisioningError(f"{len(failures)} {label} failed; rerun to resume")
+
+    def _owner_id(self) -> str:
+        """ID of the authenticated user, used as farm owner"""
+        response = self._request("GET", "/api/auth/me")
+        if response.status_code != 200:
+            raise ProvisioningError(f"GET /api/auth/me failed: HTTP {response.status_code}")
+        return response.json()["id"]
+
+    def _provision_farms(self):
+        names = [f"{self.prefix} Farm {i + 1}" for i in range(self.num_farms)]
+        missing = [name for name in names if name not in self.fleet["farms"]]
+        if not missing:
+            return
+        owner_id = self._owner_id()
+
+        def create(name: str):
+            # Farm names are not unique in the backend, so reuse before creating
+            lookup = lambda: self._find("/api/farms", name, "name", name)
+            return lambda: lookup() or self._create(
+                "/api/farms", {"name": name, "ownerId": owner_id, "address": "Simulated"}, lookup
+            )
+
+        self._run_concurrently(
+            "farms",
+            {name: create(name) for name in missing},
+            lambda name, farm: self.fleet["farms"].__setitem__(name, farm["id"]),
+        )
+
+    def _barn_codes(self) -> Dict[str, str]:
+        """Farm name by barn code for every barn, in provisioning order"""
+        codes = {}
+        for farm in range(self.num_farms):
+            for barn in range(self.barns_per_farm):
+                codes[f"{self.prefix}-F{farm + 1:03d}-B{barn + 1:04d}"] = f"{self.prefix} Farm {farm + 1}"
+        return codes
+
+    def _provision_barns(self):
+        missing = [(code, farm) for code, farm in self._barn_codes().items() if code not in self.fleet["barns"]]
+
+        def create(code: str, farm_name: str):
+            payload = {
+                "name": f"Barn {code}",
+                "code": code,
+                "capacity": max(self.livestock_per_barn * 2, 1),
+                "farmId": self.fleet["farms"][farm_name],
+            }
+            return lambda: self._create(
+                "/api/barns", payload, lambda: self._find("/api/barns", code, "code", code)
+            )
+
+        self._run_concurrently(
+            "barns",
+            {code: create(code, farm) for code, farm in missing},
+            lambda code, barn: self.fleet["barns"].__setitem__(code, {"id": barn["id"], "farmId": barn.get("farmId")}),
+        )
+
+    def _provision_sensors(self):
+        barn_ids = self.barn_ids()
+        total = len(barn_ids) * self.sensors_per_barn
+        wanted = {f"GAS-{str(i + 1).zfill(3)}": barn_ids[i % len(barn_ids)] for i in range(total)}
+        # Rebuilt from this run's layout, so a rerun with fewer sensors per
+        # barn drops the extra sensors from numSensors
+        current = {sensor: barn for sensor, barn in self.fleet["sensors"].items() if wanted.get(sensor) == barn}
+        if current != self.fleet["sensors"]:
+            self.fleet["sensors"] = current
+            self._save()
+        missing = {sensor: barn for sensor, barn in wanted.items() if sensor not in self.fleet["sensors"]}
+
+        def assign(sensor_id: str, barn_id: str):
+            def task():
+                response = self._request("POST", f"/api/barns/{barn_id}/sensors", json={"sensorId": sensor_id})
+                # 409: already assigned by an earlier attempt
+                if response.status_code not in (200, 201, 409):
+                    raise ProvisioningError(f"HTTP {response.status_code} - {response.text[:200]}")
+                return barn_id
+            return task
+
+        self._run_concurrently(
+            "sensor assignments",
+            {sensor: assign(sensor, barn) for sensor, barn in missing.items()},
+            lambda sensor, barn_id: self.fleet["sensors"].__setitem__(sensor, barn_id),
+        )
+
+    def _provision_livestock(self):
+        now = datetime.now(timezone.utc)
+        tasks = {}
+        for index, code in enumerate(self._barn_codes()):
+            barn = self.fleet["barns"][code]
+            for n in range(self.livestock_per_barn):
+                ear_tag = f"{self.prefix}-{index + 1:05d}-{n + 1:04d}"
+                if ear_tag in self.fleet["livestock"]:
+                    continue
+                payload = {
+                    "earTagId": ear_tag,
+                    "species": random.choice(self.SPECIES),
+                    "name": f"Animal {ear_tag}",
+                    "gender": random.choice(["male", "female"]),
+                    "dateOfBirth": (now - timedelta(days=random.randint(180, 2000))).isoformat(),
+                    "weight": round(random.uniform(30, 600), 1),
+                    "farmId": barn["farmId"],
+                    "currentBarnId": barn["id"],
+                }
+                tasks[ear_tag] = (
+                    lambda payload=payload, ear_tag=ear_tag: self._create(
+                        "/api/livestock",
+                        payload,
+                        lambda: self._find("/api/livestock", ear_tag, "earTagId", ear_tag),
+                    )
+                )
+
+        self._run_concurrently(
+            "livestock",
+            tasks,
+            lambda ear_tag, animal: self.fleet["livestock"].__setitem__(ear_tag, animal["id"]),
+        )
+
+    def provision(self) -> Dict:
+        """
+        Provision everything missing from the cached fleet
+
+        Returns:
+            The fleet mapping (also written to fleet_file)
+
+        Raises:
+            ProvisioningError: If some entities could not be created; the ones
+                that succeeded are cached and a rerun resumes from there
+        """
+        started = time.time()
+        print(f"Provisioning fleet on {self.backend_url} (concurrency {self.concurrency})")
+        print(
+            f"  {self.num_farms} farms x {self.barns_per_farm} barns, "
+            f"{self.sensors_per_barn} sensors and {self.livestock_per_barn} livestock per barn"
+        )
+
+        self._provision_farms()
+        self._provision_barns()
+        self._provision_sensors()
+        self._provision_livestock()
+
+        elapsed = time.time() - started
+        print(
+            f"Fleet ready in {elapsed:.1f}s: {self.requests} requests ({self.retried} retries), "
+            f"cached in {self.fleet_file}"
+        )
+        return self.fleet
+
+    def barn_ids(self) -> List[str]:
+        """Backend IDs of the provisioned barns, in provisioning order"""
+        return [self.fleet["barns"][code]["id"] for code in self._barn_codes() if code in self.fleet["barns"]]
+
+
+def load_fleet(fleet_file: str) -> Optional[Dict]:
+    """
+    Load a provisioned fleet for the simulators
+
+    Returns:
+        {"barnIds", "numSensors", "livestockIds"} or None if the file is missing
+    """
+    try:
+        with open(fleet_file) as f:
+            fleet = json.load(f)
+    except OSError:
+        print(f"Fleet file {fleet_file} not found; run provisioning.py first")
+        return None
+
+    barn_order = sorted(fleet["barns"])
+    barn_ids = [fleet["barns"][code]["id"] for code in barn_order]
+    return {
+        "barnIds": barn_ids,
+        "numSensors": len(fleet["sensors"]),
+        "livestockIds": list(fleet["livestock"].values()),
+    }
+
+
+def main():
+    """Main entry point for fleet provisioning"""
+    provisioner = FleetProvisioner(
+        backend_url=os.getenv("BACKEND_API_URL", "http://localhost:3001"),
+        num_farms=int(os.getenv("PROVISION_FARMS", "1")),
+        barns_per_farm=int(os.getenv("PROVISION_BARNS_PER_FARM", "10")),
+        sensors_per_barn=int(os.getenv("PROVISION_SENSORS_PER_BARN", "2")),
+        livestock_per_barn=int(os.getenv("PROVISION_LIVESTOCK_PER_BARN", "20")),
+        prefix=os.getenv("PROVISION_PREFIX", "SIM"),
+        concurrency=int(os.getenv("PROVISION_CONCURRENCY", "16")),
+        retries=int(os.getenv("PROVISION_RETRIES", "3")),
+        fleet_file=os.getenv("FLEET_FILE", ".fleet.json"),
+    )
+
+    try:
+        provisioner.provision()
+    except ProvisioningError as e:
+        print(f"Provisioning incomplete: {e}")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
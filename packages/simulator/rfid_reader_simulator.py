@@ -11,14 +11,19 @@ Task: 28.2 - Implement RFID reader simulator
 
 import json
 import random
+import threading
 import time
 import os
-from datetime import datetime, timezone
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence
 import requests
 import paho.mqtt.client as mqtt
 from dotenv import load_dotenv
 
+from auth_manager import AuthManager
+from incident_engine import get_incident_engine
+from metrics import LatencyHistogram
+from sim_clock import diurnal_wave, get_clock
+
 # Load environment variables
 load_dotenv()
 
@@ -32,6 +37,11 @@ class RFIDReaderSimulator:
         interval: int = 30,
         mqtt_broker: str = "localhost",
         mqtt_port: int = 1883,
+        auth_manager: Optional[AuthManager] = None,
+        reader_ids: Optional[Sequence[str]] = None,
+        livestock_ids: Optional[Sequence[str]] = None,
+        barn_ids: Optional[List[str]] = None,
+        diurnal: bool = True,
     ):
         """
         Initialize the RFID reader simulator
@@ -41,76 +51,138 @@ class RFIDReaderSimulator:
             interval: Seconds between RFID events
             mqtt_broker: MQTT broker hostname
             mqtt_port: MQTT broker port
+            auth_manager: Shared token pool (defaults to one built from env)
+            reader_ids: RFID reader IDs to simulate (defaults to 3 sample readers)
+            livestock_ids: Preassigned livestock, e.g. a scenario HerdView (skips
+                fetching from the backend)
+            barn_ids: Preassigned barns (skips fetching from the backend)
+            diurnal: Favour exits during the day and entries at night
+                (simulated time)
         """
         self.backend_url = backend_url.rstrip("/")
         self.interval = interval
+        self.diurnal = diurnal
+        self.clock = get_clock()
+        self.incidents = get_incident_engine()
         self.mqtt_broker = mqtt_broker
         self.mqtt_port = mqtt_port
         self.mqtt_client = None
         self.running = False
-        self.auth_token: Optional[str] = None
+        self.auth = auth_manager or AuthManager.from_env(self.backend_url)
         self.heartbeat_interval = 30
         self.last_heartbeat = {}
         self.error_probability = 0.01  # 1% chance of error
 
-        # Data fetched from backend
-        self.livestock_ids: List[str] = []
-        self.barn_ids: List[str] = []
+        # Data fetched from backend (unless preassigned); kept as passed so a
+        # lazy scenario herd is never materialized
+        self.livestock_ids: Sequence[str] = livestock_ids if livestock_ids is not None else []
+        self.livestock_records: Dict[str, Dict] = {}
+        self.barn_ids: List[str] = list(barn_ids or [])
         
         # Sample RFID reader IDs
-        self.reader_ids: List[str] = [
+        self.reader_ids: Sequence[str] = reader_ids or [
             "RFID-READER-001",
             "RFID-READER-002",
             "RFID-READER-003",
         ]
 
-        # Track current location of each livestock
-        self.livestock_locations: Dict[str, Optional[str]] = {}
+        # Barn of each livestock currently inside one; animals without an
+        # entry are outside, so the map stays sparse for large herds
+        self.livestock_locations: Dict[str, str] = {}
+
+        # Event statistics for POST /api/logs
+        self.events_sent = 0
+        self.events_failed = 0
+        self.events_dropped = 0
+        self.http_latency = LatencyHistogram()
+        # Requests started before this moment are not recorded (see reset_latency)
+        self._latency_since = 0.0
+        self._stats_lock = threading.Lock()
+        # Set by stop() and never cleared: a stopped simulator stays stopped,
+        # even when the stop arrives while it is still starting up
+        self._wake = threading.Event()
+
+        # Runtime control (see control_api.py); reader_ids is replaced, never
+        # modified in place
+        self.paused = False
+        self._fleet_lock = threading.Lock()
+        self._next_reader_number = len(self.reader_ids)
 
     def _authenticate(self) -> bool:
         """
         Authenticate with the backend to get JWT token
         
+        Uses cached tokens when still valid and refreshes them before expiry,
+        so repeated runs don't pay for a password login every time.
+        
         Returns:
             True if authentication successful, False otherwise
         """
-        try:
-            # Use default admin credentials
-            login_data = {
-                "email": os.getenv("ADMIN_EMAIL", "admin@livestock.com"),
-                "password": os.getenv("ADMIN_PASSWORD", "admin123"),
-            }
-            
-            response = requests.post(
-                f"{self.backend_url}/api/auth/login",
-                json=login_data,
-                headers={"Content-Type": "application/json"},
-                timeout=10,
+        if self.auth.get_token():
+            stats = self.auth.stats()
+            print(
+                f"Authentication successful ({stats['credentials']} credential(s), "
+                f"{stats['logins']} login(s), {stats['refreshes']} refresh(es))"
             )
-            
-            if response.status_code == 200 or response.status_code == 201:
-                data = response.json()
-                self.auth_token = data.get("access_token") or data.get("accessToken")
-                if self.auth_token:
-                    print("Authentication successful")
-                    return True
-                else:
-                    print(f"No token in response: {data}")
-                    return False
-            else:
-                print(f"Authentication failed: HTTP {response.status_code}")
-                return False
-                
-        except Exception as e:
-            print(f"Authentication error: {e}")
-            return False
+            return True
+        return False
 
     def _get_auth_headers(self) -> Dict[str, str]:
         """Get headers with authentication token"""
-        headers = {"Content-Type": "application/json"}
-        if self.auth_token:
-            headers["Authorization"] = f"Bearer {self.auth_token}"
-        return headers
+        return self.auth.get_auth_headers()
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Send an authenticated request to the backend
+        
+        Retries once with a fresh token when the backend answers 401.
+        
+        Args:
+            method: HTTP method
+            path: API path starting with /api
+            **kwargs: Extra arguments for requests.request
+            
+        Returns:
+            The HTTP response
+        """
+        kwargs.setdefault("timeout", 10)
+        url = f"{self.backend_url}{path}"
+
+        headers = self._get_auth_headers()
+        response = requests.request(method, url, headers=headers, **kwargs)
+
+        if response.status_code == 401 and "Authorization" in headers:
+            self.auth.invalidate(headers["Authorization"][len("Bearer "):])
+            headers = self._get_auth_headers()
+            response = requests.request(method, url, headers=headers, **kwargs)
+
+        return response
+
+    def _fetch_all(self, path: str, max_pages: int = 1000) -> Optional[List[Dict]]:
+        """
+        Fetch every page of a paginated list endpoint
+        
+        Args:
+            path: API path of the list endpoint
+            max_pages: Safety limit on the number of pages
+            
+        Returns:
+            All items, or None if the first page failed
+        """
+        items: List[Dict] = []
+        for page in range(1, max_pages + 1):
+            response = self._request("GET", path, params={"page": page, "limit": 100})
+            if response.status_code != 200:
+                if page == 1:
+                    print(f"Failed to fetch {path}: HTTP {response.status_code}")
+                    return None
+                break
+
+            data = response.json()
+            items.extend(data.get("data") or data.get("items") or [])
+            if not (data.get("meta") or {}).get("hasNextPage"):
+                break
+        return items
 
     def _fetch_livestock(self) -> bool:
         """
@@ -120,25 +192,14 @@ class RFIDReaderSimulator:
             True if successful, False otherwise
         """
         try:
-            response = requests.get(
-                f"{self.backend_url}/api/livestock",
-                headers=self._get_auth_headers(),
-                timeout=10,
-            )
+            items = self._fetch_all("/api/livestock")
             
-            if response.status_code == 200:
-                data = response.json()
-                items = data.get("data") or data.get("items") or []
+            if items is not None:
                 self.livestock_ids = [item["id"] for item in items if "id" in item]
-                
-                # Initialize locations
-                for livestock_id in self.livestock_ids:
-                    self.livestock_locations[livestock_id] = None
-                    
+                self.livestock_records = {item["id"]: item for item in items if "id" in item}
                 print(f"Fetched {len(self.livestock_ids)} livestock")
                 return len(self.livestock_ids) > 0
             else:
-                print(f"Failed to fetch livestock: HTTP {response.status_code}")
                 return False
                 
         except Exception as e:
@@ -153,20 +214,13 @@ class RFIDReaderSimulator:
             True if successful, False otherwise
         """
         try:
-            response = requests.get(
-                f"{self.backend_url}/api/barns",
-                headers=self._get_auth_headers(),
-                timeout=10,
-            )
+            items = self._fetch_all("/api/barns")
             
-            if response.status_code == 200:
-                data = response.json()
-                items = data.get("data") or data.get("items") or []
+            if items is not None:
                 self.barn_ids = [item["id"] for item in items if "id" in item]
                 print(f"Fetched {len(self.barn_ids)} barns")
                 return len(self.barn_ids) > 0
             else:
-                print(f"Failed to fetch barns: HTTP {response.status_code}")
                 return False
                 
         except Exception as e:
@@ -186,9 +240,9 @@ class RFIDReaderSimulator:
         if not self._authenticate():
             print("Warning: Running without authentication")
         
-        # Fetch livestock and barns
-        livestock_ok = self._fetch_livestock()
-        barns_ok = self._fetch_barns()
+        # Fetch livestock and barns unless they were preassigned
+        livestock_ok = bool(self.livestock_ids) or self._fetch_livestock()
+        barns_ok = bool(self.barn_ids) or self._fetch_barns()
         
         if not livestock_ok:
             print("Error: No livestock found. Please create livestock first.")
@@ -235,7 +289,7 @@ class RFIDReaderSimulator:
         topic = f"livestock/devices/{device_id}/status"
         payload = {
             "status": status,
-            "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "timestamp": self.clock.iso_now(),
             "metadata": {
                 "type": "rfid_reader",
                 "version": "1.0.0"
@@ -259,15 +313,21 @@ class RFIDReaderSimulator:
             
         topic = f"livestock/devices/{device_id}/heartbeat"
         payload = {
-            "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+            "timestamp": self.clock.iso_now()
         }
         
         try:
             self.mqtt_client.publish(topic, json.dumps(payload), qos=0)
-            self.last_heartbeat[device_id] = time.time()
+            self.last_heartbeat[device_id] = self.clock.time()
         except Exception as e:
             print(f"Error sending heartbeat: {e}")
 
+    def _heartbeat_if_due(self, reader_id: str):
+        """Send a heartbeat if the last one is older than heartbeat_interval"""
+        last_hb = self.last_heartbeat.get(reader_id, 0)
+        if self.clock.time() - last_hb >= self.heartbeat_interval:
+            self._send_heartbeat(reader_id)
+
     def _send_device_error(self, device_id: str, error: str, error_code: str = None):
         """Send device error via MQTT"""
         if not self.mqtt_client:
@@ -277,7 +337,7 @@ class RFIDReaderSimulator:
         payload = {
             "error": error,
             "message": error,
-            "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "timestamp": self.clock.iso_now(),
             "metadata": {
                 "type": "rfid_reader"
             }
@@ -303,6 +363,18 @@ class RFIDReaderSimulator:
         livestock_id = random.choice(self.livestock_ids)
         current_location = self.livestock_locations.get(livestock_id)
 
+        # Daily rhythm: animals go out to graze in the morning and come back
+        # in the evening. Resample a few times for an animal moving the
+        # preferred way instead of scanning the whole herd.
+        if self.diurnal:
+            exit_bias = 0.5 + 0.35 * diurnal_wave(self.clock.hour_of_day(), peak_hour=10)
+            want_exit = random.random() < exit_bias
+            for _ in range(5):
+                if (current_location is not None) == want_exit:
+                    break
+                livestock_id = random.choice(self.livestock_ids)
+                current_location = self.livestock_locations.get(livestock_id)
+
         # Determine event type based on current location
         if current_location is None:
             # Livestock is outside - generate entry event
@@ -321,11 +393,25 @@ class RFIDReaderSimulator:
             "barnId": barn_id,
             "eventType": event_type,
             "rfidReaderId": reader_id,
-            "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "timestamp": self.clock.iso_now(),
         }
 
         return event
 
+    def _count_event(self, sent: bool):
+        """Count a POST /api/logs outcome (events may be sent from several threads)"""
+        with self._stats_lock:
+            if sent:
+                self.events_sent += 1
+            else:
+                self.events_failed += 1
+
+    def reset_latency(self):
+        """Start a new POST /api/logs latency window (in-flight requests are dropped)"""
+        with self._stats_lock:
+            self._latency_since = time.time()
+            self.http_latency = LatencyHistogram()
+
     def _send_event(self, event: Dict) -> bool:
         """
         Send an RFID event to the backend API
@@ -337,15 +423,18 @@ class RFIDReaderSimulator:
             True if successful, False otherwise
         """
         reader_id = event['rfidReaderId']
+
+        # Tags passing a reader that is down (incident) are never read
+        if self.incidents.is_offline("rfid", reader_id, None, self._send_device_status):
+            with self._stats_lock:
+                self.events_dropped += 1
+            return False
+
+        self._heartbeat_if_due(reader_id)
         
-        # Send heartbeat if needed
-        current_time = time.time()
-        last_hb = self.last_heartbeat.get(reader_id, 0)
-        if current_time - last_hb >= self.heartbeat_interval:
-            self._send_heartbeat(reader_id)
-        
-        # Simulate random errors
-        if random.random() < self.error_probability:
+        # Simulate random errors (more during error bursts)
+        error_probability = self.incidents.error_probability("rfid", reader_id, None, self.error_probability)
+        if random.random() < error_probability:
             error_types = [
                 ("RFID_READ_FAIL", "Failed to read RFID tag"),
                 ("RFID_ANTENNA_ERROR", "Antenna malfunction"),
@@ -359,19 +448,18 @@ class RFIDReaderSimulator:
         url = f"{self.backend_url}/api/logs"
 
         try:
-            response = requests.post(
-                url,
-                json=event,
-                headers={"Content-Type": "application/json"},
-                timeout=10,
-            )
+            started = time.time()
+            response = self._request("POST", "/api/logs", json=event)
+            if started >= self._latency_since:
+                self.http_latency.record((time.time() - started) * 1000)
 
             if response.status_code in [200, 201]:
+                self._count_event(sent=True)
                 # Update livestock location tracking
                 if event["eventType"] == "entry":
                     self.livestock_locations[event["livestockId"]] = event["barnId"]
                 else:  # exit
-                    self.livestock_locations[event["livestockId"]] = None
+                    self.livestock_locations.pop(event["livestockId"], None)
 
                 print(
                     f"[{event['eventType'].upper():5}] {event['livestockId'][:8]}... "
@@ -380,20 +468,24 @@ class RFIDReaderSimulator:
                 )
                 return True
             else:
+                self._count_event(sent=False)
                 print(
                     f"Failed to send event: HTTP {response.status_code} - {response.text}"
                 )
                 return False
 
         except requests.exceptions.ConnectionError:
+            self._count_event(sent=False)
             print(f"Error: Cannot connect to backend at {self.backend_url}")
             self._send_device_error(reader_id, "Backend connection error", "NETWORK_ERROR")
             return False
         except requests.exceptions.Timeout:
+            self._count_event(sent=False)
             print(f"Error: Request timeout to {url}")
             self._send_device_error(reader_id, "Request timeout", "TIMEOUT_ERROR")
             return False
         except Exception as e:
+            self._count_event(sent=False)
             print(f"Error sending event: {e}")
             self._send_device_error(reader_id, f"Send error: {str(e)}", "SEND_ERROR")
             return False
@@ -413,6 +505,11 @@ class RFIDReaderSimulator:
 
     def run(self):
         """Run the simulator continuously"""
+        if self._wake.is_set():
+            return  # Stopped before it started
+
+        # Running from here on, so a stop() during the slow startup sticks
+        self.running = True
         print(f"\nStarting RFID reader simulator...")
         print(f"Backend API: {self.backend_url}")
         print(f"Generating events every {self.interval} seconds")
@@ -422,6 +519,7 @@ class RFIDReaderSimulator:
         if not self.test_connection():
             print(f"Error: Cannot connect to backend at {self.backend_url}")
             print("Make sure the backend server is running")
+            self.running = False
             return
         
         print("Backend connection successful")
@@ -429,35 +527,151 @@ class RFIDReaderSimulator:
         # Initialize data from backend
         if not self._initialize_data():
             print("Failed to initialize. Exiting.")
+            self.running = False
             return
         
         print("\nPress Ctrl+C to stop\n")
 
-        self.running = True
-
         try:
-            while self.running:
-                event = self._generate_event()
-                self._send_event(event)
-                time.sleep(self.interval)
+            with self.clock.participant():
+                next_tick = self.clock.time()
+                while self.running and not self._wake.is_set():
+                    if self.paused:
+                        self.heartbeat_all()
+                    else:
+                        self.announce_outages()
+                        event = self._generate_event()
+                        self._send_event(event)
+                    next_tick = max(next_tick + self.interval, self.clock.time())
+                    self.clock.sleep(next_tick - self.clock.time(), self._wake)
 
         except KeyboardInterrupt:
             print("\n\nStopping RFID reader simulator...")
         finally:
-            self.running = False
-            # Send offline status for all readers
-            if self.mqtt_client:
-                print("Sending offline status for all readers...")
-                for reader_id in self.reader_ids:
-                    self._send_device_status(
-                        reader_id,
-                        'offline',
-                        reason='intentional',
-                        message='Simulator shutting down gracefully'
-                    )
-                time.sleep(1)
-                self.mqtt_client.loop_stop()
-                self.mqtt_client.disconnect()
+            self.shutdown()
+
+    def stop(self):
+        """Stop the run loop (it shuts down on exit)"""
+        self.running = False
+        self._wake.set()
+
+    def add_readers(self, count: int) -> List[str]:
+        """
+        Add RFID readers while the simulator runs
+
+        New readers continue the RFID-READER-### numbering, skipping IDs
+        already in use (e.g. by a scenario fleet).
+
+        Args:
+            count: Number of readers to add
+
+        Returns:
+            IDs of the added readers
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        with self._fleet_lock:
+            existing = set(self.reader_ids)
+            added = []
+            while len(added) < count:
+                self._next_reader_number += 1
+                reader_id = f"RFID-READER-{str(self._next_reader_number).zfill(3)}"
+                if reader_id not in existing:
+                    added.append(reader_id)
+            self.reader_ids = list(self.reader_ids) + added
+
+        for reader_id in added:
+            self._send_device_status(reader_id, 'online')
+        print(f"[CONTROL] Added {count} RFID readers ({len(self.reader_ids)} total)")
+        return added
+
+    def remove_readers(self, count: int = 0, reader_ids: Optional[List[str]] = None) -> List[str]:
+        """
+        Remove RFID readers while the simulator runs
+
+        At least one reader is kept so events can still be generated.
+
+        Args:
+            count: Number of readers to remove from the end of the list
+            reader_ids: Specific readers to remove (instead of count)
+
+        Returns:
+            IDs of the removed readers
+        """
+        with self._fleet_lock:
+            if reader_ids:
+                wanted = set(reader_ids)
+                removed = [r for r in self.reader_ids if r in wanted]
+            else:
+                if count < 1:
+                    raise ValueError("count must be at least 1")
+                removed = list(self.reader_ids[max(len(self.reader_ids) - count, 0):])
+            removed_set = set(removed)
+            kept = [r for r in self.reader_ids if r not in removed_set]
+            if not kept:
+                raise ValueError("Cannot remove every RFID reader")
+            self.reader_ids = kept
+
+        for reader_id in removed:
+            self.last_heartbeat.pop(reader_id, None)
+            self._send_device_status(
+                reader_id,
+                'offline',
+                reason='intentional',
+                message='Reader removed at runtime'
+            )
+        print(f"[CONTROL] Removed {len(removed)} RFID readers ({len(self.reader_ids)} total)")
+        return removed
+
+    def announce_outages(self):
+        """Send offline/online statuses for all readers hit by a disconnect incident at once"""
+        if not self.incidents.has_disconnects("rfid"):
+            return
+        for reader_id in self.reader_ids:
+            self.incidents.is_offline("rfid", reader_id, None, self._send_device_status)
+
+    def heartbeat_all(self):
+        """Send due heartbeats for every reader that is not down (used while paused)"""
+        for reader_id in self.reader_ids:
+            if not self.incidents.is_offline("rfid", reader_id, None, self._send_device_status):
+                self._heartbeat_if_due(reader_id)
+
+    def pause(self):
+        """Stop sending events; heartbeats continue so readers stay online"""
+        self.paused = True
+
+    def resume(self):
+        """Resume sending events"""
+        self.paused = False
+
+    def get_metrics(self) -> Dict:
+        """Return event counters and the POST /api/logs latency histogram"""
+        return {
+            "readers": len(self.reader_ids),
+            "interval": self.interval,
+            "paused": self.paused,
+            "sent": self.events_sent,
+            "failed": self.events_failed,
+            "dropped": self.events_dropped,
+            "httpLatency": self.http_latency.to_dict(),
+        }
+
+    def shutdown(self):
+        """Stop generating events and send offline status for all readers"""
+        self.running = False
+        if self.mqtt_client:
+            print("Sending offline status for all readers...")
+            for reader_id in self.reader_ids:
+                self._send_device_status(
+                    reader_id,
+                    'offline',
+                    reason='intentional',
+                    message='Simulator shutting down gracefully'
+                )
+            time.sleep(1)
+            self.mqtt_client.loop_stop()
+            self.mqtt_client.disconnect()
+            self.mqtt_client = None
 
     def run_batch(self, num_events: int = 10):
         """
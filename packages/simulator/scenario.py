@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+Declarative Load Scenarios for Livestock IoT Simulator
+
+A scenario file (YAML or JSON) describes a load test as a versioned
+artifact instead of a set of environment variables:
+
+    name: weigh-day-north
+    seed: 42
+    clock: {mode: scaled, scale: 60}          # optional, see sim_clock.py
+    farms:
+      - name: North
+        barns: {count: 200, codePrefix: N, sensors: 5, readers: 2, herd: 40}
+      - name: South
+        barns:
+          - {code: S-1, id: 665f1c..., sensors: 10, readers: 1}
+    herd: {source: backend}                   # or synthetic (uses per-barn herd)
+    rates:
+      gasInterval: 10
+      rfidInterval: 5
+      workload: "rfid=70,weight=20,health=10"
+      schedule:
+        - {at: 10m, gasInterval: 5}
+        - {at: 30m, gasInterval: 2, rfidInterval: 1}
+    incidents:                                # see incident_engine.py
+      - {at: 10m, type: danger, barn: N-0003, duration: 5m}
+      - {at: 20m, type: gasBuildup, barn: N-0007, duration: 30m, ramp: 10m}
+      - {at: 40m, type: disconnect, barn: N-0010, duration: 5m, reconnectSpread: 30s}
+      - {at: 50m, type: errorBurst, kind: rfid, fraction: 0.2, duration: 2m}
+
+Barns, sensors and readers are expanded lazily: SensorView and ReaderView
+compute entries from their index, with sensor baselines hashed from the
+scenario seed and sensor ID, so 100k-device scenarios cost a few kilobytes
+and every run sees the same fleet.
+
+An incident with a barn code hits that barn's sensors and readers. Times
+("at", "duration", "ramp", "reconnectSpread") are seconds or "30s" / "10m" / "2h" and are
+measured in simulated time from the start of the run.
+
+Requirements: Simulator for load testing
+"""
+
+import abc
+import bisect
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from incident_engine import get_incident_engine, incident_from_spec
+from sim_clock import SimClock, get_clock, parse_clock_start, set_clock
+
+
+def parse_duration(value) -> float:
+    """Parse seconds or a "30s" / "10m" / "2h" / "1d" string"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    value = str(value).strip()
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+# Baseline ranges of a sensor (same as GasSensorSimulator._new_sensor)
+BASELINE_RANGES = {
+    "methanePpm": (200, 400),
+    "co2Ppm": (800, 1500),
+    "nh3Ppm": (5, 10),
+    "temperature": (20, 25),
+    "humidity": (50, 70),
+}
+
+
+def _unit_hash(key: str) -> float:
+    """Stable value in [0, 1) per key (much cheaper than seeding a Random)"""
+    return zlib.crc32(key.encode()) / 2**32
+
+
+class BarnGroup:
+    """A run of barns sharing per-barn device counts"""
+
+    def __init__(self, farm: str, codes: Sequence[str], ids: Sequence[Optional[str]], sensors: int, readers: int, herd: int):
+        self.farm = farm
+        self.codes = codes
+        self.ids = ids
+        self.sensors = sensors
+        self.readers = readers
+        self.herd = herd
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def barn_id(self, index: int) -> str:
+        """Backend barn ID, falling back to the code"""
+        return self.ids[index] or self.codes[index]
+
+
+class _CodeRange:
+    """Lazy sequence of generated barn codes ("N-0001", "N-0002", ...)"""
+
+    def __init__(self, prefix: str, count: int):
+        self.prefix = prefix
+        self.count = count
+        self.width = max(4, len(str(count)))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> str:
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return f"{self.prefix}-{index + 1:0{self.width}d}"
+
+
+class _NoIds:
+    """Placeholder ID sequence for generated barns (codes are used as IDs)"""
+
+    def __init__(self, count: int):
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> None:
+        return None
+
+
+class _DeviceView(Sequence):
+    """
+    Lazy sequence of per-barn devices across barn groups
+
+    A real Sequence (an abstract base class), so random.choice/sample work on
+    views without materializing them; subclasses implement _build.
+    """
+
+    def __init__(self, groups: List[BarnGroup], per_barn: str):
+        self.groups = [g for g in groups if getattr(g, per_barn) > 0]
+        self.per_barn = per_barn
+        # Cumulative device counts at the start of each group
+        self._starts = []
+        total = 0
+        for group in self.groups:
+            self._starts.append(total)
+            total += len(group) * getattr(group, per_barn)
+        self._total = total
+
+    def __len__(self) -> int:
+        return self._total
+
+    def _locate(self, index: int):
+        """(group, barn index within group, device number within barn)"""
+        if index < 0:
+            index += self._total
+        if not 0 <= index < self._total:
+            raise IndexError(index)
+        position = bisect.bisect_right(self._starts, index) - 1
+        group = self.groups[position]
+        offset = index - self._starts[position]
+        per_barn = getattr(group, self.per_barn)
+        return group, offset // per_barn, offset % per_barn
+
+    @abc.abstractmethod
+    def _build(self, index: int):
+        """Build the device at an index"""
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._build(i) for i in range(*index.indices(self._total))]
+        return self._build(index)
+
+    def __iter__(self) -> Iterator:
+        for index in range(self._total):
+            yield self._build(index)
+
+
+class SensorView(_DeviceView):
+    """Gas sensors of a scenario, built on access"""
+
+    def __init__(self, groups: List[BarnGroup], seed: int):
+        super().__init__(groups, "sensors")
+        self.seed = seed
+
+    def _build(self, index: int) -> Dict:
+        group, barn, number = self._locate(index)
+        sensor_id = f"GAS-{group.codes[barn]}-{number + 1}"
+        key = f"{self.seed}:{sensor_id}:"
+        return {
+            "sensorId": sensor_id,
+            "barnId": group.barn_id(barn),
+            "baseline": {
+                field: low + (high - low) * _unit_hash(key + field)
+                for field, (low, high) in BASELINE_RANGES.items()
+            },
+        }
+
+
+class ReaderView(_DeviceView):
+    """RFID reader IDs of a scenario, built on access"""
+
+    def __init__(self, groups: List[BarnGroup]):
+        super().__init__(groups, "readers")
+
+    def _build(self, index: int) -> str:
+        group, barn, number = self._locate(index)
+        return f"RFID-{group.codes[barn]}-{number + 1}"
+
+
+class HerdView(_DeviceView):
+    """Synthetic livestock IDs of a scenario (for stand-in backends)"""
+
+    def __init__(self, groups: List[BarnGroup]):
+        super().__init__(groups, "herd")
+
+    def _build(self, index: int) -> str:
+        group, barn, number = self._locate(index)
+        return f"LS-{group.codes[barn]}-{number + 1}"
+
+
+class Scenario:
+    """A parsed scenario file"""
+
+    def __init__(self, spec: Dict, source: str = "<dict>"):
+        """
+        Initialize from a parsed scenario document
+
+        Args:
+            spec: Scenario document
+            source: File name for messages
+        """
+        self.spec = spec
+        self.source = source
+        self.name = spec.get("name", os.path.splitext(os.path.basename(source))[0])
+        self.seed = spec.get("seed", 0)
+        self.duration = parse_duration(spec["duration"]) if "duration" in spec else None
+
+        rates = spec.get("rates") or {}
+        self.gas_interval = float(rates.get("gasInterval", 10))
+        self.rfid_interval = float(rates.get("rfidInterval", 30))
+        self.workload = rates.get("workload")
+        self.schedule = sorted(
+            ({**step, "at": parse_duration(step["at"])} for step in rates.get("schedule") or []),
+            key=lambda step: step["at"],
+        )
+        self.incidents = sorted(
+            (self._parse_incident(incident) for incident in spec.get("incidents") or []),
+            key=lambda incident: incident["at"],
+        )
+
+        self.groups = self._parse_barns(spec.get("farms") or [])
+        if not self.groups:
+            raise ValueError(f"{source}: scenario defines no barns")
+        self.herd_source = (spec.get("herd") or {}).get("source", "backend")
+        if self.herd_source not in ("backend", "synthetic"):
+            raise ValueError(f"{source}: herd source must be 'backend' or 'synthetic'")
+
+    def _parse_barns(self, farms: List[Dict]) -> List[BarnGroup]:
+        groups = []
+        for farm_index, farm in enumerate(farms):
+            farm_name = farm.get("name", f"Farm {farm_index + 1}")
+            barns = farm.get("barns") or []
+            if isinstance(barns, dict):
+                # Generated barns: {count, codePrefix, sensors, readers, herd}
+                prefix = barns.get("codePrefix", f"F{farm_index + 1}")
+                count = int(barns["count"])
+                groups.append(BarnGroup(
+                    farm_name,
+                    _CodeRange(prefix, count),
+                    _NoIds(count),
+                    int(barns.get("sensors", 1)),
+                    int(barns.get("readers", 0)),
+                    int(barns.get("herd", 0)),
+                ))
+                continue
+            for barn in barns:
+                groups.append(BarnGroup(
+                    farm_name,
+                    [barn["code"]],
+                    [barn.get("id")],
+                    int(barn.get("sensors", 1)),
+                    int(barn.get("readers", 0)),
+                    int(barn.get("herd", 0)),
+                ))
+        return groups
+
+    def configure_clock(self):
+        """Install the scenario's simulation clock, if it defines one"""
+        clock = self.spec.get("clock")
+        if not clock:
+            return
+        set_clock(SimClock(
+            mode=clock.get("mode", "realtime"),
+            scale=float(clock.get("scale", 60)),
+            start=parse_clock_start(clock.get("start")),
+            utc_offset=float(clock.get("utcOffset", 0)),
+        ))
+
+    def sensors(self) -> SensorView:
+        """Lazy view of every gas sensor"""
+        return SensorView(self.groups, self.seed)
+
+    def reader_ids(self) -> Optional[ReaderView]:
+        """Lazy view of every RFID reader (None if the scenario defines none)"""
+        view = ReaderView(self.groups)
+        return view if len(view) else None
+
+    def livestock_ids(self) -> Optional[HerdView]:
+        """Synthetic livestock IDs, or None to fetch the herd from the backend"""
+        return HerdView(self.groups) if self.herd_source == "synthetic" else None
+
+    def barn_ids(self) -> List[str]:
+        """Backend IDs (or codes) of every barn"""
+        return [group.barn_id(i) for group in self.groups for i in range(len(group))]
+
+    def _parse_incident(self, incident: Dict) -> Dict:
+        """Convert incident times to seconds and validate the spec"""
+        parsed = {**incident, "at": parse_duration(incident["at"]), "duration": parse_duration(incident.get("duration", 60))}
+        for key in ("ramp", "reconnectSpread"):
+            if key in parsed:
+                parsed[key] = parse_duration(parsed[key])
+        try:
+            incident_from_spec(parsed, start=0)
+        except ValueError as e:
+            raise ValueError(f"{self.source}: incident at {incident['at']}: {e}")
+        return parsed
+
+    def find_barn(self, code: str) -> Optional[str]:
+        """Barn ID for a barn code"""
+        for group in self.groups:
+            if isinstance(group.codes, _CodeRange):
+                prefix = f"{group.codes.prefix}-"
+                if code.startswith(prefix) and code[len(prefix):].isdigit():
+                    index = int(code[len(prefix):]) - 1
+                    if 0 <= index < len(group):
+                        return group.barn_id(index)
+            elif code in group.codes:
+                return group.barn_id(list(group.codes).index(code))
+        return None
+
+    def summary(self) -> str:
+        return (
+            f"{self.name}: {sum(len(g) for g in self.groups)} barns, {len(self.sensors())} sensors, "
+            f"{len(ReaderView(self.groups))} readers, {len(self.schedule)} rate changes, "
+            f"{len(self.incidents)} incidents"
+        )
+
+
+def load_scenario(path: str) -> Scenario:
+    """
+    Load a scenario file
+
+    Args:
+        path: .yaml/.yml (requires PyYAML) or .json file
+
+    Returns:
+        Parsed scenario
+    """
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("YAML scenarios require PyYAML: pip install pyyaml")
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+    return Scenario(spec, source=path)
+
+
+class ScenarioRunner:
+    """Applies a scenario's rate schedule and incidents while simulators run"""
+
+    def __init__(self, scenario: Scenario, simulators: Dict, loops: int = 0, start_timeout: float = 120):
+        """
+        Initialize the runner
+
+        Args:
+            scenario: Loaded scenario
+            simulators: Running simulator instances by name ("gas", "rfid",
+                "workload"); read when each step fires
+            loops: Simulation loops to wait for before time zero (each
+                registers as a clock participant when it starts running)
+            start_timeout: Wall-clock seconds to wait for them
+        """
+        self.scenario = scenario
+        self.simulators = simulators
+        self.loops = loops
+        self.start_timeout = start_timeout
+        self.clock = get_clock()
+        self.engine = get_incident_engine()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _apply_rate(self, step: Dict):
+        gas = self.simulators.get("gas")
+        rfid = self.simulators.get("rfid")
+        workload = self.simulators.get("workload")
+        if gas and "gasInterval" in step:
+            gas.interval = float(step["gasInterval"])
+        if rfid and "rfidInterval" in step:
+            rfid.interval = float(step["rfidInterval"])
+        if workload and "workloadInterval" in step:
+            workload.interval = float(step["workloadInterval"])
+        print(f"[SCENARIO] t+{step['at']:.0f}s rate change: {step}")
+
+    def _apply_incident(self, incident: Dict):
+        spec = dict(incident)
+        if "barn" in incident:
+            barn_id = self.scenario.find_barn(incident["barn"])
+            if not barn_id:
+                print(f"[SCENARIO] Skipping incident {incident}: unknown barn")
+                return
+            spec["barn"] = barn_id
+            # Scenario readers are named after their barn code (RFID-N-0001-1)
+            spec.setdefault("prefix", f"RFID-{incident['barn']}-")
+        self.engine.add(incident_from_spec(spec))
+        target = incident.get("barn") or incident.get("prefix") or incident.get("kind") or "all devices"
+        print(
+            f"[SCENARIO] t+{incident['at']:.0f}s {incident.get('type', 'danger')} in {target} "
+            f"for {incident['duration']:.0f}s"
+        )
+
+    def _wait_for_loops(self) -> bool:
+        """
+        Wait (wall-clock) until the simulation loops run; False if stopped
+
+        Called as a participant, so a fast clock cannot run ahead with the
+        loops that start first.
+        """
+        deadline = time.time() + self.start_timeout
+        while self.clock.participants() < self.loops + 1:
+            if time.time() >= deadline:
+                print(f"[SCENARIO] Simulators not running after {self.start_timeout:.0f}s, starting schedule anyway")
+                return True
+            if self._stop.wait(0.1):
+                return False
+        return True
+
+    def _loop(self):
+        events = [(step["at"], self._apply_rate, step) for step in self.scenario.schedule]
+        events += [(incident["at"], self._apply_incident, incident) for incident in self.scenario.incidents]
+        events.sort(key=lambda event: event[0])
+
+        # As a participant the runner holds a fast clock until its next step
+        with self.clock.participant():
+            if not self._wait_for_loops():
+                return
+            started = self.clock.time()
+            for at, apply, item in events:
+                if self.clock.sleep(started + at - self.clock.time(), self._stop):
+                    return
+                apply(item)
+
+            if self.scenario.duration is not None:
+                if self.clock.sleep(started + self.scenario.duration - self.clock.time(), self._stop):
+                    return
+                print(f"[SCENARIO] Duration of {self.scenario.duration:.0f}s reached, stopping")
+                for simulator in list(self.simulators.values()):
+                    simulator.stop()
+
+    def start(self):
+        """Start applying the schedule (time zero is when the simulation loops run)"""
+        self._thread = threading.Thread(target=self._loop, name="scenario", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Simulation Clock for Livestock IoT Simulator
+
+All generators, heartbeats and emitted timestamps read time from one clock so
+a full day of barn activity can be pushed through the backend in minutes:
+
+- realtime: wall-clock time (default, current behaviour)
+- scaled: simulated time runs N times faster than wall-clock time
+- fast: discrete-event mode; whenever every registered simulation loop is
+  sleeping, the clock jumps to the earliest wake-up time
+
+Simulated time starts at SIM_CLOCK_START (ISO 8601 or relative such as
+"-24h"). Accelerated runs default to starting 24 hours ago, since the backend
+rejects future dates for several fields. Simulated time never passes
+wall-clock time: once it catches up, the clock continues in real time
+(speedup 1). From the default start an accelerated run therefore covers at
+most 24 simulated hours (24h / SIM_CLOCK_SCALE of wall time when scaled);
+start further back (e.g. "-7d") for longer accelerated runs.
+
+Durations that describe the system under test (PUBACK and HTTP latency,
+connection timeouts) keep using wall-clock time.
+
+Requirements: Simulator for load testing
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+MODES = ("realtime", "scaled", "fast")
+
+
+def parse_clock_start(value: Optional[str]) -> Optional[float]:
+    """
+    Parse SIM_CLOCK_START into epoch seconds
+
+    Accepts ISO 8601 ("2024-06-01T00:00:00Z") or an offset from now in
+    hours/minutes/days ("-24h", "-90m", "-7d").
+    """
+    if not value:
+        return None
+    units = {"m": 60, "h": 3600, "d": 86400}
+    if value[-1] in units and value[:-1].lstrip("+-").replace(".", "", 1).isdigit():
+        return time.time() + float(value[:-1]) * units[value[-1]]
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def diurnal_wave(hour: float, peak_hour: float) -> float:
+    """
+    Daily cosine cycle between -1 and 1
+
+    Args:
+        hour: Local hour of day (fractional)
+        peak_hour: Hour at which the wave is highest
+    """
+    return math.cos(2 * math.pi * (hour - peak_hour) / 24)
+
+
+def diurnal_factor(hour: float, peak_hour: float, amplitude: float) -> float:
+    """
+    Daily cycle around 1.0
+
+    Args:
+        hour: Local hour of day (fractional)
+        peak_hour: Hour at which the factor is highest
+        amplitude: Relative swing (0.2 = +/-20%)
+
+    Returns:
+        Value between 1 - amplitude and 1 + amplitude
+    """
+    return 1 + amplitude * diurnal_wave(hour, peak_hour)
+
+
+class SimClock:
+    """Wall-clock, scaled or discrete-event simulation time"""
+
+    def __init__(
+        self,
+        mode: str = "realtime",
+        scale: float = 1.0,
+        start: Optional[float] = None,
+        utc_offset: float = 0.0,
+    ):
+        """
+        Initialize the clock
+
+        Args:
+            mode: realtime, scaled or fast
+            scale: Simulated seconds per wall-clock second (scaled mode)
+            start: Simulated epoch seconds at creation (default: now, or
+                24 hours ago for scaled and fast modes); the clock switches
+                to real time when it reaches wall-clock time
+            utc_offset: Hours added to UTC for hour_of_day() (farm local time)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown clock mode '{mode}' (choose from: {', '.join(MODES)})")
+        if mode == "scaled" and scale <= 0:
+            raise ValueError("Clock scale must be positive")
+
+        self.mode = mode
+        self.scale = scale if mode == "scaled" else 1.0
+        self.utc_offset = utc_offset
+
+        wall = time.time()
+        if start is None:
+            start = wall if mode == "realtime" else wall - 86400
+        self._wall_origin = wall
+        self._sim_origin = start
+        self._caught_up = False
+
+        # Discrete-event state (fast mode)
+        self._now = start
+        self._cond = threading.Condition()
+        self._participants = set()
+        self._sleepers: Dict[int, float] = {}
+
+    @property
+    def speedup(self) -> Optional[float]:
+        """
+        Simulated seconds per wall-clock second (None in fast mode)
+
+        1.0 once simulated time has caught up with wall-clock time.
+        """
+        if self._caught_up:
+            return 1.0
+        return None if self.mode == "fast" else self.scale
+
+    @property
+    def caught_up(self) -> bool:
+        """True once simulated time has reached wall-clock time"""
+        return self._caught_up
+
+    def _clamp(self, moment: float) -> float:
+        """Limit a simulated time to wall-clock time, switching to real time"""
+        wall = time.time()
+        if moment < wall:
+            return moment
+        if not self._caught_up:
+            self._caught_up = True
+            print("[CLOCK  ] Simulated time caught up with wall-clock time; continuing in real time")
+        return wall
+
+    def time(self) -> float:
+        """Current simulated time in epoch seconds (never after wall-clock time)"""
+        if self._caught_up or (self.mode == "realtime" and self._sim_origin == self._wall_origin):
+            return time.time()
+        if self.mode == "fast":
+            with self._cond:
+                return self._clamp(self._now)
+        return self._clamp(self._sim_origin + (time.time() - self._wall_origin) * self.scale)
+
+    def now(self) -> datetime:
+        """Current simulated time as an aware UTC datetime"""
+        return datetime.fromtimestamp(self.time(), tz=timezone.utc)
+
+    def iso_now(self, offset: float = 0.0) -> str:
+        """
+        Current simulated time as ISO 8601 with a Z suffix
+
+        Args:
+            offset: Seconds added to the current time (negative for the past)
+        """
+        moment = self.now() + timedelta(seconds=offset)
+        return moment.isoformat().replace("+00:00", "Z")
+
+    def hour_of_day(self) -> float:
+        """Fractional local hour of the simulated time"""
+        seconds = (self.time() + self.utc_offset * 3600) % 86400
+        return seconds / 3600
+
+    def participants(self) -> int:
+        """Number of registered simulation loops"""
+        with self._cond:
+            return len(self._participants)
+
+    @contextmanager
+    def participant(self):
+        """
+        Register the calling thread as a simulation loop
+
+        In fast mode time only advances while every participant sleeps, so
+        a loop doing work (e.g. waiting on an HTTP response) holds the clock.
+        """
+        ident = threading.get_ident()
+        with self._cond:
+            self._participants.add(ident)
+        try:
+            yield self
+        finally:
+            with self._cond:
+                self._participants.discard(ident)
+                self._sleepers.pop(ident, None)
+                self._advance()
+                self._cond.notify_all()
+
+    def _advance(self):
+        """Jump to the earliest wake-up if all participants sleep (lock held)"""
+        if not self._sleepers:
+            return
+        if not self._participants.issubset(self._sleepers):
+            return
+        earliest = min(self._sleepers.values())
+        # A sleeper that is already due has not run yet; let it go first
+        if earliest > self._now:
+            self._now = self._clamp(earliest)
+
+    def sleep(self, seconds: float, wake: Optional[threading.Event] = None) -> bool:
+        """
+        Sleep for a simulated duration
+
+        Args:
+            seconds: Simulated seconds to sleep
+            wake: Event that ends the sleep early when set (e.g. stop())
+
+        Returns:
+            True if woken by the event, False if the time elapsed
+        """
+        if seconds <= 0:
+            return bool(wake and wake.is_set())
+
+        self.time()  # Notice catching up with wall-clock time
+        if self.mode != "fast" or self._caught_up:
+            real_seconds = seconds / self.speedup
+            if wake:
+                return wake.wait(real_seconds)
+            time.sleep(real_seconds)
+            return False
+
+        ident = threading.get_ident()
+        with self._cond:
+            wake_at = self._now + seconds
+            self._sleepers[ident] = wake_at
+            try:
+                self._advance()
+                self._cond.notify_all()
+                while self._now < wake_at:
+                    if wake and wake.is_set():
+                        return True
+                    if self._caught_up:
+                        # Caught up while sleeping: finish in real time
+                        self._cond.wait(max(min(wake_at - time.time(), 0.05), 0))
+                        if time.time() >= wake_at:
+                            break
+                        continue
+                    # Short timeout so a set wake event is noticed promptly
+                    self._cond.wait(0.05)
+            finally:
+                self._sleepers.pop(ident, None)
+        return bool(wake and wake.is_set())
+
+
+_clock: Optional[SimClock] = None
+_clock_lock = threading.Lock()
+
+
+def clock_from_env() -> SimClock:
+    """Create a clock configured from environment variables"""
+    return SimClock(
+        mode=os.getenv("SIM_CLOCK_MODE", "realtime"),
+        scale=float(os.getenv("SIM_CLOCK_SCALE", "60")),
+        start=parse_clock_start(os.getenv("SIM_CLOCK_START")),
+        utc_offset=float(os.getenv("SIM_CLOCK_UTC_OFFSET", "0")),
+    )
+
+
+def get_clock() -> SimClock:
+    """Return the process-wide clock, creating it from the environment"""
+    global _clock
+    with _clock_lock:
+        if _clock is None:
+            _clock = clock_from_env()
+        return _clock
+
+
+def set_clock(clock: SimClock):
+    """Replace the process-wide clock (call before starting simulators)"""
+    global _clock
+    with _clock_lock:
+        _clock = clock
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Soak Monitor for Livestock IoT Simulator
+
+Samples the simulator process while it runs for hours or days and writes a
+compact time series (one CSV row per sample):
+
+- RSS and open sockets of this process
+- Pending (unacknowledged) MQTT messages in the paho client, and readings
+  waiting in gateway batches
+- Size of per-device bookkeeping (last_heartbeat, livestock_locations)
+- Achieved readings/events per second in the last interval vs. target
+
+Every few samples the series is checked for monotonic growth (leaks in the
+load generator, or QoS 1 acks lagging in the broker/backend) and for the
+achieved rate drifting away from the configured rate.
+
+Requirements: Simulator for load testing
+"""
+
+import csv
+import os
+import resource
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sim_clock import get_clock
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Not Linux: fall back to peak RSS (KiB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _open_sockets() -> int:
+    """Number of open sockets of this process (-1 if unavailable)"""
+    try:
+        fds = os.listdir("/proc/self/fd")
+    except OSError:
+        return -1
+    count = 0
+    for fd in fds:
+        try:
+            if os.readlink(f"/proc/self/fd/{fd}").startswith("socket:"):
+                count += 1
+        except OSError:
+            continue
+    return count
+
+
+def _slope(values: List[float]) -> float:
+    """Least-squares slope per sample"""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    numerator = sum((i - mean_x) * (v - mean_y) for i, v in enumerate(values))
+    denominator = sum((i - mean_x) ** 2 for i in range(n))
+    return numerator / denominator
+
+
+def detect_growth(
+    values: List[float],
+    min_samples: int = 12,
+    min_increase_ratio: float = 0.8,
+    min_relative_growth: float = 0.0,
+) -> bool:
+    """
+    Flag a series that keeps growing
+
+    A series is flagged when its trend is positive, most consecutive steps
+    do not decrease, and the last quarter sits above the first quarter by
+    more than min_relative_growth.
+
+    Args:
+        values: Samples in time order
+        min_samples: Minimum samples before judging
+        min_increase_ratio: Share of non-decreasing steps required
+        min_relative_growth: Growth of the last quarter over the first quarter
+            to ignore (e.g. allocator noise in RSS)
+    """
+    if len(values) < min_samples:
+        return False
+    steps = [b - a for a, b in zip(values, values[1:])]
+    non_decreasing = sum(1 for d in steps if d >= 0) / len(steps)
+    quarter = max(len(values) // 4, 1)
+    first = sum(values[:quarter]) / quarter
+    last = sum(values[-quarter:]) / quarter
+    return _slope(values) > 0 and non_decreasing >= min_increase_ratio and last > first * (1 + min_relative_growth)
+
+
+class SoakMonitor:
+    """Samples resource usage and rate of running simulators"""
+
+    # Metrics checked for monotonic growth, with the relative growth to ignore
+    GROWTH_METRICS = {
+        "rssMb": 0.05,
+        "sockets": 0.0,
+        "threads": 0.0,
+        "mqttPending": 0.0,
+        "pahoQueue": 0.0,
+        "gatewayBuffered": 0.0,
+        "heartbeats": 0.0,
+        "livestockLocations": 0.0,
+    }
+
+    def __init__(
+        self,
+        simulators: Dict,
+        output_file: str = "soak.csv",
+        sample_interval: float = 60,
+        window: int = 60,
+        drift_tolerance: float = 0.1,
+    ):
+        """
+        Initialize the soak monitor
+
+        Args:
+            simulators: Running simulators by name ("gas", "rfid"); read on
+                every sample so simulators may register after start()
+            output_file: CSV file the time series is appended to
+            sample_interval: Seconds between samples
+            window: Samples kept in memory for growth/drift detection
+            drift_tolerance: Allowed relative deviation of achieved vs target rate
+        """
+        self.simulators = simulators
+        self.output_file = output_file
+        self.sample_interval = sample_interval
+        self.window = window
+        self.drift_tolerance = drift_tolerance
+
+        self.history: Dict[str, List[float]] = {}
+        self.flags: Dict[str, str] = {}
+        self.started_at: Optional[float] = None
+        self._last_counts = {"readings": 0, "events": 0}
+        self._last_paused = {"readings": False, "events": False}
+        self._last_sample_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def gas(self):
+        """Observed GasSensorSimulator (None until registered)"""
+        return self.simulators.get("gas")
+
+    @property
+    def rfid(self):
+        """Observed RFIDReaderSimulator (None until registered)"""
+        return self.simulators.get("rfid")
+
+    def _target_rates(self, paused: Dict[str, bool]) -> Dict[str, float]:
+        """
+        Configured readings/s and events/s in wall-clock time (0 = unknown)
+
+        A simulator paused now or at the previous sample has no target, so
+        drift checks skip the samples around a pause and restart after it.
+        """
+        targets = {"readings": 0.0, "events": 0.0}
+        speedup = get_clock().speedup
+        if not speedup:
+            return targets  # Fast clock: no fixed target rate
+        if self.gas and self.gas.interval and not paused["readings"]:
+            targets["readings"] = len(self.gas.sensors) / self.gas.interval * speedup
+        if self.rfid and self.rfid.interval and not paused["events"]:
+            targets["events"] = 1 / self.rfid.interval * speedup
+        return targets
+
+    def sample(self) -> Dict[str, float]:
+        """Take one sample"""
+        now = time.time()
+        gas, rfid = self.gas, self.rfid
+        elapsed = now - self._last_sample_at if self._last_sample_at else 0.0
+        self._last_sample_at = now
+
+        # In gateway mode published counts readings once their batch is
+        # published, so the rate is comparable with individual publishing
+        readings = gas.published if gas else 0
+        batcher = gas.batcher if gas else None
+        events = rfid.events_sent if rfid else 0
+        paused_now = {"readings": bool(gas and gas.paused), "events": bool(rfid and rfid.paused)}
+        targets = self._target_rates({key: paused_now[key] or self._last_paused[key] for key in paused_now})
+        self._last_paused = paused_now
+
+        row = {
+            "timestamp": round(now, 1),
+            "uptime": round(now - self.started_at, 1),
+            "rssMb": round(_rss_bytes() / (1024 * 1024), 2),
+            "sockets": _open_sockets(),
+            "threads": threading.active_count(),
+            "mqttPending": gas.pending_messages() if gas else 0,
+            "pahoQueue": len(getattr(gas.client, "_out_messages", {})) if gas and gas.client else 0,
+            "gatewayBuffered": sum(len(b) for b in list(batcher.buffers.values())) if batcher else 0,
+            "heartbeats": (len(gas.last_heartbeat) if gas else 0) + (len(rfid.last_heartbeat) if rfid else 0),
+            "livestockLocations": len(rfid.livestock_locations) if rfid else 0,
+            "readingsPerSec": round((readings - self._last_counts["readings"]) / elapsed, 2) if elapsed else 0.0,
+            "targetReadingsPerSec": round(targets["readings"], 2),
+            "eventsPerSec": round((events - self._last_counts["events"]) / elapsed, 3) if elapsed else 0.0,
+            "targetEventsPerSec": round(targets["events"], 3),
+            "pubackP99": round(gas.puback_latency.percentile(99), 1) if gas else 0.0,
+        }
+        self._last_counts = {"readings": readings, "events": events}
+        return row
+
+    def _record(self, row: Dict[str, float]):
+        """Append a row to the CSV and the in-memory window"""
+        new_file = not os.path.exists(self.output_file)
+        with open(self.output_file, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(row))
+            if new_file:
+                writer.writeheader()
+            writer.writerow(row)
+
+        for key, value in row.items():
+            series = self.history.setdefault(key, [])
+            series.append(value)
+            del series[:-self.window]
+
+    def check(self) -> Dict[str, str]:
+        """
+        Look for monotonic growth and rate drift in the current window
+
+        Returns:
+            Newly raised flags (metric -> description)
+        """
+        raised = {}
+        for key, noise in self.GROWTH_METRICS.items():
+            if key not in self.flags and detect_growth(self.history.get(key, []), min_relative_growth=noise):
+                series = self.history[key]
+                raised[key] = f"{key} keeps growing ({series[0]} -> {series[-1]} over {len(series)} samples)"
+
+        for achieved_key, target_key in (("readingsPerSec", "targetReadingsPerSec"), ("eventsPerSec", "targetEventsPerSec")):
+            achieved = self.history.get(achieved_key, [])[1:]  # first sample has no rate
+            targets = self.history.get(target_key, [])[1:]
+            recent = list(zip(achieved, targets))[-5:]
+            if len(recent) < 5 or not all(target for _, target in recent):
+                continue
+            deviations = [abs(a - t) / t for a, t in recent]
+            flag_key = f"{achieved_key}Drift"
+            if min(deviations) > self.drift_tolerance:
+                if flag_key not in self.flags:
+                    raised[flag_key] = (
+                        f"{achieved_key} drifted from target: {recent[-1][0]} vs {recent[-1][1]} "
+                        f"(>{self.drift_tolerance * 100:.0f}% for {len(recent)} samples)"
+                    )
+            else:
+                self.flags.pop(flag_key, None)
+
+        for key, message in raised.items():
+            self.flags[key] = message
+            print(f"[SOAK   ] WARNING: {message}")
+        return raised
+
+    def _loop(self):
+        while not self._stop.wait(self.sample_interval):
+            row = self.sample()
+            self._record(row)
+            print(
+                f"[SOAK   ] uptime={row['uptime'] / 3600:.2f}h rss={row['rssMb']}MB sockets={row['sockets']} "
+                f"pending={row['mqttPending']} rate={row['readingsPerSec']}/{row['targetReadingsPerSec']} rdg/s"
+            )
+            self.check()
+
+    def start(self):
+        """Start sampling in the background"""
+        self.started_at = time.time()
+        self.sample()  # establish counter baseline
+        self._thread = threading.Thread(target=self._loop, name="soak-monitor", daemon=True)
+        self._thread.start()
+        print(f"Soak monitor writing to {self.output_file} every {self.sample_interval}s")
+
+    def stop(self):
+        """Stop sampling and print a summary of raised flags"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        print("\nSoak summary:")
+        if not self.flags:
+            print("  No growth or drift detected")
+        for message in self.flags.values():
+            print(f"  - {message}")
+
+
+def soak_monitor_from_env(simulators: Dict) -> Optional[SoakMonitor]:
+    """Create a soak monitor if SOAK_OUTPUT is set, otherwise None"""
+    output_file = os.getenv("SOAK_OUTPUT")
+    if not output_file:
+        return None
+    return SoakMonitor(
+        simulators,
+        output_file=output_file,
+        sample_interval=float(os.getenv("SOAK_SAMPLE_INTERVAL", "60")),
+        window=int(os.getenv("SOAK_WINDOW", "60")),
+        drift_tolerance=float(os.getenv("SOAK_DRIFT_TOLERANCE", "0.1")),
+    )
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+Stub Backend for Livestock IoT Simulator
+
+A lightweight in-memory stand-in for the NestJS backend, so the RFID,
+workload, provisioning and capacity tools can run on an isolated box. It
+mirrors the request and response shapes the simulators rely on:
+
+    GET  /                                    health check
+    POST /api/auth/login, /api/auth/refresh   {accessToken, refreshToken}
+    GET  /api/auth/me                         {id, email, role}
+    GET  /api/livestock, /api/barns, /api/farms, /api/logs
+                                              paginated {data, meta}, ?search=
+    POST /api/livestock, /api/barns, /api/farms
+    POST /api/barns/:id/sensors               assign a gas sensor (409 if taken)
+    POST /api/logs                            RFID entry/exit event
+    POST /api/livestock/:id/weight-entries, /api/livestock/:id/health-events
+    GET  /api/logs/recent, /api/dashboard/statistics
+    GET  /stub/stats                          request counters (no auth, no faults)
+
+Every /api request except login and refresh needs a Bearer token from
+login. Artificial latency (fixed plus random jitter) and an error rate
+(HTTP 503 by default) apply to all /api requests and are drawn from a
+seeded random generator, so retry and backpressure behavior repeat.
+
+Usage:
+    python stub_backend.py
+    BACKEND_API_URL=http://localhost:3001 python main.py
+
+Requirements: Simulator for load testing
+"""
+
+import base64
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Collections with list/create endpoints and the fields searched by ?search=
+COLLECTIONS = {
+    "farms": ("name",),
+    "barns": ("name", "code"),
+    "livestock": ("name", "earTagId"),
+}
+
+# Required fields per create endpoint (a subset of the backend's DTOs)
+REQUIRED_FIELDS = {
+    "farms": ("name",),
+    "barns": ("name", "code", "farmId"),
+    "livestock": ("earTagId", "species", "farmId"),
+    "logs": ("livestockId", "barnId", "eventType", "rfidReaderId"),
+    "weight-entries": ("weight",),
+    "health-events": ("eventType",),
+}
+
+# Fields that must be unique within a collection (409 on conflict)
+UNIQUE_FIELDS = {"barns": "code", "livestock": "earTagId"}
+
+# Refresh token lifetime in seconds (the backend's default jwt.refreshExpiresIn is 7d)
+REFRESH_TOKEN_LIFETIME = 7 * 86400
+
+
+def object_id(prefix: int, number: int) -> str:
+    """Deterministic 24-hex-digit ID that passes the backend's IsMongoId checks"""
+    return f"{prefix:02x}{number:022x}"
+
+
+def make_token(subject: str, lifetime: float) -> str:
+    """Unsigned JWT-shaped token whose exp claim AuthManager can read"""
+    def encode(data: Dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+    claims = {"sub": subject, "exp": int(time.time() + lifetime), "jti": uuid.uuid4().hex}
+    return f"{encode({'alg': 'none', 'typ': 'JWT'})}.{encode(claims)}.stub"
+
+
+class StubBackend:
+    """In-memory backend with injectable latency and errors"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 3001,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: Optional[int] = None,
+        num_barns: int = 5,
+        num_livestock: int = 50,
+        token_lifetime: float = 900,
+    ):
+        """
+        Initialize the stub backend with seeded barns and livestock
+
+        Args:
+            host: Interface to bind
+            port: TCP port (0 picks a free port)
+            latency_ms: Delay added to every /api request
+            jitter_ms: Extra uniform random delay, 0..jitter_ms
+            error_rate: Probability that an /api request fails
+            error_status: HTTP status of injected failures (e.g. 500, 503, 429)
+            seed: Seed for latency and error decisions (None: random)
+            num_barns: Barns created at startup
+            num_livestock: Livestock created at startup (spread over barns)
+            token_lifetime: Seconds until access tokens expire
+        """
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.token_lifetime = token_lifetime
+
+        self.server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        # Access and refresh tokens -> expiry
+        self.tokens: Dict[str, float] = {}
+        self.refresh_tokens: Dict[str, float] = {}
+        self.user = {"id": object_id(0xAD, 1), "email": "admin@example.com", "role": "ADMIN"}
+
+        self.collections: Dict[str, Dict[str, Dict]] = {name: {} for name in COLLECTIONS}
+        self._next_id = 0
+        self.sensor_assignments: Dict[str, str] = {}
+        # Only counts and the latest events are kept, so long runs stay small
+        self.recent_logs: deque = deque(maxlen=100)
+        self.log_count = 0
+        self.child_counts: Counter = Counter()
+        self.requests: Counter = Counter()
+        self.injected_errors = 0
+
+        self._seed_data(num_barns, num_livestock)
+
+    def _seed_data(self, num_barns: int, num_livestock: int):
+        farm_id = object_id(0xFA, 1)
+        self.collections["farms"][farm_id] = {"id": farm_id, "name": "Stub Farm", "ownerId": self.user["id"]}
+        barn_ids = []
+        for i in range(1, num_barns + 1):
+            barn_id = object_id(0xBA, i)
+            barn_ids.append(barn_id)
+            self.collections["barns"][barn_id] = {
+                "id": barn_id,
+                "name": f"Stub Barn {i}",
+                "code": f"STUB-B{i:03d}",
+                "capacity": 100,
+                "farmId": farm_id,
+            }
+        for i in range(1, num_livestock + 1):
+            livestock_id = object_id(0x1C, i)
+            self.collections["livestock"][livestock_id] = {
+                "id": livestock_id,
+                "earTagId": f"STUB-{i:05d}",
+                "name": f"Stub {i}",
+                "species": "cattle",
+                "gender": "female" if i % 2 else "male",
+                "weight": 400,
+                "farmId": farm_id,
+                "currentBarnId": barn_ids[i % len(barn_ids)] if barn_ids else None,
+            }
+
+    def _fault(self) -> Tuple[float, bool]:
+        """Draw the delay and whether this request fails"""
+        with self._lock:
+            delay = self.latency_ms + (self.random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+            failed = bool(self.error_rate) and self.random.random() < self.error_rate
+        return delay / 1000, failed
+
+    def _authorized(self, headers) -> bool:
+        auth = headers.get("Authorization") or ""
+        if not auth.startswith("Bearer "):
+            return False
+        with self._lock:
+            expires_at = self.tokens.get(auth[len("Bearer "):])
+        return expires_at is not None and expires_at > time.time()
+
+    def _issue_tokens(self) -> Dict:
+        access_token = make_token(self.user["id"], self.token_lifetime)
+        refresh_token = uuid.uuid4().hex
+        with self._lock:
+            now = time.time()
+            # Drop expired tokens so long runs don't accumulate them
+            if len(self.tokens) > 1000:
+                self.tokens = {t: exp for t, exp in self.tokens.items() if exp > now}
+            if len(self.refresh_tokens) > 1000:
+                self.refresh_tokens = {t: exp for t, exp in self.refresh_tokens.items() if exp > now}
+            self.tokens[access_token] = now + self.token_lifetime
+            self.refresh_tokens[refresh_token] = now + REFRESH_TOKEN_LIFETIME
+        return {"accessToken": access_token, "refreshToken": refresh_token}
+
+    def _paginate(self, items: List[Dict], query: Dict) -> Tuple[int, Dict]:
+        """Page a list like the backend's PaginationDto (400 on invalid page/limit)"""
+        values = {}
+        errors = []
+        for field, default, maximum in (("page", "1", None), ("limit", "10", 100)):
+            raw = query.get(field, [default])[0]
+            try:
+                value = int(raw)
+            except ValueError:
+                errors.append(f"{field} must be an integer number")
+                continue
+            if value < 1:
+                errors.append(f"{field} must not be less than 1")
+            elif maximum is not None and value > maximum:
+                errors.append(f"{field} must not be greater than {maximum}")
+            values[field] = value
+        if errors:
+            return 400, {"statusCode": 400, "message": errors}
+
+        page, limit = values["page"], values["limit"]
+        total = len(items)
+        total_pages = (total + limit - 1) // limit
+        return 200, {
+            "data": items[(page - 1) * limit:page * limit],
+            "meta": {
+                "total": total,
+                "page": page,
+                "limit": limit,
+                "totalPages": total_pages,
+                "hasNextPage": page < total_pages,
+                "hasPrevPage": page > 1,
+            },
+        }
+
+    def _list(self, name: str, query: Dict) -> Tuple[int, Dict]:
+        with self._lock:
+            items = list(self.collections[name].values())
+        search = (query.get("search") or [""])[0].lower()
+        if search:
+            fields = COLLECTIONS[name]
+            items = [item for item in items if any(search in str(item.get(f, "")).lower() for f in fields)]
+        return self._paginate(items, query)
+
+    def _missing(self, kind: str, body: Dict) -> Optional[Tuple[int, Dict]]:
+        missing = [field for field in REQUIRED_FIELDS[kind] if body.get(field) in (None, "")]
+        if missing:
+            return 400, {"statusCode": 400, "message": [f"{field} should not be empty" for field in missing]}
+        return None
+
+    def _create(self, name: str, body: Dict) -> Tuple[int, Dict]:
+        error = self._missing(name, body)
+        if error:
+            return error
+        unique = UNIQUE_FIELDS.get(name)
+        with self._lock:
+            collection = self.collections[name]
+            if unique and any(item.get(unique) == body[unique] for item in collection.values()):
+                return 409, {"statusCode": 409, "message": f"{unique} already exists"}
+            self._next_id += 1
+            item_id = object_id(0xC0, self._next_id)
+            item = {**body, "id": item_id}
+            collection[item_id] = item
+        return 201, item
+
+    def _post_log(self, body: Dict) -> Tuple[int, Dict]:
+        error = self._missing("logs", body)
+        if error:
+            return error
+        if body["eventType"] not in ("entry", "exit"):
+            return 400, {"statusCode": 400, "message": ["eventType must be entry or exit"]}
+        with self._lock:
+            self.log_count += 1
+            log = {**body, "id": object_id(0x10, self.log_count)}
+            self.recent_logs.append(log)
+        return 201, log
+
+    def _statistics(self) -> Dict:
+        with self._lock:
+            return {
+                "totalLivestock": len(self.collections["livestock"]),
+                "totalBarns": len(self.collections["barns"]),
+                "totalLogs": self.log_count,
+                "weightEntries": self.child_counts["weight-entries"],
+                "healthEvents": self.child_counts["health-events"],
+            }
+
+    def handle(self, method: str, path: str, query: Dict, body: Dict, headers) -> Tuple[int, Dict]:
+        """
+        Route one request (latency and faults are applied by the caller)
+
+        Returns:
+            HTTP status code and JSON response body
+        """
+        parts = [part for part in path.split("/") if part]
+        if not parts:
+            return 200, {"status": "ok"}
+        if parts == ["stub", "stats"]:
+            return 200, self.stats()
+        if parts[0] != "api":
+            return 404, {"statusCode": 404, "message": f"Cannot {method} {path}"}
+        route = parts[1:]
+
+        if method == "POST" and route == ["auth", "login"]:
+            if not body.get("email") or not body.get("password"):
+                return 400, {"statusCode": 400, "message": ["email and password are required"]}
+            return 200, self._issue_tokens()
+        if method == "POST" and route == ["auth", "refresh"]:
+            with self._lock:
+                expires = self.refresh_tokens.pop(body.get("refreshToken") or "", 0)
+            if expires <= time.time():
+                return 401, {"statusCode": 401, "message": "Invalid refresh token"}
+            return 200, self._issue_tokens()
+
+        if not self._authorized(headers):
+            return 401, {"statusCode": 401, "message": "Unauthorized"}
+
+        if route == ["auth", "me"]:
+            return 200, self.user
+        if len(route) == 1 and route[0] in COLLECTIONS:
+            if method == "GET":
+                return self._list(route[0], query)
+            if method == "POST":
+                return self._create(route[0], body)
+        if route == ["logs"]:
+            if method == "POST":
+                return self._post_log(body)
+            with self._lock:
+                logs = list(reversed(self.recent_logs))
+            return self._paginate(logs, query)
+        if route == ["logs", "recent"]:
+            with self._lock:
+                return 200, list(reversed(self.recent_logs))[:20]
+        if route == ["dashboard", "statistics"]:
+            return 200, self._statistics()
+        if method == "POST" and len(route) == 3 and route[0] == "barns" and route[2] == "sensors":
+            sensor_id = body.get("sensorId")
+            if not sensor_id:
+                return 400, {"statusCode": 400, "message": ["sensorId should not be empty"]}
+            with self._lock:
+                if route[1] not in self.collections["barns"]:
+                    return 404, {"statusCode": 404, "message": "Barn not found"}
+                if sensor_id in self.sensor_assignments:
+                    return 409, {"statusCode": 409, "message": "Sensor already assigned"}
+                self.sensor_assignments[sensor_id] = route[1]
+            return 201, {"barnId": route[1], "sensorId": sensor_id}
+        if method == "POST" and len(route) == 3 and route[0] == "livestock" and route[2] in ("weight-entries", "health-events"):
+            error = self._missing(route[2], body)
+            if error:
+                return error
+            with self._lock:
+                if route[1] not in self.collections["livestock"]:
+                    return 404, {"statusCode": 404, "message": "Livestock not found"}
+                self.child_counts[route[2]] += 1
+                item_id = object_id(0x20, sum(self.child_counts.values()))
+            return 201, {**body, "id": item_id, "livestockId": route[1]}
+
+        return 404, {"statusCode": 404, "message": f"Cannot {method} {path}"}
+
+    def stats(self) -> Dict:
+        """Request counters by route and injected error count"""
+        with self._lock:
+            return {
+                "requests": dict(self.requests),
+                "injectedErrors": self.injected_errors,
+                "logs": self.log_count,
+                **{name: len(items) for name, items in self.collections.items()},
+            }
+
+    def _route_key(self, method: str, path: str) -> str:
+        """Counter key with IDs replaced, e.g. "POST /api/barns/:id/sensors" """
+        parts = path.split("/")
+        if len(parts) >= 5:
+            parts[3] = ":id"
+        return f"{method} {'/'.join(parts)}"
+
+    def start(self):
+        """Start serving in a background thread"""
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Read by BaseHTTPRequestHandler: keep connections alive like the backend
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self, method: str):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+
+                if url.path.startswith("/api/"):
+                    with backend._lock:
+                        backend.requests[backend._route_key(method, url.path)] += 1
+                    delay, failed = backend._fault()
+                    if delay:
+                        time.sleep(delay)
+                    if failed:
+                        with backend._lock:
+                            backend.injected_errors += 1
+                        status = backend.error_status
+                        self._send(status, {"statusCode": status, "message": "Injected error"})
+                        return
+
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    self._send(400, {"statusCode": 400, "message": "Body must be JSON"})
+                    return
+                if not isinstance(body, dict):
+                    self._send(400, {"statusCode": 400, "message": "Body must be a JSON object"})
+                    return
+                self._send(*backend.handle(method, url.path, parse_qs(url.query), body, self.headers))
+
+            def _send(self, status: int, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_POST(self):
+                self._respond("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stub-backend", daemon=True)
+        self._thread.start()
+        print(f"Stub backend listening on http://{self.host}:{self.port}")
+        print(
+            f"  {len(self.collections['barns'])} barns, {len(self.collections['livestock'])} livestock; "
+            f"latency {self.latency_ms:.0f}ms + 0-{self.jitter_ms:.0f}ms, "
+            f"error rate {self.error_rate:.1%} (HTTP {self.error_status})"
+        )
+
+    def stop(self):
+        """Stop serving"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def main():
+    """Main entry point for the stub backend"""
+    seed = os.getenv("STUB_SEED")
+    backend = StubBackend(
+        host=os.getenv("STUB_BACKEND_HOST", "127.0.0.1"),
+        port=int(os.getenv("STUB_BACKEND_PORT", "3001")),
+        latency_ms=float(os.getenv("STUB_BACKEND_LATENCY_MS", "0")),
+        jitter_ms=float(os.getenv("STUB_BACKEND_JITTER_MS", "0")),
+        error_rate=float(os.getenv("STUB_BACKEND_ERROR_RATE", "0")),
+        error_status=int(os.getenv("STUB_BACKEND_ERROR_STATUS", "503")),
+        seed=int(seed) if seed else None,
+        num_barns=int(os.getenv("STUB_BACKEND_BARNS", "5")),
+        num_livestock=int(os.getenv("STUB_BACKEND_LIVESTOCK", "50")),
+    )
+    backend.start()
+
+    stats_interval = float(os.getenv("STUB_STATS_INTERVAL", "10"))
+    try:
+        while True:
+            time.sleep(stats_interval or 3600)
+            if stats_interval:
+                stats = backend.stats()
+                print(
+                    f"[BACKEND] requests={sum(stats['requests'].values())} logs={stats['logs']} "
+                    f"injectedErrors={stats['injectedErrors']}"
+                )
+    except KeyboardInterrupt:
+        backend.stop()
+        print(f"\nStub backend stopped: {backend.stats()}")
+
+
+if __name__ == "__main__":
+    main()
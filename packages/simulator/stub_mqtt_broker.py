@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Stub MQTT Broker for Livestock IoT Simulator
+
+A minimal MQTT 3.1.1 broker for testing the simulators on an isolated box
+without Mosquitto. It is a stand-in for performance tests of the
+simulator itself, not a production broker:
+
+- CONNECT/CONNACK, PUBLISH (QoS 0, 1 and 2), PUBACK, SUBSCRIBE/SUBACK with
+  + and # wildcards, UNSUBSCRIBE, PINGREQ and DISCONNECT
+- Messages are forwarded to subscribers at QoS 0 (no retained messages,
+  persistent sessions or wills)
+- Artificial PUBACK latency (fixed plus random jitter) and error rates
+  (unacknowledged publishes, refused connections) from a seeded random
+  generator, so backpressure and retry behavior repeat across runs
+
+Usage:
+    python stub_mqtt_broker.py
+    MQTT_BROKER_PORT=1883 python main.py
+
+Requirements: Simulator for load testing
+"""
+
+import asyncio
+import os
+import random
+import struct
+import time
+from typing import Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Packet types (upper nibble of the fixed header)
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = 8, 9, 10, 11, 12, 13, 14
+
+# CONNACK return codes
+CONNACK_ACCEPTED = 0
+CONNACK_BAD_PROTOCOL = 1
+CONNACK_SERVER_UNAVAILABLE = 3
+
+
+class ProtocolError(Exception):
+    """Malformed or unsupported packet; the connection is closed"""
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """
+    Match a topic against a subscription filter with + and # wildcards
+
+    Args:
+        topic_filter: Subscription filter, e.g. "sensors/gas/+" or "livestock/#"
+        topic: Concrete topic name
+
+    Returns:
+        True if the topic matches
+    """
+    # Wildcards at the first level don't match $SYS-style topics
+    if topic.startswith("$") and topic_filter[:1] in ("+", "#"):
+        return False
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for i, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if i >= len(topic_levels):
+            return False
+        if level != "+" and level != topic_levels[i]:
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+def encode_length(length: int) -> bytes:
+    """Encode the MQTT variable-length "remaining length" field"""
+    encoded = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length:
+            byte |= 0x80
+        encoded.append(byte)
+        if not length:
+            return bytes(encoded)
+
+
+def encode_string(value: str) -> bytes:
+    data = value.encode()
+    return struct.pack("!H", len(data)) + data
+
+
+def packet(packet_type: int, body: bytes = b"", flags: int = 0) -> bytes:
+    """Build a packet from its type, flags and variable header + payload"""
+    return bytes([(packet_type << 4) | flags]) + encode_length(len(body)) + body
+
+
+class BrokerStats:
+    """Counters printed periodically and on shutdown"""
+
+    def __init__(self):
+        self.connections = 0
+        self.refused = 0
+        self.received = 0
+        self.delivered = 0
+        self.acked = 0
+        self.dropped = 0
+        self.bytes_in = 0
+
+    def to_dict(self) -> Dict:
+        return dict(vars(self))
+
+
+class Session:
+    """One connected client"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.client_id = ""
+        self.keepalive = 0
+        self.subscriptions: Dict[str, int] = {}
+
+    def send(self, data: bytes):
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+    def close(self):
+        if not self.writer.is_closing():
+            self.writer.close()
+
+
+class StubMQTTBroker:
+    """Minimal asyncio MQTT 3.1.1 broker with injectable latency and errors"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 1883,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        connect_error_rate: float = 0.0,
+        seed: Optional[int] = None,
+        stats_interval: float = 10.0,
+    ):
+        """
+        Initialize the broker (does not start listening)
+
+        Args:
+            host: Interface to bind
+            port: TCP port (0 picks a free port)
+            latency_ms: Delay before each PUBACK/PUBREC
+            jitter_ms: Extra uniform random delay, 0..jitter_ms
+            error_rate: Probability that a QoS 1/2 publish is dropped and
+                never acknowledged
+            connect_error_rate: Probability that a CONNECT is refused
+                (server unavailable)
+            seed: Seed for latency and error decisions (None: random)
+            stats_interval: Seconds between stats lines (0 disables)
+        """
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.connect_error_rate = connect_error_rate
+        self.random = random.Random(seed)
+        self.stats_interval = stats_interval
+
+        self.stats = BrokerStats()
+        self.sessions: Dict[str, Session] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    def _ack_delay(self) -> float:
+        """Seconds to wait before acknowledging a publish"""
+        delay = self.latency_ms + (self.random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        return delay / 1000
+
+    async def _read_packet(self, session: Session) -> Tuple[int, int, bytes]:
+        """Read one packet, enforcing 1.5x the client's keepalive"""
+        timeout = session.keepalive * 1.5 if session.keepalive else None
+        header = await asyncio.wait_for(session.reader.readexactly(1), timeout)
+        length, multiplier = 0, 1
+        for _ in range(4):
+            byte = (await session.reader.readexactly(1))[0]
+            length += (byte & 0x7F) * multiplier
+            if not byte & 0x80:
+                break
+            multiplier *= 128
+        else:
+            raise ProtocolError("Malformed remaining length")
+        body = await session.reader.readexactly(length) if length else b""
+        self.stats.bytes_in += length + 2
+        return header[0] >> 4, header[0] & 0x0F, body
+
+    def _handle_connect(self, session: Session, body: bytes) -> bool:
+        """Parse CONNECT and send CONNACK; returns False if refused"""
+        (name_length,) = struct.unpack_from("!H", body, 0)
+        offset = 2 + name_length
+        protocol_name = body[2:offset].decode()
+        level = body[offset]
+        (session.keepalive,) = struct.unpack_from("!H", body, offset + 2)
+        offset += 4
+        (id_length,) = struct.unpack_from("!H", body, offset)
+        session.client_id = body[offset + 2:offset + 2 + id_length].decode() or f"anonymous-{id(session)}"
+
+        if protocol_name != "MQTT" or level != 4:
+            session.send(packet(CONNACK, bytes([0, CONNACK_BAD_PROTOCOL])))
+            return False
+        if self.connect_error_rate and self.random.random() < self.connect_error_rate:
+            self.stats.refused += 1
+            session.send(packet(CONNACK, bytes([0, CONNACK_SERVER_UNAVAILABLE])))
+            return False
+
+        # A new connection with the same client ID takes over the old one
+        previous = self.sessions.get(session.client_id)
+        if previous:
+            previous.close()
+        self.sessions[session.client_id] = session
+        self.stats.connections += 1
+        session.send(packet(CONNACK, bytes([0, CONNACK_ACCEPTED])))
+        return True
+
+    def _handle_publish(self, session: Session, flags: int, body: bytes):
+        qos = (flags >> 1) & 0x03
+        (topic_length,) = struct.unpack_from("!H", body, 0)
+        topic = body[2:2 + topic_length].decode()
+        offset = 2 + topic_length
+        packet_id = None
+        if qos:
+            (packet_id,) = struct.unpack_from("!H", body, offset)
+            offset += 2
+        payload = body[offset:]
+        self.stats.received += 1
+
+        if qos and self.error_rate and self.random.random() < self.error_rate:
+            # Lost on the way: neither forwarded nor acknowledged
+            self.stats.dropped += 1
+            return
+
+        self._forward(topic, payload)
+        if qos:
+            ack_type = PUBACK if qos == 1 else PUBREC
+            ack = packet(ack_type, struct.pack("!H", packet_id))
+            delay = self._ack_delay()
+            if delay > 0:
+                asyncio.get_running_loop().call_later(delay, self._send_ack, session, ack)
+            else:
+                self._send_ack(session, ack)
+
+    def _send_ack(self, session: Session, ack: bytes):
+        session.send(ack)
+        self.stats.acked += 1
+
+    def _forward(self, topic: str, payload: bytes):
+        """Deliver a message at QoS 0 to every matching subscriber"""
+        message = None
+        for subscriber in list(self.sessions.values()):
+            if any(topic_matches(f, topic) for f in subscriber.subscriptions):
+                if message is None:
+                    message = packet(PUBLISH, encode_string(topic) + payload)
+                subscriber.send(message)
+                self.stats.delivered += 1
+
+    def _handle_subscribe(self, session: Session, body: bytes):
+        (packet_id,) = struct.unpack_from("!H", body, 0)
+        offset, granted = 2, bytearray()
+        while offset < len(body):
+            (length,) = struct.unpack_from("!H", body, offset)
+            topic_filter = body[offset + 2:offset + 2 + length].decode()
+            requested_qos = body[offset + 2 + length]
+            offset += 3 + length
+            session.subscriptions[topic_filter] = requested_qos
+            # Messages are forwarded at QoS 0 only
+            granted.append(0)
+        session.send(packet(SUBACK, struct.pack("!H", packet_id) + bytes(granted)))
+
+    def _handle_unsubscribe(self, session: Session, body: bytes):
+        (packet_id,) = struct.unpack_from("!H", body, 0)
+        offset = 2
+        while offset < len(body):
+            (length,) = struct.unpack_from("!H", body, offset)
+            session.subscriptions.pop(body[offset + 2:offset + 2 + length].decode(), None)
+            offset += 2 + length
+        session.send(packet(UNSUBACK, struct.pack("!H", packet_id)))
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = Session(reader, writer)
+        try:
+            packet_type, flags, body = await asyncio.wait_for(self._read_packet(session), 10)
+            # The fixed header flags of CONNECT are reserved (0)
+            if packet_type != CONNECT or flags or not self._handle_connect(session, body):
+                await writer.drain()
+                return
+
+            while True:
+                packet_type, flags, body = await self._read_packet(session)
+                if packet_type == PUBLISH:
+                    self._handle_publish(session, flags, body)
+                elif packet_type == PUBREL:
+                    session.send(packet(PUBCOMP, body[:2]))
+                elif packet_type == SUBSCRIBE:
+                    self._handle_subscribe(session, body)
+                elif packet_type == UNSUBSCRIBE:
+                    self._handle_unsubscribe(session, body)
+                elif packet_type == PINGREQ:
+                    session.send(packet(PINGRESP))
+                elif packet_type == DISCONNECT:
+                    break
+                elif packet_type in (PUBACK, PUBREC, PUBCOMP):
+                    continue  # Acks from subscribers; forwarded messages are QoS 0
+                else:
+                    raise ProtocolError(f"Unexpected packet type {packet_type}")
+                # Stop reading from a client while its own socket is backed up
+                if writer.transport.get_write_buffer_size() > 1 << 20:
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            pass
+        except (ProtocolError, struct.error, IndexError, UnicodeDecodeError) as e:
+            print(f"[BROKER] Closing {session.client_id or 'client'}: {e}")
+        finally:
+            if self.sessions.get(session.client_id) is session:
+                del self.sessions[session.client_id]
+            session.close()
+
+    async def _report_loop(self):
+        last, last_time = self.stats.received, time.time()
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            now = time.time()
+            rate = (self.stats.received - last) / (now - last_time)
+            last, last_time = self.stats.received, now
+            print(
+                f"[BROKER] clients={len(self.sessions)} received={self.stats.received} "
+                f"({rate:.0f}/s) delivered={self.stats.delivered} acked={self.stats.acked} "
+                f"dropped={self.stats.dropped} refused={self.stats.refused}"
+            )
+
+    async def start(self):
+        """Start listening (returns once the socket is bound)"""
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        print(f"Stub MQTT broker listening on {self.host}:{self.port}")
+        if self.latency_ms or self.jitter_ms or self.error_rate or self.connect_error_rate:
+            print(
+                f"  PUBACK latency {self.latency_ms:.0f}ms + 0-{self.jitter_ms:.0f}ms, "
+                f"drop rate {self.error_rate:.1%}, connect refusal rate {self.connect_error_rate:.1%}"
+            )
+
+    async def serve_forever(self):
+        await self.start()
+        report = asyncio.ensure_future(self._report_loop()) if self.stats_interval else None
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            if report:
+                report.cancel()
+
+    def close(self):
+        if self.server:
+            self.server.close()
+        for session in list(self.sessions.values()):
+            session.close()
+
+
+def main():
+    """Main entry point for the stub MQTT broker"""
+    seed = os.getenv("STUB_SEED")
+    broker = StubMQTTBroker(
+        host=os.getenv("STUB_MQTT_HOST", "127.0.0.1"),
+        port=int(os.getenv("MQTT_BROKER_PORT", "1883")),
+        latency_ms=float(os.getenv("STUB_MQTT_LATENCY_MS", "0")),
+        jitter_ms=float(os.getenv("STUB_MQTT_JITTER_MS", "0")),
+        error_rate=float(os.getenv("STUB_MQTT_ERROR_RATE", "0")),
+        connect_error_rate=float(os.getenv("STUB_MQTT_CONNECT_ERROR_RATE", "0")),
+        seed=int(seed) if seed else None,
+        stats_interval=float(os.getenv("STUB_STATS_INTERVAL", "10")),
+    )
+    try:
+        asyncio.run(broker.serve_forever())
+    except KeyboardInterrupt:
+        print(f"\nStub MQTT broker stopped: {broker.stats.to_dict()}")
+
+
+if __name__ == "__main__":
+    main()
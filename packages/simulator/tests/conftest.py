@@ -0,0 +1,11 @@
+"""
+Shared pytest setup for the simulator tests
+
+The simulator modules are run as scripts from this directory, so the tests
+import them the same way.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,68 @@
+"""Tests for the token pool against the stub backend"""
+
+import json
+import time
+
+import pytest
+
+from auth_manager import AuthManager, decode_token_expiry
+from stub_backend import StubBackend, make_token
+
+
+@pytest.fixture
+def backend():
+    stub = StubBackend(port=0, seed=1, num_barns=1, num_livestock=1)
+    stub.start()
+    yield stub
+    stub.stop()
+
+
+def _manager(stub: StubBackend, cache_file=None, users: int = 1) -> AuthManager:
+    credentials = [(f"operator{n}@example.com", "secret") for n in range(users)]
+    return AuthManager(f"http://127.0.0.1:{stub.port}", credentials, cache_file=cache_file)
+
+
+def test_decode_token_expiry():
+    assert decode_token_expiry(make_token("user", 900)) == pytest.approx(time.time() + 900, abs=2)
+    assert decode_token_expiry("not-a-jwt") is None
+
+
+def test_token_is_reused_until_it_nears_expiry(backend):
+    manager = _manager(backend)
+    token = manager.get_token()
+    assert token and manager.get_token() == token
+    assert manager.stats()["logins"] == 1
+
+
+def test_invalidated_token_is_refreshed(backend):
+    manager = _manager(backend)
+    token = manager.get_token()
+    manager.invalidate(token)
+    assert manager.get_token() != token
+    assert (manager.logins, manager.refreshes) == (1, 1)
+
+
+def test_rejected_refresh_falls_back_to_login(backend):
+    manager = _manager(backend)
+    manager.invalidate(manager.get_token())
+    backend.refresh_tokens.clear()
+    assert manager.get_token()
+    assert (manager.logins, manager.refreshes) == (2, 0)
+
+
+def test_pool_hands_out_tokens_round_robin(backend):
+    manager = _manager(backend, users=3)
+    tokens = [manager.get_token() for _ in range(6)]
+    assert len(set(tokens)) == 3
+    assert tokens[:3] == tokens[3:]
+
+
+def test_cached_tokens_survive_a_restart_without_passwords(backend, tmp_path):
+    cache_file = str(tmp_path / "auth.json")
+    token = _manager(backend, cache_file).get_token()
+    assert "secret" not in open(cache_file).read()
+
+    restarted = _manager(backend, cache_file)
+    assert restarted.get_token() == token
+    assert restarted.logins == 0
+    assert list(json.load(open(cache_file))) == [f"http://127.0.0.1:{backend.port}"]
@@ -0,0 +1,74 @@
+"""Tests for capacity search bookkeeping"""
+
+import paho.mqtt.client as mqtt
+import pytest
+
+from capacity_search import CapacitySearch
+from gas_sensor_simulator import GasSensorSimulator
+from sim_clock import SimClock
+
+
+class _Client:
+    """paho client stand-in accepting every publish"""
+
+    def __init__(self):
+        self.mid = 0
+
+    def publish(self, topic, payload, qos=0):
+        self.mid += 1
+        return mqtt.MQTTMessageInfo(self.mid)
+
+
+@pytest.fixture
+def gas():
+    simulator = GasSensorSimulator(num_sensors=10, verbose=False)
+    simulator.clock = SimClock(mode="realtime")
+    simulator.client = _Client()
+    return simulator
+
+
+def test_search_refuses_a_simulated_clock(gas):
+    gas.clock = SimClock(mode="fast")
+    with pytest.raises(ValueError, match="realtime"):
+        CapacitySearch(gas, rfid_ratio=0)
+
+
+def test_acks_from_before_a_window_are_not_recorded(gas):
+    late = gas._publish("sensors/gas/GAS-001", b"{}", track_latency=True)
+    gas.reset_latency()
+    gas._on_publish(gas.client, None, late.mid)
+    assert gas.puback_latency.count == 0
+
+    current = gas._publish("sensors/gas/GAS-001", b"{}", track_latency=True)
+    gas._on_publish(gas.client, None, current.mid)
+    assert gas.puback_latency.count == 1
+    assert gas._inflight == {}
+
+
+def test_set_rate_converts_readings_per_second_to_an_interval(gas):
+    search = CapacitySearch(gas, rfid_ratio=0)
+    search._set_rate(20)
+    assert gas.interval == pytest.approx(0.5)
+
+
+def test_binary_search_brackets_the_capacity(gas):
+    search = CapacitySearch(gas, rfid_ratio=0, mode="binary", start_rate=10, max_rate=1000, resolution=0.05)
+    measured = []
+
+    def measure(rate):
+        measured.append(rate)
+        return {"passed": rate <= 237}
+
+    search.measure = measure
+    search._search_binary()
+    passed = max(rate for rate in measured if rate <= 237)
+    failed = min(rate for rate in measured if rate > 237)
+    assert (failed - passed) / passed <= 0.05
+
+
+def test_failed_steps_list_every_violated_slo(gas):
+    search = CapacitySearch(gas, rfid_ratio=0, puback_p99_ms=500)
+    result = {"achievedRate": 50, "targetRate": 100, "pubackLatency": {"p99": 900}}
+    reasons = search._check(result)
+    assert len(reasons) == 2
+    assert search._check({"achievedRate": 99, "targetRate": 100, "pubackLatency": {"p99": 100}}) == []
@@ -0,0 +1,80 @@
+"""Tests for control API validation and dispatch"""
+
+import pytest
+
+import incident_engine
+from control_api import ControlAPI
+from incident_engine import IncidentEngine
+
+
+class _Simulator:
+    """Pausable simulator stand-in"""
+
+    def __init__(self):
+        self.interval = 10.0
+        self.error_probability = 0.02
+        self.paused = False
+        self.sensors = ["GAS-001"]
+        self.reader_ids = ["RFID-001"]
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = IncidentEngine()
+    monkeypatch.setattr(incident_engine, "_engine", engine)
+    return engine
+
+
+@pytest.fixture
+def api(engine):
+    return ControlAPI({"gas": _Simulator(), "rfid": _Simulator()})
+
+
+def test_rate_change_applies_every_interval(api):
+    status, body = api.handle("POST", "/rate", {"gasInterval": 2, "rfidInterval": 0.5})
+    assert status == 200
+    assert (body["gas"]["interval"], body["rfid"]["interval"]) == (2.0, 0.5)
+
+
+@pytest.mark.parametrize("body, status", [
+    ({"gasInterval": 2, "rfidInterval": -1}, 400),
+    ({"gasInterval": 2, "workloadInterval": 5}, 409),
+    ({"gasInterval": 2, "workload": "rfid=0"}, 400),
+    ({}, 400),
+])
+def test_invalid_rate_change_changes_nothing(api, body, status):
+    assert api.handle("POST", "/rate", body)[0] == status
+    assert api.simulators["gas"].interval == 10.0
+
+
+def test_invalid_fault_request_changes_nothing(api, engine):
+    engine.add(incident_engine.incident_from_spec({"type": "danger", "duration": 60}))
+    status, _ = api.handle("POST", "/faults", {"gasErrorProbability": 0.5, "clear": True, "type": "meteor"})
+    assert status == 400
+    assert api.simulators["gas"].error_probability == 0.02
+    assert len(engine.incidents) == 1
+
+
+def test_fault_request_applies_probability_and_incident(api, engine):
+    status, body = api.handle("POST", "/faults", {"rfidErrorProbability": 0.3, "type": "errorBurst", "kind": "rfid"})
+    assert status == 200
+    assert set(body["applied"]) == {"rfidErrorProbability", "incident"}
+    assert api.simulators["rfid"].error_probability == 0.3
+    assert len(engine.incidents) == 1
+
+
+def test_pause_and_resume_targets(api):
+    assert api.handle("POST", "/pause", {"target": "gas"}) == (200, {"paused": ["gas"]})
+    assert api.simulators["gas"].paused and not api.simulators["rfid"].paused
+    assert api.handle("POST", "/resume", {}) == (200, {"resumed": ["gas", "rfid"]})
+    assert api.handle("POST", "/pause", {"target": "workload"})[0] == 409
+
+
+def test_unknown_route(api):
+    assert api.handle("GET", "/nothing", {})[0] == 404
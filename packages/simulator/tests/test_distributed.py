@@ -0,0 +1,61 @@
+"""Tests for splitting work across distributed agents"""
+
+import pytest
+
+from distributed import LoadAgent, _split, merge_metrics
+from metrics import LatencyHistogram
+
+
+@pytest.mark.parametrize("total, parts", [(10, 3), (3, 5), (0, 2), (100, 1)])
+def test_split_covers_every_item_once(total, parts):
+    ranges = _split(total, parts)
+    assert len(ranges) == parts
+    covered = [n for offset, count in ranges for n in range(offset, offset + count)]
+    assert covered == list(range(total))
+    counts = [count for _, count in ranges]
+    assert max(counts) - min(counts) <= 1
+
+
+class _HerdReader:
+    """RFIDReaderSimulator stand-in serving a fixed herd"""
+
+    def __init__(self, herd):
+        self.herd = herd
+        self.livestock_ids = []
+
+    def _authenticate(self):
+        return True
+
+    def _fetch_livestock(self):
+        self.livestock_ids = list(self.herd)
+        return bool(self.livestock_ids)
+
+
+def test_agents_fetching_the_herd_keep_disjoint_slices():
+    herd = [f"LS-{n}" for n in range(11)]
+    slices = []
+    for index in range(3):
+        agent = LoadAgent(agent_id=f"agent-{index}")
+        agent.rfid = _HerdReader(herd)
+        agent._fetch_herd_slice(index, 3)
+        slices.append(agent.rfid.livestock_ids)
+
+    assert sorted(sum(slices, [])) == sorted(herd)
+    assert len(set(sum(slices, []))) == len(herd)
+
+
+def test_agent_without_livestock_left_skips_rfid():
+    agent = LoadAgent(agent_id="agent-2")
+    agent.rfid = _HerdReader(["LS-1", "LS-2"])
+    agent._fetch_herd_slice(2, 3)
+    assert agent.rfid is None
+
+
+def test_merge_metrics_sums_counters_and_histograms():
+    latency = LatencyHistogram()
+    latency.record(5.0)
+    report = {"gas": {"published": 10, "failed": 1, "pubackLatency": latency.to_dict()}, "rfid": {"sent": 4}}
+    totals = merge_metrics([report, report, {"gas": None, "rfid": None}])
+    assert (totals["published"], totals["failed"], totals["sent"]) == (20, 2, 8)
+    assert totals["pubackLatency"].count == 2
+    assert totals["httpLatency"].count == 0
@@ -0,0 +1,84 @@
+"""Tests for gateway batching and the gas simulator's batch accounting"""
+
+import json
+
+import paho.mqtt.client as mqtt
+import pytest
+
+from gas_sensor_simulator import GasSensorSimulator
+from gateway_batcher import GatewayBatcher
+
+
+def _reading(sensor: int, barn: str) -> dict:
+    return {"sensorId": f"GAS-{sensor:03d}", "barnId": barn, "methanePpm": 300.0, "timestamp": "2026-01-01T00:00:00Z"}
+
+
+class _Recorder:
+    """publish callback recording (topic, document, count)"""
+
+    def __init__(self, succeed: bool = True):
+        self.succeed = succeed
+        self.messages = []
+
+    def __call__(self, topic: str, payload: bytes, count: int) -> bool:
+        self.messages.append((topic, json.loads(payload), count))
+        return self.succeed
+
+
+def test_full_batch_is_published_per_barn():
+    publish = _Recorder()
+    batcher = GatewayBatcher(publish, batch_size=2, linger=60)
+    batcher.add(_reading(1, "A"))
+    batcher.add(_reading(2, "B"))
+    assert publish.messages == []
+
+    batcher.add(_reading(3, "A"))
+    (topic, document, count), = publish.messages
+    assert topic == "sensors/gateway/A/batch"
+    assert count == document["count"] == 2
+    assert document["barnId"] == "A"
+    assert all("barnId" not in reading for reading in document["readings"])
+    assert batcher.buffers == {"B": [_reading(2, "B")]}
+
+
+def test_flush_all_publishes_partial_batches_and_counts_failures():
+    publish = _Recorder(succeed=False)
+    batcher = GatewayBatcher(publish, batch_size=10, linger=60)
+    batcher.add(_reading(1, "A"))
+    batcher.add(_reading(2, "B"))
+    batcher.flush_all()
+
+    assert sorted(topic for topic, _, _ in publish.messages) == ["sensors/gateway/A/batch", "sensors/gateway/B/batch"]
+    stats = batcher.stats()
+    assert (stats["readings"], stats["delivered"]) == (2, 0)
+    assert batcher.failed_batches == 2
+    assert batcher.buffers == {}
+
+
+class _Client:
+    """paho client stand-in returning a fixed publish result code"""
+
+    def __init__(self, rc: int):
+        self.rc = rc
+        self.mid = 0
+
+    def publish(self, topic, payload, qos=0):
+        self.mid += 1
+        info = mqtt.MQTTMessageInfo(self.mid)
+        info.rc = self.rc
+        return info
+
+
+@pytest.mark.parametrize("rc, published, failed", [(mqtt.MQTT_ERR_SUCCESS, 3, 0), (mqtt.MQTT_ERR_NO_CONN, 0, 3)])
+def test_gas_simulator_counts_batched_readings(rc, published, failed):
+    simulator = GasSensorSimulator(num_sensors=1, gateway_mode=True, verbose=False)
+    simulator.client = _Client(rc)
+    simulator._publish_batch("sensors/gateway/A/batch", b"{}", 3)
+    assert (simulator.published, simulator.publish_failed) == (published, failed)
+
+
+def test_gas_simulator_refuses_binary_codec_on_sensor_topics():
+    pytest.importorskip("msgpack")
+    with pytest.raises(ValueError, match="gateway mode"):
+        GasSensorSimulator(num_sensors=1, codec="msgpack")
+    assert GasSensorSimulator(num_sensors=1, codec="msgpack", gateway_mode=True).codec.name == "msgpack"
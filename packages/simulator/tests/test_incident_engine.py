@@ -0,0 +1,134 @@
+"""Tests for device selection and the incident engine"""
+
+import pytest
+
+from incident_engine import (
+    ConditionIncident,
+    DeviceSelector,
+    DisconnectIncident,
+    ErrorBurstIncident,
+    GasBuildupIncident,
+    IncidentEngine,
+    incident_from_spec,
+)
+
+
+class _Clock:
+    """Manually advanced simulated time"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def engine():
+    engine = IncidentEngine()
+    engine.clock = _Clock()
+    return engine
+
+
+def test_selector_without_target_matches_every_device_of_its_kind():
+    selector = DeviceSelector(kind="gas")
+    assert selector.matches("gas", "GAS-001", "BARN-1")
+    assert not selector.matches("rfid", "RFID-001")
+    assert DeviceSelector().matches("rfid", "RFID-001")
+
+
+def test_selector_matches_any_of_barn_prefix_or_devices():
+    selector = DeviceSelector(barn="BARN-1", prefix="RFID-N-0001-", devices=["GAS-009"])
+    assert selector.matches("gas", "GAS-001", "BARN-1")
+    assert selector.matches("rfid", "RFID-N-0001-2")
+    assert selector.matches("gas", "GAS-009", "BARN-2")
+    assert not selector.matches("gas", "GAS-002", "BARN-2")
+
+
+def test_selector_fraction_is_stable_and_roughly_proportional():
+    selector = DeviceSelector(fraction=0.25)
+    devices = [f"GAS-{n:04d}" for n in range(2000)]
+    chosen = [device for device in devices if selector.matches("gas", device)]
+    assert 0.2 < len(chosen) / len(devices) < 0.3
+    assert chosen == [device for device in devices if selector.matches("gas", device)]
+    with pytest.raises(ValueError):
+        DeviceSelector(fraction=0)
+
+
+@pytest.mark.parametrize("spec, incident_class", [
+    ({"type": "danger"}, ConditionIncident),
+    ({"type": "gasBuildup", "ramp": 30}, GasBuildupIncident),
+    ({"type": "errorBurst", "kind": "rfid", "probability": 0.9}, ErrorBurstIncident),
+    ({"type": "disconnect", "reconnectSpread": 10}, DisconnectIncident),
+])
+def test_incident_from_spec(spec, incident_class):
+    incident = incident_from_spec({**spec, "duration": 120}, start=50)
+    assert isinstance(incident, incident_class)
+    assert (incident.start, incident.end) == (50, 170)
+
+
+def test_condition_incidents_only_select_gas_sensors():
+    assert incident_from_spec({"type": "warning", "kind": "rfid"}, start=0).selector.kind == "gas"
+
+
+@pytest.mark.parametrize("spec", [{"type": "meteor"}, {"type": "danger", "duration": 0}, {"type": "danger", "fraction": 2}])
+def test_invalid_specs_are_rejected(spec):
+    with pytest.raises(ValueError):
+        incident_from_spec(spec, start=0)
+
+
+def test_condition_applies_while_active_and_latest_wins(engine):
+    engine.add(incident_from_spec({"type": "warning", "duration": 100}, start=1000))
+    engine.add(incident_from_spec({"type": "danger", "barn": "BARN-1", "duration": 10}, start=1000))
+    assert engine.condition("gas", "GAS-001", "BARN-1") == "danger"
+    assert engine.condition("gas", "GAS-002", "BARN-2") == "warning"
+    engine.clock.now = 1050
+    assert engine.condition("gas", "GAS-001", "BARN-1") == "warning"
+    engine.clock.now = 1100
+    assert engine.condition("gas", "GAS-001", "BARN-1") is None
+    assert engine.incidents == []
+
+
+def test_error_burst_raises_the_error_probability(engine):
+    engine.add(incident_from_spec({"type": "errorBurst", "kind": "rfid", "probability": 0.8, "duration": 60}, start=1000))
+    assert engine.error_probability("rfid", "RFID-001", None, 0.02) == 0.8
+    assert engine.error_probability("gas", "GAS-001", "BARN-1", 0.02) == 0.02
+
+
+def test_disconnect_announces_offline_and_online_once(engine):
+    statuses = []
+    announce = lambda device, status, reason, message: statuses.append((device, status))
+    engine.add(incident_from_spec({"type": "disconnect", "kind": "rfid", "duration": 60}, start=1000))
+
+    assert engine.has_disconnects("rfid") and not engine.has_disconnects("gas")
+    assert engine.is_offline("rfid", "RFID-001", None, announce)
+    assert engine.is_offline("rfid", "RFID-001", None, announce)
+    engine.clock.now = 1060
+    assert not engine.is_offline("rfid", "RFID-001", None, announce)
+    assert statuses == [("RFID-001", "offline"), ("RFID-001", "online")]
+    assert not engine.has_disconnects("rfid")
+
+
+def test_clear_keeps_offline_devices_until_they_reconnect(engine):
+    statuses = []
+    announce = lambda device, status, reason, message: statuses.append((device, status))
+    engine.add(incident_from_spec({"type": "danger", "duration": 600}, start=1000))
+    engine.add(incident_from_spec({"type": "disconnect", "duration": 600, "reconnectSpread": 300}, start=1000))
+    assert engine.is_offline("gas", "GAS-001", "BARN-1", announce)
+
+    engine.clear()
+    assert engine.condition("gas", "GAS-001", "BARN-1") is None
+    assert not engine.is_offline("gas", "GAS-001", "BARN-1", announce)
+    assert statuses == [("GAS-001", "offline"), ("GAS-001", "online")]
+    engine.clock.now = 1001
+    assert engine.describe() == []
+
+
+def test_gas_buildup_ramps_towards_danger_levels(engine):
+    engine.add(incident_from_spec({"type": "gasBuildup", "duration": 200, "ramp": 100}, start=1000))
+    levels = {"methanePpm": 300.0, "co2Ppm": 1000.0, "nh3Ppm": 8.0, "temperature": 22.0}
+    assert engine.apply_buildup("gas", "GAS-001", "BARN-1", levels)["methanePpm"] == pytest.approx(300.0)
+    engine.clock.now = 1150
+    peak = engine.apply_buildup("gas", "GAS-001", "BARN-1", levels)
+    assert peak["methanePpm"] > 1000
+    assert peak["temperature"] == 22.0
@@ -0,0 +1,67 @@
+"""Tests for the mergeable latency histogram"""
+
+import json
+
+import pytest
+
+from metrics import LatencyHistogram
+
+
+def test_empty_histogram_reports_zero():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(99) == 0.0
+    assert histogram.mean() == 0.0
+    assert histogram.summary()["count"] == 0
+
+
+def test_percentiles_are_within_bucket_width():
+    histogram = LatencyHistogram()
+    for value in range(1, 1001):
+        histogram.record(float(value))
+
+    for p in (50, 95, 99):
+        expected = 1000 * p / 100
+        assert histogram.percentile(p) == pytest.approx(expected, rel=LatencyHistogram.GROWTH - 1)
+    assert histogram.percentile(100) == 1000.0
+    assert histogram.min == 1.0
+    assert histogram.mean() == pytest.approx(500.5)
+
+
+def test_negative_samples_clamp_to_zero():
+    histogram = LatencyHistogram()
+    histogram.record(-5.0)
+    assert histogram.min == 0.0
+    assert histogram.percentile(50) == 0.0
+
+
+def test_merge_matches_recording_everything_in_one_histogram():
+    first, second, combined = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for value in range(1, 500):
+        first.record(value * 0.3)
+        combined.record(value * 0.3)
+    for value in range(1, 300):
+        second.record(value * 7.0)
+        combined.record(value * 7.0)
+
+    first.merge(second)
+    assert first.count == combined.count
+    assert first.buckets == combined.buckets
+    assert (first.min, first.max) == (combined.min, combined.max)
+    assert first.summary() == combined.summary()
+
+
+def test_merge_into_empty_histogram():
+    empty, other = LatencyHistogram(), LatencyHistogram()
+    other.record(12.0)
+    empty.merge(other)
+    assert (empty.count, empty.min, empty.max) == (1, 12.0, 12.0)
+
+
+def test_dict_round_trip_through_json():
+    histogram = LatencyHistogram()
+    for value in (0.005, 1.5, 20.0, 4000.0):
+        histogram.record(value)
+
+    restored = LatencyHistogram.from_dict(json.loads(json.dumps(histogram.to_dict())))
+    assert restored.buckets == histogram.buckets
+    assert restored.summary() == histogram.summary()
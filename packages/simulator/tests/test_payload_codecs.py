@@ -0,0 +1,51 @@
+"""Tests for the payload codecs"""
+
+import pytest
+
+from payload_codecs import CODECS, compact, expand, get_codec
+
+READING = {
+    "sensorId": "GAS-001",
+    "barnId": "BARN-001",
+    "methanePpm": 312.5,
+    "co2Ppm": 1020.25,
+    "nh3Ppm": 7.5,
+    "temperature": 22.1,
+    "humidity": 61.0,
+    "timestamp": "2026-03-01T06:30:15.123Z",
+}
+
+BATCH = {"gatewayId": "GW-BARN-001", "barnId": "BARN-001", "count": 2, "readings": [READING, READING]}
+
+
+def _codec(name: str):
+    if name.startswith("msgpack"):
+        pytest.importorskip("msgpack")
+    if name.startswith("cbor"):
+        pytest.importorskip("cbor2")
+    return get_codec(name)
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+@pytest.mark.parametrize("document", [READING, BATCH], ids=["reading", "batch"])
+def test_round_trip(name, document):
+    codec = _codec(name)
+    assert codec.name == name
+    assert codec.decode(codec.encode(document)) == document
+
+
+@pytest.mark.parametrize("name", ["compact-json", "msgpack-compact", "cbor-compact"])
+def test_compact_codecs_are_smaller_than_json(name):
+    assert len(_codec(name).encode(READING)) < len(get_codec("json").encode(READING))
+
+
+def test_compact_shortens_keys_and_timestamps():
+    shortened = compact(READING)
+    assert shortened["s"] == "GAS-001"
+    assert shortened["ts"] == 1772346615123
+    assert expand(shortened) == READING
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError, match="Unknown payload codec"):
+        get_codec("protobuf")
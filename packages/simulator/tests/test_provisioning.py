@@ -0,0 +1,55 @@
+"""Tests for fleet provisioning against the stub backend"""
+
+import pytest
+
+from auth_manager import AuthManager
+from provisioning import FleetProvisioner, load_fleet
+from stub_backend import StubBackend
+
+
+@pytest.fixture
+def backend():
+    stub = StubBackend(port=0, seed=1, num_barns=0, num_livestock=0)
+    stub.start()
+    yield f"http://127.0.0.1:{stub.port}"
+    stub.stop()
+
+
+def _provisioner(backend_url: str, fleet_file: str, sensors_per_barn: int) -> FleetProvisioner:
+    return FleetProvisioner(
+        backend_url=backend_url,
+        auth_manager=AuthManager(backend_url, [("admin@example.com", "secret")], cache_file=None),
+        num_farms=1,
+        barns_per_farm=3,
+        sensors_per_barn=sensors_per_barn,
+        livestock_per_barn=2,
+        concurrency=4,
+        fleet_file=fleet_file,
+    )
+
+
+def test_provisioning_creates_the_fleet(backend, tmp_path):
+    fleet_file = str(tmp_path / "fleet.json")
+    _provisioner(backend, fleet_file, sensors_per_barn=2).provision()
+
+    fleet = load_fleet(fleet_file)
+    assert len(fleet["barnIds"]) == 3
+    assert fleet["numSensors"] == 6
+    assert len(fleet["livestockIds"]) == 6
+
+
+def test_rerun_resumes_without_creating_anything(backend, tmp_path):
+    fleet_file = str(tmp_path / "fleet.json")
+    _provisioner(backend, fleet_file, sensors_per_barn=2).provision()
+
+    rerun = _provisioner(backend, fleet_file, sensors_per_barn=2)
+    rerun.provision()
+    assert rerun.requests == 0
+
+
+def test_rerun_with_fewer_sensors_updates_the_sensor_count(backend, tmp_path):
+    fleet_file = str(tmp_path / "fleet.json")
+    _provisioner(backend, fleet_file, sensors_per_barn=3).provision()
+    _provisioner(backend, fleet_file, sensors_per_barn=1).provision()
+
+    assert load_fleet(fleet_file)["numSensors"] == 3
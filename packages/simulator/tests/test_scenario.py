@@ -0,0 +1,131 @@
+"""Tests for scenario parsing, lazy device views and the scenario runner"""
+
+import random
+import threading
+import time
+from collections.abc import Sequence
+
+import pytest
+
+import sim_clock
+from scenario import Scenario, ScenarioRunner, parse_duration
+from sim_clock import SimClock
+
+SPEC = {
+    "name": "views",
+    "seed": 42,
+    "farms": [
+        {"name": "North", "barns": {"count": 3, "codePrefix": "N", "sensors": 2, "readers": 1, "herd": 4}},
+        {"name": "South", "barns": [{"code": "S-1", "id": "665f1c", "sensors": 3}, {"code": "S-2", "sensors": 0}]},
+    ],
+    "herd": {"source": "synthetic"},
+}
+
+
+@pytest.mark.parametrize("value, seconds", [(90, 90.0), ("30s", 30.0), ("10m", 600.0), ("2h", 7200.0), ("1.5", 1.5)])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == seconds
+
+
+def test_view_lengths():
+    scenario = Scenario(SPEC)
+    assert len(scenario.sensors()) == 3 * 2 + 3
+    assert len(scenario.reader_ids()) == 3
+    assert len(scenario.livestock_ids()) == 12
+    assert scenario.barn_ids() == ["N-0001", "N-0002", "N-0003", "665f1c", "S-2"]
+
+
+def test_sensor_view_indexing_and_slicing():
+    sensors = Scenario(SPEC).sensors()
+    assert isinstance(sensors, Sequence)
+    assert sensors[0]["sensorId"] == "GAS-N-0001-1"
+    assert sensors[3]["sensorId"] == "GAS-N-0002-2"
+    assert sensors[6] == {**sensors[6], "sensorId": "GAS-S-1-1", "barnId": "665f1c"}
+    assert sensors[-1]["sensorId"] == "GAS-S-1-3"
+    assert [s["sensorId"] for s in sensors[1:4]] == ["GAS-N-0001-2", "GAS-N-0002-1", "GAS-N-0002-2"]
+    assert [s["sensorId"] for s in sensors] == [sensors[i]["sensorId"] for i in range(len(sensors))]
+    with pytest.raises(IndexError):
+        sensors[len(sensors)]
+    assert random.choice(sensors)["sensorId"].startswith("GAS-")
+
+
+def test_sensor_baselines_are_stable_per_seed_and_within_range():
+    first, again = Scenario(SPEC).sensors(), Scenario(SPEC).sensors()
+    other_seed = Scenario({**SPEC, "seed": 7}).sensors()
+    assert first[4] == again[4]
+    assert first[4]["baseline"] != other_seed[4]["baseline"]
+    for sensor in first:
+        baseline = sensor["baseline"]
+        assert 200 <= baseline["methanePpm"] <= 400
+        assert 800 <= baseline["co2Ppm"] <= 1500
+        assert 20 <= baseline["temperature"] <= 25
+
+
+def test_reader_and_herd_views():
+    scenario = Scenario(SPEC)
+    assert list(scenario.reader_ids()) == ["RFID-N-0001-1", "RFID-N-0002-1", "RFID-N-0003-1"]
+    assert scenario.livestock_ids()[5] == "LS-N-0002-2"
+    assert Scenario({**SPEC, "herd": {"source": "backend"}}).livestock_ids() is None
+
+
+def test_find_barn():
+    scenario = Scenario(SPEC)
+    assert scenario.find_barn("N-0002") == "N-0002"
+    assert scenario.find_barn("S-1") == "665f1c"
+    assert scenario.find_barn("N-0004") is None
+
+
+def test_invalid_scenarios_are_rejected():
+    with pytest.raises(ValueError, match="no barns"):
+        Scenario({"farms": []})
+    with pytest.raises(ValueError, match="herd source"):
+        Scenario({**SPEC, "herd": {"source": "csv"}})
+    with pytest.raises(ValueError, match="incident"):
+        Scenario({**SPEC, "incidents": [{"at": "1m", "type": "meteor"}]})
+
+
+class _Loop:
+    """Simulator stand-in ticking every `interval` simulated seconds as a clock participant"""
+
+    def __init__(self, clock: SimClock, interval: float):
+        self.clock = clock
+        self.interval = interval
+        self.ticks = []
+        self._wake = threading.Event()
+
+    def run(self):
+        with self.clock.participant():
+            while not self.clock.sleep(self.interval, self._wake):
+                self.ticks.append((self.clock.time(), self.interval))
+
+    def stop(self):
+        self._wake.set()
+
+
+def test_schedule_follows_simulated_time_on_a_fast_clock(monkeypatch):
+    clock = SimClock(mode="fast")
+    monkeypatch.setattr(sim_clock, "_clock", clock)
+    scenario = Scenario({
+        **SPEC,
+        "duration": "1h",
+        "rates": {"gasInterval": 10, "schedule": [{"at": "10m", "gasInterval": 5}, {"at": "30m", "gasInterval": 2}]},
+    })
+    gas = _Loop(clock, 10)
+    runner = ScenarioRunner(scenario, {"gas": gas}, loops=1, start_timeout=10)
+    runner.start()
+
+    # The simulator starts running after the runner, as in main.py
+    time.sleep(0.2)
+    thread = threading.Thread(target=gas.run)
+    thread.start()
+    thread.join(timeout=30)
+    runner.stop()
+    assert not thread.is_alive()
+
+    started = gas.ticks[0][0] - 10
+    intervals = {}
+    for moment, interval in gas.ticks:
+        intervals.setdefault(interval, []).append(moment - started)
+    assert max(intervals[10]) <= 600
+    assert 600 <= min(intervals[5]) and max(intervals[5]) <= 1800
+    assert 1800 <= min(intervals[2]) and 3590 <= max(intervals[2]) <= 3600
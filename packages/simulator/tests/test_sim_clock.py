@@ -0,0 +1,66 @@
+"""Tests for the simulation clock"""
+
+import threading
+import time
+
+import pytest
+
+from sim_clock import SimClock, parse_clock_start
+
+
+def _run_loop(clock: SimClock, interval: float, ticks: int, log: list, name: str, ready: threading.Barrier):
+    with clock.participant():
+        ready.wait()  # Time would run ahead for a loop sleeping alone
+        for _ in range(ticks):
+            clock.sleep(interval)
+            log.append((clock.time(), name))
+
+
+def test_fast_mode_interleaves_participants_in_simulated_order():
+    clock = SimClock(mode="fast", start=time.time() - 86400)
+    origin = clock.time()
+    log = []
+    ready = threading.Barrier(2)
+    threads = [
+        threading.Thread(target=_run_loop, args=(clock, 10, 6, log, "a", ready)),
+        threading.Thread(target=_run_loop, args=(clock, 30, 2, log, "b", ready)),
+    ]
+    started = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert time.time() - started < 5
+    offsets = [round(moment - origin) for moment, _ in log]
+    assert offsets == sorted(offsets)
+    assert offsets[-1] == 60
+    assert sorted((round(moment - origin), name) for moment, name in log if name == "b") == [(30, "b"), (60, "b")]
+
+
+def test_fast_mode_sleep_is_woken_by_event():
+    clock = SimClock(mode="fast")
+    wake = threading.Event()
+    wake.set()
+    with clock.participant():
+        assert clock.sleep(3600, wake) is True
+
+
+def test_clock_never_runs_ahead_of_wall_time():
+    clock = SimClock(mode="scaled", scale=1000, start=time.time() - 1)
+    time.sleep(0.05)
+    assert clock.time() <= time.time()
+    assert clock.caught_up
+    assert clock.speedup == 1.0
+
+
+def test_invalid_modes_are_rejected():
+    with pytest.raises(ValueError):
+        SimClock(mode="warp")
+    with pytest.raises(ValueError):
+        SimClock(mode="scaled", scale=0)
+
+
+def test_parse_clock_start_accepts_iso_and_empty():
+    assert parse_clock_start("2026-01-01T00:00:00Z") == 1767225600.0
+    assert parse_clock_start(None) is None
@@ -0,0 +1,80 @@
+"""Tests for soak growth and rate drift detection"""
+
+import time
+
+from soak_monitor import SoakMonitor, detect_growth
+
+
+def test_detect_growth_flags_a_steady_leak():
+    assert detect_growth([100 + n for n in range(20)])
+
+
+def test_detect_growth_ignores_flat_noisy_and_short_series():
+    assert not detect_growth([100] * 20)
+    assert not detect_growth([100, 103, 99, 102, 98, 101] * 4)
+    assert not detect_growth([1, 2, 3, 4])
+
+
+def test_detect_growth_ignores_growth_below_the_noise_threshold():
+    rss = [100 + n * 0.1 for n in range(20)]
+    assert detect_growth(rss)
+    assert not detect_growth(rss, min_relative_growth=0.05)
+
+
+class _Histogram:
+    def percentile(self, p):
+        return 0.0
+
+
+class _Gas:
+    """GasSensorSimulator stand-in with 10 sensors every second"""
+
+    def __init__(self):
+        self.published = 0
+        self.paused = False
+        self.interval = 1
+        self.sensors = list(range(10))
+        self.batcher = None
+        self.client = None
+        self.last_heartbeat = {}
+        self.puback_latency = _Histogram()
+
+    def pending_messages(self):
+        return 0
+
+
+def _monitor(tmp_path):
+    gas = _Gas()
+    monitor = SoakMonitor({"gas": gas}, output_file=str(tmp_path / "soak.csv"))
+    monitor.started_at = time.time()
+    return monitor, gas
+
+
+def _step(monitor, gas, published, paused=False):
+    """Take a sample one second after the previous one"""
+    gas.paused = paused
+    gas.published += published
+    monitor._last_sample_at = time.time() - 1
+    monitor._record(monitor.sample())
+    return monitor.check()
+
+
+def test_rate_drift_is_flagged(tmp_path):
+    monitor, gas = _monitor(tmp_path)
+    raised = {}
+    for _ in range(6):
+        raised.update(_step(monitor, gas, 5))
+    assert "readingsPerSecDrift" in raised
+
+
+def test_pause_does_not_count_as_drift(tmp_path):
+    monitor, gas = _monitor(tmp_path)
+    for _ in range(6):
+        _step(monitor, gas, 10)
+    for _ in range(6):
+        assert _step(monitor, gas, 0, paused=True) == {}
+    # The first sample after resume still covers part of the pause
+    assert _step(monitor, gas, 3) == {}
+    for _ in range(5):
+        assert _step(monitor, gas, 10) == {}
+    assert monitor.flags == {}
@@ -0,0 +1,75 @@
+"""Tests for the stub backend's request handling"""
+
+import pytest
+
+from stub_backend import StubBackend
+
+
+@pytest.fixture
+def backend():
+    return StubBackend(seed=1, num_barns=2, num_livestock=4)
+
+
+@pytest.fixture
+def headers(backend):
+    return {"Authorization": f"Bearer {backend._issue_tokens()['accessToken']}"}
+
+
+def _query(**params):
+    return {key: [str(value)] for key, value in params.items()}
+
+
+def test_paginate_pages_like_the_backend(backend):
+    items = [{"id": n} for n in range(25)]
+    status, body = backend._paginate(items, _query(page=3, limit=10))
+    assert status == 200
+    assert [item["id"] for item in body["data"]] == list(range(20, 25))
+    assert body["meta"] == {
+        "total": 25, "page": 3, "limit": 10, "totalPages": 3, "hasNextPage": False, "hasPrevPage": True,
+    }
+    assert backend._paginate(items, {})[1]["meta"]["limit"] == 10
+
+
+@pytest.mark.parametrize("query, message", [
+    (_query(page=0), "page must not be less than 1"),
+    (_query(limit=101), "limit must not be greater than 100"),
+    (_query(limit="ten"), "limit must be an integer number"),
+])
+def test_paginate_rejects_invalid_parameters(backend, query, message):
+    status, body = backend._paginate([], query)
+    assert status == 400
+    assert message in body["message"]
+
+
+def test_requests_need_a_token(backend, headers):
+    assert backend.handle("GET", "/api/livestock", {}, {}, {})[0] == 401
+    status, body = backend.handle("GET", "/api/livestock", _query(limit=100), {}, headers)
+    assert status == 200
+    assert body["meta"]["total"] == 4
+
+
+def test_refresh_tokens_are_single_use(backend):
+    refresh_token = backend._issue_tokens()["refreshToken"]
+    assert backend.handle("POST", "/api/auth/refresh", {}, {"refreshToken": refresh_token}, {})[0] == 200
+    assert backend.handle("POST", "/api/auth/refresh", {}, {"refreshToken": refresh_token}, {})[0] == 401
+
+
+def test_expired_refresh_tokens_are_pruned(backend):
+    tokens = [backend._issue_tokens()["refreshToken"] for _ in range(3)]
+    backend.refresh_tokens = {token: 0.0 for token in backend.refresh_tokens}
+    backend.refresh_tokens.update({f"stale-{n}": 0.0 for n in range(1000)})
+    backend._issue_tokens()
+    assert len(backend.refresh_tokens) == 1
+    assert backend.handle("POST", "/api/auth/refresh", {}, {"refreshToken": tokens[0]}, {})[0] == 401
+
+
+def test_weight_entries_need_known_livestock(backend, headers):
+    livestock_id = next(iter(backend.collections["livestock"]))
+    path = f"/api/livestock/{livestock_id}/weight-entries"
+    status, body = backend.handle("POST", path, {}, {"weight": 420.5}, headers)
+    assert status == 201
+    assert body["livestockId"] == livestock_id
+
+    assert backend.handle("POST", path, {}, {}, headers)[0] == 400
+    status, body = backend.handle("POST", "/api/livestock/unknown/health-events", {}, {"eventType": "checkup"}, headers)
+    assert (status, body["message"]) == (404, "Livestock not found")
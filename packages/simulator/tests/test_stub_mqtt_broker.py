@@ -0,0 +1,76 @@
+"""Tests for the stub MQTT broker"""
+
+import asyncio
+import socket
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+import pytest
+
+from stub_mqtt_broker import CONNECT, StubMQTTBroker, encode_length, topic_matches
+
+
+@pytest.mark.parametrize("topic_filter, topic, expected", [
+    ("sensors/gas/+", "sensors/gas/GAS-001", True),
+    ("sensors/gas/+", "sensors/gas/GAS-001/extra", False),
+    ("sensors/#", "sensors/gateway/BARN-1/batch", True),
+    ("sensors/#", "sensors", True),
+    ("sensors/+/status", "sensors/GAS-001/status", True),
+    ("sensors/gas/GAS-001", "sensors/gas/GAS-002", False),
+    ("#", "$SYS/broker/uptime", False),
+    ("+/broker/uptime", "$SYS/broker/uptime", False),
+])
+def test_topic_matches(topic_filter, topic, expected):
+    assert topic_matches(topic_filter, topic) is expected
+
+
+@pytest.fixture
+def broker():
+    broker = StubMQTTBroker(port=0, stats_interval=0)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(broker.start(), loop).result(timeout=5)
+    yield broker
+    loop.call_soon_threadsafe(broker.close)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+
+
+def _client(client_id: str) -> mqtt.Client:
+    if hasattr(mqtt, "CallbackAPIVersion"):
+        return mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, client_id=client_id)
+    return mqtt.Client(client_id=client_id)
+
+
+def test_publish_is_acknowledged_and_delivered(broker):
+    received = []
+    subscriber = _client("subscriber")
+    subscriber.on_message = lambda client, userdata, message: received.append((message.topic, message.payload))
+    subscriber.connect("127.0.0.1", broker.port)
+    subscriber.loop_start()
+    subscriber.subscribe("sensors/gas/+", qos=1)
+    publisher = _client("publisher")
+    publisher.connect("127.0.0.1", broker.port)
+    publisher.loop_start()
+    try:
+        time.sleep(0.2)
+        info = publisher.publish("sensors/gas/GAS-001", b"{}", qos=1)
+        info.wait_for_publish(timeout=5)
+        assert info.is_published()
+        deadline = time.time() + 5
+        while not received and time.time() < deadline:
+            time.sleep(0.05)
+        assert received == [("sensors/gas/GAS-001", b"{}")]
+    finally:
+        for client in (publisher, subscriber):
+            client.disconnect()
+            client.loop_stop()
+
+
+def test_connect_with_reserved_flags_is_dropped(broker):
+    body = b"\x00\x04MQTT\x04\x02\x00\x3c\x00\x01x"
+    with socket.create_connection(("127.0.0.1", broker.port), timeout=5) as sock:
+        sock.sendall(bytes([(CONNECT << 4) | 0x01]) + encode_length(len(body)) + body)
+        assert sock.recv(4) == b""
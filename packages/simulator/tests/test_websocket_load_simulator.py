@@ -0,0 +1,31 @@
+"""Tests for event classification in the WebSocket fan-out simulator"""
+
+from websocket_load_simulator import ClientStats, _event_key, _event_timestamp, _is_barn_event
+
+READING = {"sensorId": "GAS-001", "barnId": "BARN-A", "reading": {"timestamp": "2026-01-01T00:00:00Z"}}
+
+
+def test_room_event_and_global_twin_share_a_key():
+    assert _event_key("sensor:reading", READING) == _event_key("sensor:reading:global", READING)
+    alert = {"_id": "a1", "barnId": "BARN-A"}
+    assert _event_key("alert:new", alert) == _event_key("alert:new:barn", alert)
+
+
+def test_twin_is_counted_once_per_client():
+    stats = ClientStats(0, "BARN-A")
+    key = _event_key("sensor:reading", READING)
+    assert not stats.is_duplicate(key)
+    assert stats.is_duplicate(_event_key("sensor:reading:global", READING))
+
+
+def test_global_events_of_other_barns_are_not_barn_events():
+    assert _is_barn_event("sensor:reading", READING, "BARN-A")
+    assert _is_barn_event("sensor:reading:global", READING, "BARN-A")
+    assert not _is_barn_event("sensor:reading:global", READING, "BARN-B")
+    assert not _is_barn_event("alert:updated", {"alertId": "a1", "status": "resolved"}, "BARN-A")
+
+
+def test_event_timestamp():
+    assert _event_timestamp("sensor:reading", READING).year == 2026
+    assert _event_timestamp("alert:updated", {"alertId": "a1"}) is None
+    assert _event_timestamp("sensor:reading", {"reading": {"timestamp": "not a date"}}) is None
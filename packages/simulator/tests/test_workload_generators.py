@@ -0,0 +1,39 @@
+"""Tests for workload profile parsing"""
+
+import random
+
+import pytest
+
+from workload_generators import WorkloadProfile
+
+
+def test_parse_weights():
+    profile = WorkloadProfile.parse("rfid=70, weight=20,health=10")
+    assert profile.weights == {"rfid": 70.0, "weight": 20.0, "health": 10.0}
+
+
+def test_parse_defaults_missing_weight_to_one_and_skips_empty_parts():
+    assert WorkloadProfile.parse("rfid,,weight=3,").weights == {"rfid": 1.0, "weight": 3.0}
+
+
+def test_zero_weights_are_dropped():
+    assert WorkloadProfile.parse("rfid=1,health=0").weights == {"rfid": 1.0}
+
+
+@pytest.mark.parametrize("spec", ["", "rfid=0", "rfid=-1"])
+def test_profile_without_positive_weight_is_rejected(spec):
+    with pytest.raises(ValueError):
+        WorkloadProfile.parse(spec)
+
+
+def test_invalid_weight_is_rejected():
+    with pytest.raises(ValueError):
+        WorkloadProfile.parse("rfid=lots")
+
+
+def test_choose_follows_weights():
+    random.seed(7)
+    profile = WorkloadProfile.parse("rfid=90,weight=10")
+    picks = [profile.choose() for _ in range(2000)]
+    assert set(picks) == {"rfid", "weight"}
+    assert 0.85 < picks.count("rfid") / len(picks) < 0.95
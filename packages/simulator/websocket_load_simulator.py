@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+WebSocket Fan-out Load Simulator for Livestock IoT Monitoring System
+
+Holds thousands of concurrent Socket.IO connections from a single asyncio
+process, simulating dashboard viewers. Each connection subscribes to one barn
+via `subscribe:barn` and counts the broadcasts it receives together with the
+delivery lag (receive time minus the time the event originated).
+
+The backend sends most events twice to a subscribed client (the barn room
+event and its `:global` / `alert:new:barn` twin), so events are deduplicated
+per client by identity before counting. Broadcasts that reach every client
+(the `:global` events of other barns, alerts without a barn, alert updates)
+are counted separately from the client's own barn, so per-barn averages
+measure the barn fan-out only. Lag is measured against the
+simulation clock and converted to wall-clock milliseconds; it is not
+measured in fast (discrete-event) mode.
+
+Run it next to the gas sensor fleet to find the broadcast throughput ceiling
+as both sensors and viewers grow.
+
+Requirements: Simulator for load testing
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import aiohttp
+import socketio
+from dotenv import load_dotenv
+
+from metrics import LatencyHistogram
+from sim_clock import get_clock
+
+# Load environment variables
+load_dotenv()
+
+
+# Broadcast events emitted by websocket.gateway.ts
+SENSOR_EVENTS = ["sensor:reading", "sensor:reading:global"]
+ENTRY_EXIT_EVENTS = ["entry-exit:event", "entry-exit:event:global"]
+ALERT_NEW_EVENTS = ["alert:new", "alert:new:barn"]
+ALERT_EVENTS = ALERT_NEW_EVENTS + ["alert:updated"]
+# Events sent only to the barn room of a subscribed client
+BARN_EVENTS = {"sensor:reading", "entry-exit:event", "alert:new:barn"}
+
+# Recent event keys remembered per client; twins arrive back to back
+DEDUP_WINDOW = 64
+
+
+def _event_key(event_name: str, data: Dict) -> Optional[Tuple]:
+    """Identity of a broadcast, shared by an event and its twin"""
+    if not isinstance(data, dict):
+        return None
+    if event_name in SENSOR_EVENTS:
+        return ("sensor", data.get("sensorId"), (data.get("reading") or {}).get("timestamp"))
+    if event_name in ENTRY_EXIT_EVENTS:
+        return ("entry-exit", data.get("livestockId"), data.get("eventType"), data.get("timestamp"))
+    if event_name in ALERT_NEW_EVENTS:
+        return ("alert", data.get("_id"))
+    return ("alert-update", data.get("alertId"), data.get("status"))
+
+
+def _is_barn_event(event_name: str, data: Dict, barn_id: str) -> bool:
+    """True for an event of the client's own barn (room event or its global twin)"""
+    if event_name in BARN_EVENTS:
+        return True
+    return isinstance(data, dict) and data.get("barnId") == barn_id
+
+
+def _event_timestamp(event_name: str, data: Dict) -> Optional[datetime]:
+    """
+    Extract the time a broadcast event originated
+
+    alert:updated carries only the time of the status change, not of the
+    alert, so it has no origin timestamp.
+    """
+    if not isinstance(data, dict):
+        return None
+
+    if event_name in SENSOR_EVENTS:
+        raw = (data.get("reading") or {}).get("timestamp")
+    elif event_name in ENTRY_EXIT_EVENTS:
+        raw = data.get("timestamp")
+    elif event_name in ALERT_NEW_EVENTS:
+        raw = data.get("createdAt")
+    else:
+        return None
+
+    if not raw:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(raw).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class ClientStats:
+    """Per-connection delivery statistics"""
+
+    __slots__ = (
+        "client_index", "barn_id", "connected", "subscribed", "received", "global_received",
+        "duplicates", "lag_total", "lag_max", "recent",
+    )
+
+    def __init__(self, client_index: int, barn_id: str):
+        self.client_index = client_index
+        self.barn_id = barn_id
+        self.connected = False
+        self.subscribed = False
+        # Events of the subscribed barn, and broadcasts to every client
+        self.received = 0
+        self.global_received = 0
+        self.duplicates = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        # Insertion-ordered set of recent event keys for deduplication
+        self.recent: Dict[Tuple, None] = {}
+
+    def is_duplicate(self, key: Optional[Tuple]) -> bool:
+        """Remember an event key; True if it was seen recently"""
+        if key is None:
+            return False
+        if key in self.recent:
+            return True
+        self.recent[key] = None
+        if len(self.recent) > DEDUP_WINDOW:
+            del self.recent[next(iter(self.recent))]
+        return False
+
+
+class WebSocketLoadSimulator:
+    """Simulates many dashboard clients subscribed to barn broadcasts"""
+
+    def __init__(
+        self,
+        backend_url: str = "http://localhost:3001",
+        num_clients: int = 1000,
+        barn_ids: Optional[List[str]] = None,
+        duration: int = 60,
+        connect_concurrency: int = 100,
+        report_interval: int = 10,
+    ):
+        """
+        Initialize the WebSocket load simulator
+
+        Args:
+            backend_url: Backend base URL (Socket.IO is served on the same port)
+            num_clients: Number of concurrent Socket.IO connections
+            barn_ids: Barns to spread subscriptions across (round-robin)
+            duration: Seconds to hold connections after ramp-up (0 = until stopped)
+            connect_concurrency: Maximum connections being opened at once
+            report_interval: Seconds between progress reports
+        """
+        self.backend_url = backend_url.rstrip("/")
+        self.num_clients = num_clients
+        self.barn_ids = barn_ids or ["BARN-001"]
+        self.duration = duration
+        self.connect_concurrency = connect_concurrency
+        self.report_interval = report_interval
+
+        self.clients: List[socketio.AsyncClient] = []
+        self.stats: List[ClientStats] = [
+            ClientStats(i, self.barn_ids[i % len(self.barn_ids)])
+            for i in range(num_clients)
+        ]
+        self.event_counts: Dict[str, int] = {}
+        self.lag_histogram = LatencyHistogram()
+        self.connect_failures = 0
+        self.disconnects = 0
+        self.started_at: Optional[float] = None
+        self.running = False
+        self.clock = get_clock()
+        self._http_session: Optional[aiohttp.ClientSession] = None
+
+    def _make_handler(self, stats: ClientStats, event_name: str):
+        """Create an event handler bound to one connection"""
+
+        async def handler(data=None):
+            received_at = self.clock.time()
+            self.event_counts[event_name] = self.event_counts.get(event_name, 0) + 1
+            if stats.is_duplicate(_event_key(event_name, data)):
+                stats.duplicates += 1
+                return
+            if _is_barn_event(event_name, data, stats.barn_id):
+                stats.received += 1
+            else:
+                stats.global_received += 1
+
+            origin = _event_timestamp(event_name, data)
+            speedup = self.clock.speedup
+            if origin is not None and speedup:
+                # Simulated seconds back to wall-clock milliseconds
+                lag_ms = (received_at - origin.timestamp()) / speedup * 1000
+                stats.lag_total += lag_ms
+                stats.lag_max = max(stats.lag_max, lag_ms)
+                self.lag_histogram.record(lag_ms)
+
+        return handler
+
+    async def _open_client(self, stats: ClientStats, semaphore: asyncio.Semaphore):
+        """Open one connection and subscribe it to its barn"""
+        client = socketio.AsyncClient(
+            reconnection=False,
+            http_session=self._http_session,
+        )
+
+        for event_name in SENSOR_EVENTS + ENTRY_EXIT_EVENTS + ALERT_EVENTS:
+            client.on(event_name, self._make_handler(stats, event_name))
+
+        async def on_disconnect():
+            if stats.connected and self.running:
+                self.disconnects += 1
+            stats.connected = False
+
+        client.on("disconnect", on_disconnect)
+
+        async with semaphore:
+            try:
+                await client.connect(self.backend_url, transports=["websocket"], wait_timeout=10)
+                stats.connected = True
+                ack = await client.call("subscribe:barn", {"barnId": stats.barn_id}, timeout=10)
+                stats.subscribed = bool(ack and ack.get("success"))
+            except Exception as e:
+                self.connect_failures += 1
+                if self.connect_failures <= 5:
+                    print(f"Client {stats.client_index} failed to connect: {e}")
+
+        self.clients.append(client)
+
+    def _print_progress(self):
+        """Print a one-line progress report"""
+        elapsed = time.time() - self.started_at
+        connected = sum(1 for s in self.stats if s.connected)
+        received = sum(s.received for s in self.stats)
+        global_received = sum(s.global_received for s in self.stats)
+        print(
+            f"[WS] t={elapsed:6.0f}s connected={connected}/{self.num_clients} "
+            f"received={received} ({received / elapsed:.0f} events/s) global={global_received} "
+            f"lag {self.lag_histogram.format_summary()}"
+        )
+
+    def print_report(self):
+        """Print the final fan-out report"""
+        elapsed = max(time.time() - self.started_at, 0.001)
+        connected = [s for s in self.stats if s.subscribed]
+        received = [s.received for s in self.stats]
+        total = sum(received)
+
+        print()
+        print("=" * 70)
+        print("WebSocket Fan-out Report")
+        print("=" * 70)
+        print(f"  Clients requested:   {self.num_clients}")
+        print(f"  Clients subscribed:  {len(connected)}")
+        print(f"  Connect failures:    {self.connect_failures}")
+        print(f"  Unexpected drops:    {self.disconnects}")
+        print(f"  Barns:               {len(self.barn_ids)}")
+        print(f"  Elapsed:             {elapsed:.1f}s")
+        global_total = sum(s.global_received for s in self.stats)
+        print(f"  Events received:     {total} ({total / elapsed:.1f} events/s, own barn)")
+        print(f"  Global broadcasts:   {global_total} ({global_total / elapsed:.1f} events/s, sent to every client)")
+        print(f"  Duplicates skipped:  {sum(s.duplicates for s in self.stats)} (room/global twins)")
+        if received:
+            print(
+                f"  Per client:          min={min(received)} "
+                f"avg={total / len(received):.1f} max={max(received)}"
+            )
+        print(f"  Delivery lag:        {self.lag_histogram.format_summary()}")
+        if self.stats:
+            worst = max(self.stats, key=lambda s: s.lag_max)
+            print(f"  Worst client lag:    {worst.lag_max:.1f}ms (client {worst.client_index}, {worst.barn_id})")
+        print("  By barn (avg messages per client):")
+        for barn_id in self.barn_ids:
+            barn_stats = [s for s in self.stats if s.barn_id == barn_id]
+            if barn_stats:
+                avg = sum(s.received for s in barn_stats) / len(barn_stats)
+                print(f"    {barn_id:26} {avg:.1f} ({len(barn_stats)} clients)")
+        print("  By event (before deduplication):")
+        for event_name in sorted(self.event_counts):
+            print(f"    {event_name:26} {self.event_counts[event_name]}")
+        print("=" * 70)
+
+    async def run_async(self):
+        """Open all connections, hold them and report"""
+        print(f"\nStarting WebSocket load simulator...")
+        print(f"Backend: {self.backend_url}")
+        print(f"Opening {self.num_clients} connections across {len(self.barn_ids)} barn(s)")
+
+        connector = aiohttp.TCPConnector(limit=0)
+        self._http_session = aiohttp.ClientSession(connector=connector)
+        semaphore = asyncio.Semaphore(self.connect_concurrency)
+        self.started_at = time.time()
+        self.running = True
+
+        try:
+            await asyncio.gather(*(self._open_client(s, semaphore) for s in self.stats))
+            ramp_time = time.time() - self.started_at
+            print(f"Ramp-up completed in {ramp_time:.1f}s")
+
+            hold_until = time.time() + self.duration if self.duration else None
+            while self.running:
+                wait = self.report_interval
+                if hold_until is not None:
+                    wait = min(wait, max(hold_until - time.time(), 0))
+                await asyncio.sleep(wait)
+                self._print_progress()
+                if hold_until is not None and time.time() >= hold_until:
+                    break
+        finally:
+            self.running = False
+            await asyncio.gather(
+                *(c.disconnect() for c in self.clients if c.connected),
+                return_exceptions=True,
+            )
+            await self._http_session.close()
+            self.print_report()
+
+    def run(self):
+        """Run the simulator (blocking)"""
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            print("\n\nStopping WebSocket load simulator...")
+
+
+def main():
+    """Main entry point for the WebSocket load simulator"""
+    backend_url = os.getenv("BACKEND_WS_URL") or os.getenv("BACKEND_API_URL", "http://localhost:3001")
+    num_clients = int(os.getenv("NUM_WS_CLIENTS", "1000"))
+    barn_ids = [b.strip() for b in os.getenv("WS_BARN_IDS", "BARN-001").split(",") if b.strip()]
+    duration = int(os.getenv("WS_TEST_DURATION", "60"))
+    concurrency = int(os.getenv("WS_CONNECT_CONCURRENCY", "100"))
+
+    if len(sys.argv) > 1:
+        num_clients = int(sys.argv[1])
+
+    simulator = WebSocketLoadSimulator(
+        backend_url=backend_url,
+        num_clients=num_clients,
+        barn_ids=barn_ids,
+        duration=duration,
+        connect_concurrency=concurrency,
+    )
+    simulator.run()
+
+
+if __name__ == "__main__":
+    main()
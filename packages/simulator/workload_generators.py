@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Mixed Write-Workload Generators for Livestock IoT Monitoring System
+
+Adds weight entry and health event writers next to the RFID entry/exit
+events, reusing the RFID simulator's livestock cache, auth and HTTP
+machinery. A weighted workload profile sets the relative rates so contention
+between ingest paths can be measured.
+
+- Weigh days: bursts of weight entries for a group of animals
+- Vaccination campaigns: the same vaccine recorded for many animals in a row
+
+Requirements: Simulator for load testing
+"""
+
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+from dotenv import load_dotenv
+
+from metrics import LatencyHistogram
+from rfid_reader_simulator import RFIDReaderSimulator
+from sim_clock import get_clock
+
+# Load environment variables
+load_dotenv()
+
+
+def _iso_now() -> str:
+    """Current simulated time as ISO string, a second in the past for IsNotFutureDate"""
+    return get_clock().iso_now(offset=-1)
+
+
+class WorkloadStats:
+    """Request counters and latency for one workload kind"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+    def record(self, ok: bool, latency_ms: float):
+        self.requests += 1
+        if not ok:
+            self.errors += 1
+        self.latency.record(latency_ms)
+
+
+class WeightEntryGenerator:
+    """Generates weight entries, occasionally as weigh-day bursts"""
+
+    name = "weight"
+
+    def __init__(
+        self,
+        rfid: RFIDReaderSimulator,
+        burst_probability: float = 0.1,
+        burst_size: int = 20,
+    ):
+        """
+        Initialize the weight entry generator
+
+        Args:
+            rfid: Initialized RFID simulator providing livestock cache and HTTP
+            burst_probability: Chance that a step is a weigh-day burst
+            burst_size: Animals weighed in one burst
+        """
+        self.rfid = rfid
+        self.burst_probability = burst_probability
+        self.burst_size = burst_size
+        self.weights: Dict[str, float] = {}
+
+    def _next_weight(self, livestock_id: str) -> float:
+        """Return a plausible weight that drifts slowly between weighings"""
+        if livestock_id not in self.weights:
+            record = self.rfid.livestock_records.get(livestock_id, {})
+            self.weights[livestock_id] = float(record.get("weight") or random.uniform(200, 500))
+        self.weights[livestock_id] = max(1.0, self.weights[livestock_id] + random.uniform(-2, 5))
+        return round(self.weights[livestock_id], 1)
+
+    def requests(self) -> List[Tuple[str, Dict]]:
+        """
+        Build the requests for one step
+
+        Returns:
+            List of (path, payload) tuples
+        """
+        if random.random() < self.burst_probability:
+            count = min(self.burst_size, len(self.rfid.livestock_ids))
+            animals = random.sample(self.rfid.livestock_ids, count)
+            note = "Weigh day"
+        else:
+            animals = [random.choice(self.rfid.livestock_ids)]
+            note = "Routine weighing"
+
+        return [
+            (
+                f"/api/livestock/{livestock_id}/weight-entries",
+                {
+                    "weight": self._next_weight(livestock_id),
+                    "measurementDate": _iso_now(),
+                    "notes": note,
+                },
+            )
+            for livestock_id in animals
+        ]
+
+
+class HealthEventGenerator:
+    """Generates health events, occasionally as vaccination campaigns"""
+
+    name = "health"
+
+    VACCINES = ["FMD", "Anthrax", "Brucellosis", "Hemorrhagic Septicemia"]
+    DISEASES = ["Mastitis", "Foot Rot", "Bloat", "Pneumonia"]
+    VETERINARIANS = ["Dr. Sari", "Dr. Budi", "Dr. Wulan"]
+
+    def __init__(
+        self,
+        rfid: RFIDReaderSimulator,
+        campaign_probability: float = 0.1,
+        campaign_size: int = 30,
+    ):
+        """
+        Initialize the health event generator
+
+        Args:
+            rfid: Initialized RFID simulator providing livestock cache and HTTP
+            campaign_probability: Chance that a step is a vaccination campaign
+            campaign_size: Animals vaccinated in one campaign
+        """
+        self.rfid = rfid
+        self.campaign_probability = campaign_probability
+        self.campaign_size = campaign_size
+
+    def _single_event(self) -> Dict:
+        """Build one examination or disease event"""
+        if random.random() < 0.7:
+            return {
+                "eventType": "examination",
+                "eventDate": _iso_now(),
+                "description": "Routine health examination",
+                "veterinarianName": random.choice(self.VETERINARIANS),
+                "findings": "No abnormalities found",
+            }
+        return {
+            "eventType": "disease",
+            "eventDate": _iso_now(),
+            "description": "Symptoms observed during inspection",
+            "diseaseName": random.choice(self.DISEASES),
+            "severity": random.choice(["mild", "moderate", "severe"]),
+            "treatmentPlan": "Isolate and monitor",
+        }
+
+    def requests(self) -> List[Tuple[str, Dict]]:
+        """
+        Build the requests for one step
+
+        Returns:
+            List of (path, payload) tuples
+        """
+        if random.random() < self.campaign_probability:
+            vaccine = random.choice(self.VACCINES)
+            next_due = get_clock().iso_now(offset=180 * 86400)
+            count = min(self.campaign_size, len(self.rfid.livestock_ids))
+            return [
+                (
+                    f"/api/livestock/{livestock_id}/health-events",
+                    {
+                        "eventType": "vaccination",
+                        "eventDate": _iso_now(),
+                        "description": f"{vaccine} vaccination campaign",
+                        "vaccineName": vaccine,
+                        "nextDueDate": next_due.replace("+00:00", "Z"),
+                    },
+                )
+                for livestock_id in random.sample(self.rfid.livestock_ids, count)
+            ]
+
+        livestock_id = random.choice(self.rfid.livestock_ids)
+        return [(f"/api/livestock/{livestock_id}/health-events", self._single_event())]
+
+
+class WorkloadProfile:
+    """Weighted choice between workload kinds"""
+
+    def __init__(self, weights: Dict[str, float]):
+        """
+        Args:
+            weights: Relative weight per workload kind, e.g. {"rfid": 70, "weight": 20}
+        """
+        self.weights = {k: v for k, v in weights.items() if v > 0}
+        if not self.weights:
+            raise ValueError("Workload profile needs at least one positive weight")
+
+    @classmethod
+    def parse(cls, spec: str) -> "WorkloadProfile":
+        """
+        Parse a profile string such as "rfid=70,weight=20,health=10"
+
+        Args:
+            spec: Comma-separated kind=weight pairs
+        """
+        weights = {}
+        for part in spec.split(","):
+            if not part.strip():
+                continue
+            kind, _, weight = part.partition("=")
+            weights[kind.strip()] = float(weight or 1)
+        return cls(weights)
+
+    def choose(self) -> str:
+        """Pick a workload kind according to the weights"""
+        kinds = list(self.weights)
+        return random.choices(kinds, weights=[self.weights[k] for k in kinds])[0]
+
+
+class MixedWorkloadSimulator:
+    """Drives RFID, weight and health writes according to a profile"""
+
+    def __init__(
+        self,
+        rfid: RFIDReaderSimulator,
+        profile: WorkloadProfile,
+        interval: float = 1.0,
+        report_interval: int = 30,
+    ):
+        """
+        Initialize the mixed workload simulator
+
+        Args:
+            rfid: RFID simulator (initialized by run()/run_batch())
+            profile: Relative rates of each workload kind
+            interval: Seconds between workload steps
+            report_interval: Seconds between stats reports
+        """
+        self.rfid = rfid
+        self.interval = interval
+        self.report_interval = report_interval
+        self.running = False
+
+        self.generators = {
+            "weight": WeightEntryGenerator(
+                rfid,
+                burst_probability=float(os.getenv("WEIGH_DAY_PROBABILITY", "0.1")),
+                burst_size=int(os.getenv("WEIGH_DAY_SIZE", "20")),
+            ),
+            "health": HealthEventGenerator(
+                rfid,
+                campaign_probability=float(os.getenv("VACCINATION_CAMPAIGN_PROBABILITY", "0.1")),
+                campaign_size=int(os.getenv("VACCINATION_CAMPAIGN_SIZE", "30")),
+            ),
+        }
+        self.stats: Dict[str, WorkloadStats] = {}
+        self.set_profile(profile)
+
+    def set_profile(self, profile: WorkloadProfile):
+        """
+        Switch to a different workload mix (also while running)
+
+        Args:
+            profile: New relative rates; stats for earlier kinds are kept
+        """
+        unknown = set(profile.weights) - set(self.generators) - {"rfid"}
+        if unknown:
+            raise ValueError(f"Unknown workload kinds: {', '.join(sorted(unknown))}")
+        for kind in profile.weights:
+            self.stats.setdefault(kind, WorkloadStats())
+        self.profile = profile
+
+    def _timed(self, kind: str, send: Callable[[], bool]) -> bool:
+        """Run a send function and record its outcome"""
+        start = time.time()
+        ok = send()
+        self.stats[kind].record(ok, (time.time() - start) * 1000)
+        return ok
+
+    def _post(self, path: str, payload: Dict) -> bool:
+        """POST a payload through the RFID simulator's authenticated session"""
+        try:
+            response = self.rfid._request("POST", path, json=payload)
+            if response.status_code in [200, 201]:
+                return True
+            print(f"Failed POST {path}: HTTP {response.status_code} - {response.text[:200]}")
+        except Exception as e:
+            print(f"Error posting to {path}: {e}")
+        return False
+
+    def step(self) -> str:
+        """
+        Run one workload step chosen by the profile
+
+        Returns:
+            The workload kind that was executed
+        """
+        kind = self.profile.choose()
+        if kind == "rfid":
+            event = self.rfid._generate_event()
+            self._timed(kind, lambda: self.rfid._send_event(event))
+            return kind
+
+        generator = self.generators[kind]
+        requests_to_send = generator.requests()
+        if len(requests_to_send) > 1:
+            print(f"[{kind.upper():6}] burst of {len(requests_to_send)} writes")
+        for path, payload in requests_to_send:
+            self._timed(kind, lambda: self._post(path, payload))
+        return kind
+
+    def get_metrics(self) -> Dict:
+        """Return request counts, errors and latency per workload kind"""
+        return {
+            "interval": self.interval,
+            "profile": self.profile.weights,
+            "kinds": {
+                kind: {
+                    "requests": stats.requests,
+                    "errors": stats.errors,
+                    "latency": stats.latency.to_dict(),
+                }
+                for kind, stats in self.stats.items()
+            },
+        }
+
+    def print_report(self):
+        """Print per-workload request counts, error rates and latency"""
+        print("\nWorkload mix:")
+        for kind, stats in self.stats.items():
+            error_rate = stats.errors / stats.requests * 100 if stats.requests else 0.0
+            print(
+                f"  {kind:7} requests={stats.requests:<6} errors={error_rate:5.1f}% "
+                f"{stats.latency.format_summary()}"
+            )
+
+    def run(self):
+        """Run the mixed workload continuously"""
+        if self.rfid._wake.is_set():
+            return  # Stopped before it started
+
+        # Running from here on, so a stop() during initialization sticks
+        self.running = True
+        print(f"\nStarting mixed workload simulator...")
+        print(f"Profile: {self.profile.weights}")
+
+        if not self.rfid._initialize_data():
+            print("Failed to initialize. Exiting.")
+            self.running = False
+            return
+
+        last_report = time.time()
+        try:
+            with self.rfid.clock.participant():
+                while self.running and not self.rfid._wake.is_set():
+                    if self.rfid.paused:
+                        self.rfid.heartbeat_all()
+                    else:
+                        self.rfid.announce_outages()
+                        self.step()
+                    if time.time() - last_report >= self.report_interval:
+                        self.print_report()
+                        last_report = time.time()
+                    self.rfid.clock.sleep(self.interval, self.rfid._wake)
+        except KeyboardInterrupt:
+            print("\n\nStopping mixed workload simulator...")
+        finally:
+            self.running = False
+            self.rfid.shutdown()
+            self.print_report()
+
+    def stop(self):
+        """Stop the run loop (it shuts down on exit)"""
+        self.running = False
+        self.rfid.stop()
+
+    def run_batch(self, num_steps: int = 100):
+        """
+        Run a fixed number of workload steps without delay
+
+        Args:
+            num_steps: Number of steps to execute
+        """
+        if not self.rfid._initialize_data():
+            print("Failed to initialize. Exiting.")
+            return
+
+        try:
+            for _ in range(num_steps):
+                self.step()
+        finally:
+            self.rfid.shutdown()
+        self.print_report()
+
+
+def main():
+    """Main entry point for the mixed workload simulator"""
+    backend_url = os.getenv("BACKEND_API_URL", "http://localhost:3001")
+    profile = WorkloadProfile.parse(os.getenv("WORKLOAD_PROFILE", "rfid=70,weight=20,health=10"))
+    interval = float(os.getenv("WORKLOAD_INTERVAL", "1"))
+
+    rfid = RFIDReaderSimulator(
+        backend_url=backend_url,
+        interval=interval,
+        mqtt_broker=os.getenv("MQTT_BROKER_HOST", "localhost"),
+        mqtt_port=int(os.getenv("MQTT_BROKER_PORT", "1883")),
+    )
+    simulator = MixedWorkloadSimulator(rfid, profile, interval=interval)
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        num_steps = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+        simulator.run_batch(num_steps)
+    else:
+        simulator.run()
+
+
+if __name__ == "__main__":
+    main()